@@ -38,10 +38,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'evaluations'
+    'evaluations.apps.EvaluationsConfig'
 ]
 
 MIDDLEWARE = [
+    'evaluations.middleware.ProfilingMiddleware',
+    'evaluations.middleware.ThrottleMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,7 +59,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': ["templates", "/home/p1collins/ELSE/ELSE/templates"],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -65,6 +66,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compiled templates are kept by the cached loader, also with DEBUG enabled, so workers compile them
+            # once (see evaluations.prewarm). Template changes take effect when the workers are restarted.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -77,11 +86,42 @@ WSGI_APPLICATION = 'ELSE.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'evaluations.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
 
+# The evaluations.db.sqlite3 backend applies SQLITE_PRAGMAS to every connection and begins transactions with
+# BEGIN IMMEDIATE, so concurrent survey submissions wait up to busy_timeout milliseconds for the write lock.
+# Submissions which still find the database locked are retried SQLITE_LOCK_RETRIES times, starting after
+# SQLITE_LOCK_RETRY_DELAY seconds.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -16000,
+    'temp_store': 'MEMORY',
+}
+SQLITE_LOCK_RETRIES = 3
+SQLITE_LOCK_RETRY_DELAY = 0.05
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# The file based cache is shared by all workers on the host, which keeps the cached collection status
+# consistent across gunicorn workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    }
+}
+
+STATUS_CACHE_TIMEOUT = 300
+QUESTIONS_CACHE_TIMEOUT = 86400
+ANALYTICS_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -136,5 +176,70 @@ EMAIL_USE_TLS = True
 EMAIL_PORT = 587
 EMAIL_HOST_USER = "scu.engr.evaluations"
 EMAIL_HOST_PASSWORD = "COEN.174"
+DEFAULT_FROM_EMAIL = "scu.engr.evaluations@gmail.com"
+
+# Invitation emails are sent in batches over EMAIL_DELIVERY_WORKERS concurrent connections, each connection
+# is reused for up to EMAIL_MESSAGES_PER_CONNECTION messages.
+EMAIL_DELIVERY_WORKERS = 4
+EMAIL_MESSAGES_PER_CONNECTION = 100
+
+# Queued emails are retried OUTBOX_MAX_ATTEMPTS times by drain_outbox, waiting OUTBOX_RETRY_DELAY seconds
+# before the first retry and doubling the delay for each further attempt. A drain claims the messages it sends
+# for OUTBOX_LEASE seconds, messages claimed by a drain which died are sent again once the lease has expired.
+OUTBOX_BATCH_SIZE = 200
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_LEASE = 600
+
+LOGIN_REDIRECT_URL = "login"
+
+# Student and instructor links are signed with ACCESS_LINK_SECRET, which is read from the environment so it
+# never appears in the repository like SECRET_KEY above, the application refuses to start without it. Links
+# expire after ACCESS_LINK_MAX_AGE seconds, or as soon as the next collection period is started.
+ACCESS_LINK_SECRET = os.environ.get("ACCESS_LINK_SECRET", "")
+ACCESS_LINK_MAX_AGE = 60 * 60 * 24 * 90
+
+# Roster imports run on a background thread, a running job which has not reported progress for
+# ROSTER_IMPORT_TIMEOUT seconds is considered interrupted.
+ROSTER_IMPORT_BACKGROUND = True
+ROSTER_IMPORT_TIMEOUT = 600
+
+# Uploaded rosters of up to ROSTER_UPLOAD_MAX_MEMORY_SIZE bytes are imported straight from memory, larger ones
+# from their own temporary file in FILE_UPLOAD_TEMP_DIR (None for the system's temporary directory). Other
+# uploads keep Django's FILE_UPLOAD_MAX_MEMORY_SIZE.
+ROSTER_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
+FILE_UPLOAD_TEMP_DIR = None
+
+# Rosters are validated column by column in batches of ROSTER_VALIDATION_BATCH_SIZE rows before they are
+# imported. On a host with more than one CPU, rosters of more than one batch are validated by a pool of
+# ROSTER_VALIDATION_WORKERS processes (up to one per CPU). Otherwise, or when it is set to 1, they are validated
+# in the importing thread.
+ROSTER_VALIDATION_BATCH_SIZE = 5000
+ROSTER_VALIDATION_WORKERS = min(4, os.cpu_count()) if (os.cpu_count() or 1) > 1 else 1
+
+# The profiling middleware records the last REQUEST_PROFILING_BUFFER requests of each worker for the
+# administration page and logs requests slower than REQUEST_PROFILING_SLOW seconds with their SQL (None
+# disables the log). It is removed from the middleware stack unless REQUEST_PROFILING is enabled.
+REQUEST_PROFILING = False
+REQUEST_PROFILING_BUFFER = 1000
+REQUEST_PROFILING_SLOW = 1.0
+
+# The throttling middleware limits each client address to THROTTLE_RATES[prefix] = (requests, seconds) on the
+# token URLs, counted over a sliding window. The limits are generous because students on the campus network
+# share few public addresses, they are meant to stop scripts and misbehaving crawlers. The counters are kept
+# per worker ("local", at most THROTTLE_LOCAL_MAX_CLIENTS addresses) or in the shared cache ("cache"). Behind a
+# proxy set THROTTLE_CLIENT_HEADER to the META key of the header carrying the client address, e.g.
+# "HTTP_X_FORWARDED_FOR". An empty THROTTLE_RATES removes the middleware.
+THROTTLE_RATES = {
+    "/students/": (300, 60),
+    "/survey/": (600, 60),
+    "/instructors/": (120, 60),
+    "/feedback/": (300, 60),
+}
+THROTTLE_STORE = "local"
+THROTTLE_LOCAL_MAX_CLIENTS = 10000
+THROTTLE_CLIENT_HEADER = None
 
-LOGIN_REDIRECT_URL = "login"
\ No newline at end of file
+# Each worker loads the URLconf, fills the status and question caches and compiles the templates before it
+# serves its first request (see evaluations.prewarm) when PREWARM_ON_STARTUP is enabled.
+PREWARM_ON_STARTUP = True
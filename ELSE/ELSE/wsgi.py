@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ELSE.settings')
 
 application = get_wsgi_application()
+
+# Warm the worker up before it accepts requests, see evaluations.prewarm.
+if settings.PREWARM_ON_STARTUP:
+    from evaluations.prewarm import prewarm
+    prewarm()
@@ -0,0 +1,129 @@
+"""
+Response Analytics
+Author: Peter Collins
+
+Department heads compare numeric (NUM) questions across courses, subjects, instructors and terms. The
+statistics are computed by the database rather than in Python: for each scope one grouped query returns, per
+group and question, the number of responses, their mean, the mean of their squares (from which the standard
+deviation follows, SQLite has no STDDEV) and one conditional count per value of the survey scale for the
+histogram. The working tables and the term archive (see evaluations.archive) are combined with a UNION ALL so
+closed terms are included in the same query.
+
+Responses only change while a collection period is active, so results are cached under the analytics version,
+which is replaced when a collection period is stopped, a roster is imported or a term is archived (see
+evaluations.cache.bump_analytics_version).
+"""
+import math
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, FloatField, Max, Min, Q
+from evaluations.cache import analytics_version
+from evaluations.models import ArchivedResponse, Response
+
+# The values a student can give to a NUM question (see Survey.NUMBER_CHOICES).
+SCALE = range(1, 6)
+
+# The columns each scope is grouped by, as (name, path from Response, path from ArchivedResponse).
+TERM = ("term", "enrollment__course__term", "course__term")
+SCOPES = {
+    "term": [TERM],
+    "subject": [TERM, ("subject", "enrollment__course__subject", "course__subject")],
+    "instructor": [TERM, ("instructor", "enrollment__course__instructor_id", "course__instructor_email")],
+    "course": [
+        TERM,
+        ("class_number", "enrollment__course_id", "course__course_id"),
+        ("subject", "enrollment__course__subject", "course__subject"),
+        ("catalog", "enrollment__course__catalog", "course__catalog"),
+        ("section", "enrollment__course__section", "course__section"),
+        ("title", "enrollment__course__title", "course__title"),
+    ],
+}
+
+
+"""
+The aggregates function returns the annotations computed for every group and question.
+"""
+
+
+def aggregates():
+    return dict(
+        count=Count("number"),
+        mean=Avg("number"),
+        mean_square=Avg(F("number") * F("number"), output_field=FloatField()),
+        minimum=Min("number"),
+        maximum=Max("number"),
+        **{"value_%d" % value: Count("id", filter=Q(number=value)) for value in SCALE}
+    )
+
+
+"""
+The statistics_query function builds the grouped query of a scope: one row per group and question, working
+tables and archive combined, ordered by group. Question ids of archived responses are the ids the questions
+had when the term was archived. The query can be limited to one term.
+"""
+
+
+def statistics_query(scope, term=None):
+    columns = SCOPES[scope]
+    current = Response.objects.filter(question__response_type="NUM", number__isnull=False)
+    archived = ArchivedResponse.objects.filter(question__response_type="NUM", number__isnull=False)
+    if term is not None:
+        current = current.filter(enrollment__course__term=term)
+        archived = archived.filter(course__term=term)
+    current = current.values(
+        **{name: F(path) for name, path, archive_path in columns},
+        question_key=F("question_id"), prompt=F("question__prompt")
+    ).annotate(**aggregates())
+    archived = archived.values(
+        **{name: F(archive_path) for name, path, archive_path in columns},
+        question_key=F("question__question_id"), prompt=F("question__prompt")
+    ).annotate(**aggregates())
+    return current.union(archived, all=True).order_by(*[name for name, path, archive_path in columns], "question_key")
+
+
+"""
+The describe function turns one row of the grouped query into the statistics of a question. The standard
+deviation is the sample standard deviation, None for fewer than two responses.
+"""
+
+
+def describe(row):
+    count = row["count"]
+    deviation = None
+    if count > 1:
+        variance = (row["mean_square"] - row["mean"] ** 2) * count / (count - 1)
+        deviation = round(math.sqrt(max(variance, 0.0)), 2)
+    return dict(
+        question=row["question_key"],
+        prompt=row["prompt"],
+        count=count,
+        mean=round(row["mean"], 2),
+        deviation=deviation,
+        minimum=row["minimum"],
+        maximum=row["maximum"],
+        histogram={value: row["value_%d" % value] for value in SCALE}
+    )
+
+
+"""
+The question_statistics function returns the statistics of every NUM question for each group of a scope
+("term", "subject", "instructor" or "course"), optionally limited to one term. The result is a list of dicts
+holding the group's columns and the list of its questions, served from the cache when possible. An unknown
+scope raises a KeyError.
+"""
+
+
+def question_statistics(scope, term=None):
+    names = [name for name, path, archive_path in SCOPES[scope]]
+    key = "evaluations:analytics:%s:%s:%s" % (analytics_version(), scope, term)
+    groups = cache.get(key)
+    if groups is None:
+        groups = []
+        for row in statistics_query(scope, term):
+            columns = {name: row[name] for name in names}
+            if not groups or groups[-1]["columns"] != columns:
+                groups.append(dict(columns=columns, questions=[]))
+            groups[-1]["questions"].append(describe(row))
+        groups = [dict(group.pop("columns"), **group) for group in groups]
+        cache.set(key, groups, settings.ANALYTICS_CACHE_TIMEOUT)
+    return groups
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class EvaluationsConfig(AppConfig):
     name = 'evaluations'
+
+    def ready(self):
+        from evaluations.links import check_link_secret
+        check_link_secret()
@@ -0,0 +1,132 @@
+"""
+Term Archive
+Author: Peter Collins
+
+The working tables (students, instructors, courses, enrollments and responses) only hold the current term, so
+the tables and indexes the survey traffic touches stay the size of one term no matter how many years of
+evaluations are kept. Once a term is closed its courses, their reports, the questions asked and every response
+are copied into the compact archive tables (ArchivedCourse, ArchivedQuestion, ArchivedResponse), without the
+students who answered, and removed from the working tables.
+
+A term is archived by the archive_term management command, or automatically when a roster of another term is
+imported (see RegistrationParser.archive_other_terms). A term can come back into the working tables after it
+was archived, when a roster of that term is imported again. Archiving it again by hand is refused, an import
+merges it into the archive instead so it is never stopped by an old term.
+"""
+import json
+from types import SimpleNamespace
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from evaluations.cache import bump_analytics_version
+from evaluations.counters import recount
+from evaluations.models import ArchivedCourse, ArchivedQuestion, ArchivedResponse
+from evaluations.models import Course, CourseReport, Instructor, Question, Response, Student
+from evaluations.reports import group_feedback, report_results
+
+BATCH_SIZE = 2000
+
+
+class ArchiveError(Exception):
+    pass
+
+
+"""
+The archived_terms function returns the archived terms, newest first, with their number of courses,
+enrollments and evaluations.
+"""
+
+
+def archived_terms():
+    return list(ArchivedCourse.objects.values("term").annotate(
+        courses=Count("id"), enrollments=Sum("enrollment_count"), evaluated=Sum("evaluated_count")
+    ).order_by("-term"))
+
+
+"""
+The merge_reports function rebuilds the archived results of the given courses of a term from their archived
+responses, after a merge added responses to them.
+"""
+
+
+def merge_reports(term, course_ids):
+    questions = [SimpleNamespace(id=question_id, prompt=prompt, response_type=response_type)
+                 for question_id, prompt, response_type in ArchivedQuestion.objects.filter(term=term).order_by(
+                     "question_id").values_list("question_id", "prompt", "response_type")]
+    feedback = {course_id: {} for course_id in course_ids}
+    rows = ArchivedResponse.objects.filter(course__term=term, course__course_id__in=course_ids).order_by(
+        "id").values_list("course__course_id", "question__question_id", "text", "number")
+    for course_id, question_id, text, number in rows.iterator(chunk_size=BATCH_SIZE):
+        feedback[course_id].setdefault(question_id, []).append(text if number is None else number)
+    for course_id in course_ids:
+        ArchivedCourse.objects.filter(term=term, course_id=course_id).update(
+            results=json.dumps(report_results(questions, feedback[course_id])))
+
+
+"""
+The archive_term function moves a closed term from the working tables into the archive in one transaction.
+Courses whose report was never built get one built from their responses. Students and instructors left without
+enrollments or courses are removed and the dashboard totals recounted. An ArchiveError is raised when the term
+has already been archived, unless merge is set: then the courses and questions not archived yet are added, the
+responses of courses already archived are added to them, their evaluation count is increased and their results
+rebuilt. The function returns a dict with the number of courses, questions and responses archived.
+"""
+
+
+def archive_term(term, merge=False):
+    with transaction.atomic():
+        existing = dict(ArchivedCourse.objects.filter(term=term).values_list("course_id", "enrollment_count"))
+        if existing and not merge:
+            raise ArchiveError("Term %s has already been archived." % term)
+        courses = list(Course.objects.filter(term=term).select_related("instructor"))
+        merged = [course for course in courses if course.id in existing]
+        courses = [course for course in courses if course.id not in existing]
+        responses = Response.objects.filter(enrollment__course__term=term)
+        questions = Question.objects.filter(id__in=responses.values("question_id")).exclude(
+            id__in=ArchivedQuestion.objects.filter(term=term).values("question_id"))
+        ArchivedQuestion.objects.bulk_create([
+            ArchivedQuestion(term=term, question_id=question.id, prompt=question.prompt,
+                             response_type=question.response_type)
+            for question in questions
+        ], batch_size=BATCH_SIZE)
+        reports = dict(CourseReport.objects.filter(course__term=term).values_list("course_id", "results"))
+        missing = [course.id for course in courses if course.id not in reports]
+        if missing:
+            ordered = list(Question.objects.order_by("id"))
+            feedback = group_feedback(missing)
+            for course_id in missing:
+                reports[course_id] = json.dumps(report_results(ordered, feedback.get(course_id, {})))
+        ArchivedCourse.objects.bulk_create([
+            ArchivedCourse(
+                term=term, course_id=course.id, subject=course.subject, catalog=course.catalog,
+                section=course.section, title=course.title, instructor_email=course.instructor_id,
+                instructor_last_name=course.instructor.last_name, enrollment_count=course.enrollment_count,
+                evaluated_count=course.evaluated_count, results=reports[course.id])
+            for course in courses
+        ], batch_size=BATCH_SIZE)
+        for course in merged:
+            ArchivedCourse.objects.filter(term=term, course_id=course.id).update(
+                enrollment_count=max(existing[course.id], course.enrollment_count),
+                evaluated_count=F("evaluated_count") + course.evaluated_count)
+        archived_courses = dict(ArchivedCourse.objects.filter(term=term).values_list("course_id", "id"))
+        archived_questions = dict(ArchivedQuestion.objects.filter(term=term).values_list("question_id", "id"))
+        batch = []
+        archived_responses = 0
+        rows = responses.order_by("id").values_list("enrollment__course_id", "question_id", "text", "number")
+        for course_id, question_id, text, number in rows.iterator(chunk_size=BATCH_SIZE):
+            batch.append(ArchivedResponse(course_id=archived_courses[course_id],
+                                          question_id=archived_questions[question_id], text=text, number=number))
+            if len(batch) == BATCH_SIZE:
+                ArchivedResponse.objects.bulk_create(batch)
+                archived_responses += len(batch)
+                batch = []
+        ArchivedResponse.objects.bulk_create(batch)
+        archived_responses += len(batch)
+        if merged:
+            merge_reports(term, [course.id for course in merged])
+        Course.objects.filter(term=term).delete()
+        Student.objects.filter(enrollment__isnull=True).delete()
+        Instructor.objects.filter(course__isnull=True).delete()
+        recount([])
+        bump_analytics_version()
+    return dict(term=term, courses=len(courses) + len(merged), questions=len(archived_questions),
+                responses=archived_responses)
@@ -0,0 +1,53 @@
+"""
+Benchmark Baselines
+Author: Peter Collins
+
+Benchmark results are saved per profile (the options the benchmark was run with) in baselines.json next to
+this module. A later run of the same profile is compared against the saved result and every metric which grew
+by more than its tolerance is reported as a regression. Query counts do not depend on the machine so their
+tolerance is tight, times and memory are given more room.
+"""
+import json
+import os
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+TOLERANCES = {"seconds": 1.0, "per_request": 1.0, "queries": 0.1, "peak_bytes": 0.5}
+
+
+def profile_key(**options):
+    return ",".join("%s=%s" % (name, options[name]) for name in sorted(options))
+
+
+def load(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baselines:
+        return json.load(baselines)
+
+
+def save(profile, results, path=BASELINES_PATH):
+    baselines = load(path)
+    baselines[profile] = results
+    with open(path, "w") as output:
+        json.dump(baselines, output, indent=2, sort_keys=True)
+        output.write("\n")
+
+
+"""
+The regressions function compares results with a baseline and returns a list of messages, one per metric
+which exceeds the baseline by more than its tolerance.
+"""
+
+
+def regressions(results, baseline, tolerances=TOLERANCES):
+    messages = []
+    for stage, metrics in sorted(results.items()):
+        for metric, value in sorted(metrics.items()):
+            expected = baseline.get(stage, {}).get(metric)
+            if expected is None or metric not in tolerances:
+                continue
+            limit = expected * (1 + tolerances[metric])
+            if value > limit:
+                messages.append("%s %s: %s exceeds baseline %s (limit %s)" % (
+                    stage, metric, round(value, 4), round(expected, 4), round(limit, 4)))
+    return messages
@@ -0,0 +1,73 @@
+"""
+Worker Boot
+Author: Peter Collins
+
+Started as a separate process by evaluations.benchmarks.startup (python -m evaluations.benchmarks.boot), this
+module boots a worker the way ELSE.wsgi does against the given scratch database, with DEBUG disabled and an
+empty process local cache as after a restart, optionally prewarms it and then serves the same request twice
+through the WSGI application. It prints the timings as JSON. Only the standard library is imported before the
+clock starts, so nothing here is loaded on behalf of the worker.
+"""
+import json
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+
+"""
+The request function calls the WSGI application with a GET request for path and returns the status code and
+the seconds until the whole response was read.
+"""
+
+
+def request(application, path):
+    environ = dict(PATH_INFO=path, HTTP_HOST="127.0.0.1")
+    setup_testing_defaults(environ)
+    statuses = []
+    started = time.perf_counter()
+    response = application(environ, lambda status, headers: statuses.append(status))
+    try:
+        b"".join(response)
+    finally:
+        response.close()
+    return int(statuses[0].split()[0]), time.perf_counter() - started
+
+
+"""
+The boot function boots a worker and returns its timings, spawned being the time.time() at which the parent
+started the process.
+"""
+
+
+def boot(spawned, database, path, warm):
+    started = time.time()
+    from django.conf import settings
+    settings.DATABASES["default"]["NAME"] = database
+    settings.DEBUG = False
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    settings.THROTTLE_RATES = {}
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+    booted = time.time()
+    if warm:
+        from evaluations.prewarm import prewarm
+        prewarm()
+    ready = time.time()
+    status, first = request(application, path)
+    second_status, second = request(application, path)
+    return dict(
+        interpreter=started - spawned,
+        boot=booted - started,
+        prewarm=ready - booted,
+        ready=ready - spawned,
+        first_request=first,
+        second_request=second,
+        first_response=ready - spawned + first,
+        statuses=[status, second_status],
+        modules=len(sys.modules),
+        xlrd="xlrd" in sys.modules,
+    )
+
+
+if __name__ == "__main__":
+    print(json.dumps(boot(float(sys.argv[1]), sys.argv[2], sys.argv[3], sys.argv[4] == "1")))
@@ -0,0 +1,205 @@
+"""
+Concurrent Submission Benchmark
+Author: Peter Collins
+
+Simulates a class receiving its invitation emails at once: many threads post survey submissions through the
+Django test client against a scratch SQLite file, every enrollment submitted more than once so completion
+races as well, while reader threads keep opening the students' landing pages. The run is repeated with
+Django's stock SQLite backend and with the tuned backend of evaluations.db.sqlite3 (WAL, pragmas, BEGIN
+IMMEDIATE and retried writes) to compare throughput and error rate.
+
+Afterwards the submissions the clients were told were saved are compared with the evaluations actually stored.
+With the stock backend they can differ: a submission whose transaction committed can still fail afterwards
+with "database is locked" and answer with an error page. That is one of the results being measured, not a
+failure of the benchmark. The tuned backend must keep them equal.
+"""
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import Client
+from evaluations.benchmarks.cycle import QUESTIONS, answers
+from evaluations.benchmarks.environment import scratch_environment
+from evaluations.benchmarks.roster import write_roster
+from evaluations.cache import set_status
+from evaluations.links import link
+from evaluations.models import Enrollment, Question, Response
+from evaluations.registration_parser import RegistrationParser
+
+MODES = {
+    "stock": dict(engine="django.db.backends.sqlite3", retries=0),
+    "tuned": dict(engine="evaluations.db.sqlite3", retries=None),
+}
+
+
+"""
+The database_engine context manager switches the default database to another backend engine. Connections are
+opened lazily per thread, so every thread started inside the block connects with the given engine.
+"""
+
+
+@contextmanager
+def database_engine(engine):
+    settings_dict = connections.databases[DEFAULT_DB_ALIAS]
+    saved = dict(settings_dict)
+    connection.close()
+    del connections[DEFAULT_DB_ALIAS]
+    settings_dict["ENGINE"] = engine
+    try:
+        yield
+    finally:
+        connection.close()
+        del connections[DEFAULT_DB_ALIAS]
+        settings_dict.clear()
+        settings_dict.update(saved)
+
+
+"""
+The prepare function imports a synthetic roster into the scratch database, creates the questions and opens
+a collection period. It returns the survey links of every enrollment, the landing page links of every student
+and the questions.
+"""
+
+
+def prepare(directory, students, courses, per_student):
+    roster_path = os.path.join(directory, "roster.csv")
+    write_roster(roster_path, students=students, courses=courses, sections=1, per_student=per_student)
+    Question.objects.bulk_create([Question(prompt=prompt, response_type=response_type)
+                                  for prompt, response_type in QUESTIONS])
+    RegistrationParser(roster_path).parse_all()
+    status = set_status(active=True, populated=True, period=1)
+    links = [link("survey", [student_id, course_id], status.period)
+             for student_id, course_id in Enrollment.objects.values_list("student_id", "course_id")]
+    pages = [link("student", [student_id], status.period)
+             for student_id in Enrollment.objects.values_list("student_id", flat=True).distinct()]
+    return links, pages, list(Question.objects.order_by("id"))
+
+
+"""
+The submit function is run by every worker thread. It posts the submissions taken from the queue and counts
+the outcome of each: saved, rejected as already completed, or an error (an exception or unexpected response).
+"""
+
+
+def submit(submissions, questions, barrier, outcomes, latencies, lock):
+    client = Client()
+    counts = dict(saved=0, duplicates=0, errors=0)
+    timings = []
+    barrier.wait()
+    try:
+        while True:
+            try:
+                index, path = submissions.get_nowait()
+            except queue.Empty:
+                break
+            started = time.perf_counter()
+            try:
+                response = client.post(path, answers(questions, index))
+                if b"Survey responses saved" in response.content:
+                    counts["saved"] += 1
+                elif b"already completed" in response.content:
+                    counts["duplicates"] += 1
+                else:
+                    counts["errors"] += 1
+            except Exception:
+                counts["errors"] += 1
+            timings.append(time.perf_counter() - started)
+    finally:
+        connection.close()
+    with lock:
+        for outcome, count in counts.items():
+            outcomes[outcome] += count
+        latencies.extend(timings)
+
+
+"""
+The read function is run by every reader thread. It opens random landing pages until done is set and counts
+the pages read and the errors.
+"""
+
+
+def read(pages, done, barrier, outcomes, lock, seed):
+    client = Client()
+    generator = random.Random(seed)
+    counts = dict(reads=0, read_errors=0)
+    barrier.wait()
+    try:
+        while not done.is_set():
+            try:
+                response = client.get(generator.choice(pages))
+                counts["reads" if response.status_code == 200 else "read_errors"] += 1
+            except Exception:
+                counts["read_errors"] += 1
+    finally:
+        connection.close()
+    with lock:
+        for outcome, count in counts.items():
+            outcomes[outcome] += count
+
+
+"""
+The run_mode function runs the benchmark with one of MODES and returns its results. stored is the number of
+enrollments marked evaluated in the database, consistent whether it equals the number of submissions reported
+as saved and every one of them has its responses.
+"""
+
+
+def run_mode(mode, threads, readers, students, courses, per_student, repeats, seed):
+    options = MODES[mode]
+    settings = {} if options["retries"] is None else {"SQLITE_LOCK_RETRIES": options["retries"]}
+    with tempfile.TemporaryDirectory() as directory, database_engine(options["engine"]), \
+            scratch_environment(os.path.join(directory, "stress.sqlite3"), **settings):
+        links, pages, questions = prepare(directory, students, courses, per_student)
+        work = [(index, path) for index, path in enumerate(links) for repeat in range(repeats)]
+        random.Random(seed).shuffle(work)
+        submissions = queue.Queue()
+        for item in work:
+            submissions.put(item)
+        outcomes = dict(saved=0, duplicates=0, errors=0, reads=0, read_errors=0)
+        latencies = []
+        lock = threading.Lock()
+        done = threading.Event()
+        barrier = threading.Barrier(threads + readers + 1)
+        workers = [threading.Thread(target=submit, args=(submissions, questions, barrier, outcomes, latencies,
+                                                         lock)) for thread in range(threads)]
+        reading = [threading.Thread(target=read, args=(pages, done, barrier, outcomes, lock, seed + thread))
+                   for thread in range(readers)]
+        for thread in workers + reading:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        seconds = time.perf_counter() - started
+        done.set()
+        for thread in reading:
+            thread.join()
+        latencies.sort()
+        evaluated = Enrollment.objects.filter(evaluated=True).count()
+        return dict(
+            stored=evaluated,
+            requests=len(work),
+            seconds=seconds,
+            requests_per_second=len(work) / seconds,
+            error_rate=outcomes["errors"] / len(work),
+            reads_per_second=outcomes["reads"] / seconds,
+            p50=latencies[len(latencies) // 2],
+            p95=latencies[int(len(latencies) * 0.95)],
+            consistent=(evaluated == outcomes["saved"] and
+                        Response.objects.count() == outcomes["saved"] * len(questions)),
+            **outcomes
+        )
+
+
+"""
+The run function runs every mode with the same workload and returns the results per mode.
+"""
+
+
+def run(threads=16, readers=4, students=200, courses=10, per_student=3, repeats=2, seed=0):
+    return {mode: run_mode(mode, threads, readers, students, courses, per_student, repeats, seed)
+            for mode in MODES}
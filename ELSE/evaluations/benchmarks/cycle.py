@@ -0,0 +1,107 @@
+"""
+Collection Cycle Benchmark
+Author: Peter Collins
+
+Runs a full collection cycle through the Django test client, the way an administrator, the students and the
+instructors would: import a roster, start the collection period, submit a survey for every enrollment, stop
+the period and open the feedback page of every course. Each stage records its wall time, number of queries
+and peak memory allocated. Must be run inside benchmarks.environment.scratch_environment.
+"""
+import time
+import tracemalloc
+from contextlib import contextmanager
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from evaluations.links import link
+from evaluations.models import Course, Enrollment, Question, Status
+
+QUESTIONS = [
+    ("How well did the T.A. explain the lab?", "NUM"),
+    ("How well prepared was the T.A.?", "NUM"),
+    ("How approachable was the T.A.?", "NUM"),
+    ("What could be improved?", "TXT"),
+]
+
+
+class StageTimer():
+    """
+    The StageTimer class collects the metrics of each stage of the cycle in its results dict. Queries are
+    counted with an execute wrapper because connection.queries only keeps the last 9000.
+    """
+
+    def __init__(self):
+        self.results = {}
+
+    @contextmanager
+    def stage(self, name):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        tracemalloc.start()
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            yield
+            seconds = time.perf_counter() - started
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.results[name] = dict(seconds=seconds, queries=len(queries), peak_bytes=peak)
+
+
+"""
+The answers function returns the POST data of a survey submission for the given questions.
+"""
+
+
+def answers(questions, index):
+    return {
+        "response-%d" % question.id: str(index % 5 + 1) if question.response_type == "NUM" else "Comment %d" % index
+        for question in questions
+    }
+
+
+"""
+The run_cycle function runs every stage against the roster at roster_path and returns the metrics per stage.
+Any unexpected response aborts the benchmark with an AssertionError.
+"""
+
+
+def run_cycle(roster_path):
+    timer = StageTimer()
+    User.objects.create_superuser("benchmark", "benchmark@scu.edu", "benchmark")
+    admin = Client()
+    admin.login(username="benchmark", password="benchmark")
+    for prompt, response_type in QUESTIONS:
+        admin.post("/questions", {"question-prompt": prompt, "question-type": response_type,
+                                  "question-action": "Save"})
+    with open(roster_path, "rb") as roster, timer.stage("import"):
+        response = admin.post("/parser", {"registration-roster": roster})
+    assert b"import started" in response.content, response.content
+    with timer.stage("start"):
+        response = admin.post("/administration/", {"admin-action": "Start"})
+    assert b"collection period has begun" in response.content, response.content
+    period = Status.objects.get(id=1).period
+    questions = list(Question.objects.order_by("id"))
+    enrollments = list(Enrollment.objects.order_by("id"))
+    student = Client()
+    with timer.stage("survey"):
+        for index, enrollment in enumerate(enrollments):
+            response = student.post(link("survey", [enrollment.student_id, enrollment.course_id], period),
+                                    answers(questions, index))
+            assert b"Survey responses saved" in response.content, response.content
+    with timer.stage("stop"):
+        response = admin.post("/administration/", {"admin-action": "Stop"})
+    assert b"collection period has ended" in response.content, response.content
+    courses = list(Course.objects.order_by("id"))
+    instructor = Client()
+    with timer.stage("feedback"):
+        for course in courses:
+            response = instructor.get(link("feedback", [course.instructor_id, course.id], period))
+            assert response.status_code == 200 and b"Feedback for" in response.content, response.content
+    results = timer.results
+    results["survey"]["per_request"] = results["survey"]["seconds"] / max(len(enrollments), 1)
+    results["feedback"]["per_request"] = results["feedback"]["seconds"] / max(len(courses), 1)
+    return results
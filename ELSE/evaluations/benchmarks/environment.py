@@ -0,0 +1,34 @@
+"""
+Benchmark Environment
+Author: Peter Collins
+
+Benchmarks must never touch the real database, cache or mail server. The scratch_environment context manager
+sets up the same isolated environment the Django test runner uses: a freshly migrated test database, the
+locmem email backend and a process local cache, emptied on entry since locmem caches keep their contents in
+the process across settings changes. Roster imports run inline so their cost is measured, and
+throttling is turned off since every simulated student sends its requests from the same address.
+"""
+from contextlib import contextmanager
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def scratch_environment(database_name=None, **settings):
+    if database_name:
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = database_name
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(
+            ROSTER_IMPORT_BACKGROUND=False,
+            THROTTLE_RATES={},
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+            **settings
+        ):
+            cache.clear()
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
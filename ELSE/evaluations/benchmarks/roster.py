@@ -0,0 +1,157 @@
+"""
+Synthetic Registration Rosters
+Author: Peter Collins
+
+Generates realistic registration rosters for benchmarking the import and the collection cycle. A roster has
+the same columns as the registrar's export: every student is enrolled in a number of sections spread over the
+generated courses, each section has its own class number and instructor, and some enrollments are dropped.
+Rosters can be written as CSV/TSV, xlsx or (when xlwt is installed) legacy xls.
+"""
+import csv
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+HEADERS = [
+    "Student ID", "Student Email", "Instructor", "Instructor Email", "Class Nbr", "Term", "Subject", "Catalog",
+    "Title", "Section", "Tot Enrl", "Unit Taken", "Campus", "Location", "Comb Sect", "Career", "Component",
+    "Session", "Class Type", "Grade Base", "Drop Dt", "Add Dt", "Grade"
+]
+SUBJECTS = ["COEN", "ELEN", "MECH", "CENG", "BIOE", "AMTH"]
+LAST_NAMES = ["Smith", "Nguyen", "Garcia", "Patel", "Kim", "Chen", "Johnson", "Lopez", "Singh", "Brown"]
+TERM = 4000
+ADD_DATE = 43700.0
+
+
+"""
+The generate_rows function yields one list of values per enrollment. Numbers are returned as floats and dates
+as Excel serial numbers, as xlrd reads them from a workbook.
+"""
+
+
+def generate_rows(students=1000, courses=50, sections=2, per_student=3, seed=0):
+    generator = random.Random(seed)
+    offerings = []
+    for course in range(courses):
+        subject = SUBJECTS[course % len(SUBJECTS)]
+        catalog = "%d%sL" % (10 + course, "" if course % 2 else "A")
+        for section in range(1, sections + 1):
+            instructor = "%s%d" % (generator.choice(LAST_NAMES), len(offerings) // 3)
+            offerings.append(dict(
+                number=20000 + len(offerings), subject=subject, catalog=catalog, section=section,
+                title="%s %s Laboratory" % (subject, catalog), instructor=instructor,
+                instructor_email=instructor.lower() + "@scu.edu"))
+    for student in range(students):
+        student_id = "W%07d" % (1000000 + student)
+        for offering in generator.sample(offerings, min(per_student, len(offerings))):
+            dropped = generator.random() < 0.05
+            yield [
+                student_id, student_id.lower() + "@scu.edu", offering["instructor"], offering["instructor_email"],
+                float(offering["number"]), float(TERM), offering["subject"], " " + offering["catalog"],
+                offering["title"], float(offering["section"]), 30.0, 1.0, "MAIN", 1.0, "", "UGRD", "LAB", 1.0,
+                "E", "GRD", ADD_DATE + generator.randint(10, 40) if dropped else "",
+                ADD_DATE - generator.randint(0, 60), ""
+            ]
+
+
+def write_csv(path, rows, delimiter=","):
+    with open(path, "w", newline="") as roster:
+        writer = csv.writer(roster, delimiter=delimiter)
+        writer.writerow(HEADERS)
+        for row in rows:
+            writer.writerow(["%g" % value if isinstance(value, float) else value for value in row])
+
+
+"""
+The write_xlsx function writes a minimal single sheet Office Open XML workbook. Strings are stored inline so
+the sheet can be written in one streaming pass.
+"""
+
+
+def write_xlsx(path, rows):
+    namespace = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    relationships = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    package = "http://schemas.openxmlformats.org/package/2006/relationships"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'))
+        archive.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="%s">'
+            '<Relationship Id="rId1" Type="%s/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>' % (package, relationships)))
+        archive.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8"?><workbook xmlns="%s" xmlns:r="%s">'
+            '<sheets><sheet name="Roster" sheetId="1" r:id="rId1"/></sheets></workbook>'
+            % (namespace, relationships)))
+        archive.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="%s">'
+            '<Relationship Id="rId1" Type="%s/worksheet" Target="worksheets/sheet1.xml"/>'
+            '</Relationships>' % (package, relationships)))
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(('<?xml version="1.0" encoding="UTF-8"?><worksheet xmlns="%s"><sheetData>'
+                         % namespace).encode())
+            for row in xlsx_rows(rows):
+                sheet.write(row.encode())
+            sheet.write(b"</sheetData></worksheet>")
+
+
+def xlsx_rows(rows):
+    yield xlsx_row(HEADERS)
+    for values in rows:
+        yield xlsx_row(values)
+
+
+def xlsx_row(values):
+    cells = []
+    for value in values:
+        if value == "":
+            cells.append("<c/>")
+        elif isinstance(value, float):
+            cells.append("<c><v>%r</v></c>" % value)
+        else:
+            cells.append('<c t="inlineStr"><is><t>%s</t></is></c>' % escape(value))
+    return "<row>%s</row>" % "".join(cells)
+
+
+def write_xls(path, rows):
+    try:
+        import xlwt
+    except ImportError:
+        raise ImportError("Writing .xls rosters requires the xlwt package.")
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet("Roster")
+    for column, header in enumerate(HEADERS):
+        sheet.write(0, column, header)
+    for index, row in enumerate(rows, 1):
+        for column, value in enumerate(row):
+            sheet.write(index, column, value)
+    workbook.save(path)
+
+
+WRITERS = {
+    ".csv": write_csv,
+    ".tsv": lambda path, rows: write_csv(path, rows, "\t"),
+    ".xlsx": write_xlsx,
+    ".xls": write_xls,
+}
+
+
+"""
+The write_roster function generates a roster and writes it in the format given by the extension of path.
+The number of rows written is returned.
+"""
+
+
+def write_roster(path, **options):
+    rows = list(generate_rows(**options))
+    WRITERS[os.path.splitext(path)[1].lower()](path, rows)
+    return len(rows)
@@ -0,0 +1,88 @@
+"""
+Worker Startup Benchmark
+Author: Peter Collins
+
+Measures how long a new worker takes before it can answer a student. A scratch database is prepared with a
+roster, the questions and an active collection period, then fresh worker processes are started one after the
+other (see evaluations.benchmarks.boot), each booting the WSGI application and requesting a survey page twice.
+Half of the workers are prewarmed (see evaluations.prewarm) before their first request, the other half are
+not, which compares what the first student waits for in each case.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from django.conf import settings
+from django.db import connection
+from evaluations.benchmarks.cycle import QUESTIONS
+from evaluations.benchmarks.environment import scratch_environment
+from evaluations.benchmarks.roster import write_roster
+from evaluations.cache import set_status
+from evaluations.links import link
+from evaluations.models import Enrollment, Question
+from evaluations.registration_parser import RegistrationParser
+
+MODES = {
+    "cold": False,
+    "prewarmed": True,
+}
+
+TIMINGS = ("interpreter", "boot", "prewarm", "ready", "first_request", "second_request", "first_response")
+
+
+"""
+The prepare function imports a synthetic roster into the scratch database, creates the questions and opens a
+collection period. It returns the survey link of the first enrollment.
+"""
+
+
+def prepare(directory, students, courses):
+    roster_path = os.path.join(directory, "roster.csv")
+    write_roster(roster_path, students=students, courses=courses, sections=1, per_student=2)
+    Question.objects.bulk_create([Question(prompt=prompt, response_type=response_type)
+                                  for prompt, response_type in QUESTIONS])
+    RegistrationParser(roster_path).parse_all()
+    status = set_status(active=True, populated=True, period=1)
+    enrollment = Enrollment.objects.order_by("id").first()
+    return link("survey", [enrollment.student_id, enrollment.course_id], status.period)
+
+
+"""
+The boot_worker function starts one worker process against the database and returns its timings.
+"""
+
+
+def boot_worker(database, path, warm):
+    arguments = [sys.executable, "-m", "evaluations.benchmarks.boot", repr(time.time()), database, path,
+                 "1" if warm else "0"]
+    output = subprocess.run(arguments, cwd=settings.BASE_DIR, check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+"""
+The run function boots the given number of workers in each of MODES, alternating the modes so both see the
+same state of the host, and returns per mode the median of every timing, the number of modules loaded, whether
+xlrd was loaded and the status codes of all requests.
+"""
+
+
+def run(workers=5, students=50, courses=5):
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "startup.sqlite3")
+        with scratch_environment(database):
+            path = prepare(directory, students, courses)
+            connection.close()
+            samples = {mode: [] for mode in MODES}
+            for worker in range(workers):
+                for mode, warm in MODES.items():
+                    samples[mode].append(boot_worker(database, path, warm))
+    results = {}
+    for mode, runs in samples.items():
+        result = {timing: statistics.median(run[timing] for run in runs) for timing in TIMINGS}
+        result.update(modules=max(run["modules"] for run in runs), xlrd=any(run["xlrd"] for run in runs),
+                      statuses=sorted({status for run in runs for status in run["statuses"]}))
+        results[mode] = result
+    return results
@@ -0,0 +1,194 @@
+"""
+Response Storage Benchmark
+Author: Peter Collins
+
+Compares the two ways responses have been stored, through the ORM code the application runs rather than raw
+SQL. The legacy layout used multi-table inheritance, a shared response row plus a row in a text or number
+table. The compact layout keeps the answer in a nullable text or number column of the response row.
+
+Both layouts are measured in a scratch database holding the same synthetic roster and questions. The compact
+layout uses the current code: Survey.save_survey for every submission and group_feedback for the report. For
+the legacy layout the database is migrated back to the migration the compact layout (COMPACT_MIGRATION)
+depends on and the code the compact layout replaced is run against the historical models of that
+migration: the shared rows bulk created and read back, the subtype rows inserted with one executemany per
+table, in the same transaction as Survey.save_survey, and the report read from both subtype tables.
+"""
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.loader import MigrationLoader
+from evaluations.benchmarks.environment import scratch_environment
+from evaluations.benchmarks.roster import write_roster
+from evaluations.counters import record_evaluation
+from evaluations.models import Enrollment, Question
+from evaluations.registration_parser import RegistrationParser
+from evaluations.reports import group_feedback
+from evaluations.views import Survey
+
+# Migrations are looked up by name without their number, so renumbering them does not break the benchmark.
+COMPACT_MIGRATION = "single_table_responses"
+
+
+"""
+The prepare function imports a synthetic roster of about the given number of enrollments and creates the
+questions, every third one a text question. It returns the enrollments and the questions.
+"""
+
+
+def prepare(directory, enrollments, questions, courses):
+    roster_path = os.path.join(directory, "roster.csv")
+    write_roster(roster_path, students=max(1, enrollments // 4), courses=courses, sections=1, per_student=4)
+    RegistrationParser(roster_path).parse_all()
+    Question.objects.bulk_create([
+        Question(prompt="Question %d" % number, response_type="TXT" if number % 3 == 0 else "NUM")
+        for number in range(1, questions + 1)
+    ])
+    return list(Enrollment.objects.order_by("id")[:enrollments]), list(Question.objects.order_by("id"))
+
+
+"""
+The submissions function generates the answers of every enrollment as lists of (question, feedback).
+"""
+
+
+def submissions(enrollments, questions, seed):
+    generator = random.Random(seed)
+    for enrollment in enrollments:
+        yield enrollment, [
+            (question, "Comment %d" % generator.randrange(10 ** 6) if question.response_type == "TXT"
+             else generator.randint(1, 5))
+            for question in questions
+        ]
+
+
+"""
+The legacy_save_survey function stores a submission the way Survey.save_survey did with the legacy layout.
+"""
+
+
+def legacy_save_survey(models, enrollment, answers):
+    with transaction.atomic():
+        if not Enrollment.objects.filter(id=enrollment.id, evaluated=False).update(evaluated=True):
+            return False
+        models["Response"].objects.bulk_create([
+            models["Response"](enrollment_id=enrollment.id, question_id=question.id) for question, feedback in answers
+        ])
+        response_ids = dict(models["Response"].objects.filter(enrollment_id=enrollment.id).order_by(
+            "id").values_list("question_id", "id"))
+        for name, response_type in (("TextResponse", "TXT"), ("NumberResponse", "NUM")):
+            rows = [(response_ids[question.id], feedback)
+                    for question, feedback in answers if question.response_type == response_type]
+            if rows:
+                with connection.cursor() as cursor:
+                    cursor.executemany("INSERT INTO %s (response_ptr_id, feedback) VALUES (%%s, %%s)" %
+                                       connection.ops.quote_name(models[name]._meta.db_table), rows)
+        record_evaluation(enrollment.course_id)
+    return True
+
+
+"""
+The legacy_group_feedback function reads the feedback of every course the way group_feedback did with the
+legacy layout.
+"""
+
+
+def legacy_group_feedback(models):
+    feedback = defaultdict(lambda: defaultdict(list))
+    for name in ("TextResponse", "NumberResponse"):
+        rows = models[name].objects.order_by("id").values_list("enrollment__course_id", "question_id", "feedback")
+        for course_id, question_id, value in rows.iterator():
+            feedback[course_id][question_id].append(value)
+    return feedback
+
+
+"""
+The legacy_migration function returns the key of the migration COMPACT_MIGRATION depends on, the last one with
+the legacy layout.
+"""
+
+
+def legacy_migration():
+    loader = MigrationLoader(connection)
+    compact = next(key for key in loader.disk_migrations
+                   if key[0] == "evaluations" and key[1].split("_", 1)[1] == COMPACT_MIGRATION)
+    return loader.disk_migrations[compact].dependencies[0]
+
+
+"""
+The legacy_models function migrates the scratch database back to legacy_migration and returns the historical
+response models of that migration by name.
+"""
+
+
+def legacy_models():
+    legacy = legacy_migration()
+    executor = MigrationExecutor(connection)
+    executor.migrate([legacy])
+    apps = executor.loader.project_state(legacy).apps
+    return {name: apps.get_model("evaluations", name) for name in ("Response", "TextResponse", "NumberResponse")}
+
+
+"""
+The measure function stores every submission with save, then reads the feedback with report, and returns the
+results of one layout.
+"""
+
+
+def measure(save, report, enrollments, questions, seed, database):
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    with connection.execute_wrapper(count):
+        for enrollment, answers in submissions(enrollments, questions, seed):
+            save(enrollment, answers)
+    insert_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    feedback = report()
+    report_seconds = time.perf_counter() - started
+    rows = sum(len(values) for course in feedback.values() for values in course.values())
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    responses = len(enrollments) * len(questions)
+    return dict(
+        responses=responses,
+        insert_seconds=insert_seconds,
+        inserts_per_second=responses / insert_seconds,
+        queries_per_submission=len(queries) / len(enrollments),
+        report_rows=rows,
+        report_seconds=report_seconds,
+        report_rows_per_second=rows / report_seconds,
+        database_bytes=os.path.getsize(database)
+    )
+
+
+"""
+The run function benchmarks both layouts with the same roster and submissions and returns a dict of results
+per layout: responses inserted per second, queries per submission, report rows read per second and the size
+of the database file.
+"""
+
+
+def run(enrollments=2000, questions=8, courses=50, seed=0):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("legacy", "compact"):
+            database = os.path.join(directory, name + ".sqlite3")
+            with scratch_environment(database):
+                rows, question_rows = prepare(directory, enrollments, questions, courses)
+                if name == "legacy":
+                    models = legacy_models()
+                    results[name] = measure(
+                        lambda enrollment, answers: legacy_save_survey(models, enrollment, answers),
+                        lambda: legacy_group_feedback(models), rows, question_rows, seed, database)
+                else:
+                    survey = Survey()
+                    results[name] = measure(survey.save_survey, group_feedback, rows, question_rows, seed, database)
+    return results
@@ -0,0 +1,133 @@
+"""
+ELSE Caching
+Author: Peter Collins
+
+Every public view checks the collection status before doing anything else. The status only changes when an
+administrator starts or stops a collection period or imports a roster, so it is served from Django's cache
+framework instead of the database. The default cache is file based (see settings.CACHES) so all gunicorn
+workers on a host share it and see a change as soon as it is made.
+
+Questions cannot change while a collection period is active, so the question set and the survey form rendered
+from it are cached as well. Both are stored under a version which the Questions view replaces whenever a
+question is saved or deleted. The response analytics (see evaluations.analytics) are versioned the same way,
+their version is replaced whenever the responses they summarize can have changed for good: when a collection
+period is stopped, a roster is imported or a term is archived.
+"""
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from evaluations.models import Question, Status
+
+STATUS_KEY = "evaluations:status"
+QUESTIONS_VERSION_KEY = "evaluations:questions:version"
+ANALYTICS_VERSION_KEY = "evaluations:analytics:version"
+
+
+"""
+The get_status function returns the collection Status. When no roster has ever been imported an unsaved Status
+with the default values is returned, so callers can always read active and populated.
+"""
+
+
+def get_status():
+    status = cache.get(STATUS_KEY)
+    if status is None:
+        status = Status.objects.filter(id=1).first() or Status(id=1)
+        cache.add(STATUS_KEY, status, settings.STATUS_CACHE_TIMEOUT)
+    return status
+
+
+"""
+The set_status function updates (or creates) the Status row with the given fields and stores the new value in
+the cache once the surrounding transaction commits. Readers only ever add a missing cache entry, so a reader
+holding an older value cannot overwrite the one stored here. The updated Status is returned.
+"""
+
+
+def set_status(**fields):
+    status, created = Status.objects.update_or_create(id=1, defaults=fields)
+    transaction.on_commit(lambda: cache.set(
+        STATUS_KEY, status, settings.STATUS_CACHE_TIMEOUT))
+    return status
+
+
+"""
+The questions_version function returns the current version of the question set. A new random version is
+used whenever none is cached, so a version is never reused for a different question set.
+"""
+
+
+def questions_version():
+    version = cache.get(QUESTIONS_VERSION_KEY)
+    if version is None:
+        cache.add(QUESTIONS_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(QUESTIONS_VERSION_KEY)
+    return version
+
+
+"""
+The bump_questions_version function invalidates the cached question set and survey form once the surrounding
+transaction commits.
+"""
+
+
+def bump_questions_version():
+    transaction.on_commit(lambda: cache.set(
+        QUESTIONS_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+"""
+The analytics_version function returns the current version of the response analytics, like questions_version.
+"""
+
+
+def analytics_version():
+    version = cache.get(ANALYTICS_VERSION_KEY)
+    if version is None:
+        cache.add(ANALYTICS_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(ANALYTICS_VERSION_KEY)
+    return version
+
+
+"""
+The bump_analytics_version function invalidates the cached response analytics once the surrounding
+transaction commits.
+"""
+
+
+def bump_analytics_version():
+    transaction.on_commit(lambda: cache.set(
+        ANALYTICS_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+"""
+The get_questions function returns the list of questions ordered by id.
+"""
+
+
+def get_questions():
+    key = "evaluations:questions:%s" % questions_version()
+    questions = cache.get(key)
+    if questions is None:
+        questions = list(Question.objects.order_by("id"))
+        cache.set(key, questions, settings.QUESTIONS_CACHE_TIMEOUT)
+    return questions
+
+
+"""
+The get_survey_form function returns the question rows of the survey form. They only depend on the question
+set, so they are rendered once per version and shared by every survey page.
+"""
+
+
+def get_survey_form():
+    key = "evaluations:survey-form:%s" % questions_version()
+    survey_form = cache.get(key)
+    if survey_form is None:
+        survey_form = render_to_string(
+            "survey_questions.html", {"questions": get_questions()})
+        cache.set(key, survey_form, settings.QUESTIONS_CACHE_TIMEOUT)
+    return mark_safe(survey_form)
@@ -0,0 +1,101 @@
+"""
+Dashboard Counters
+Author: Peter Collins
+
+The administration dashboard shows how many instructors, courses, students, enrollments and completed
+evaluations exist. Rather than counting the tables on every page view, the totals are kept in the Counters
+row (and the per course totals on Course) and adjusted with F expressions by the roster import and by survey
+submission, so reading them is a single row lookup.
+"""
+from django.db.models import Count, F, Q
+from evaluations.models import Counters, Course, Enrollment, Instructor, Student
+
+FIELDS = ("instructors", "courses", "students", "enrollments", "evaluated")
+
+
+"""
+The get_counters function returns the Counters row, or an unsaved row of zeros before the first import.
+"""
+
+
+def get_counters():
+    return Counters.objects.filter(id=1).first() or Counters(id=1)
+
+
+"""
+The reset_counters function sets every total to zero. It is called when the roster is flushed.
+"""
+
+
+def reset_counters():
+    Counters.objects.update_or_create(id=1, defaults={field: 0 for field in FIELDS})
+
+
+"""
+The add_counts function increments the given totals, e.g. add_counts(students=10, enrollments=30).
+"""
+
+
+def add_counts(**counts):
+    updated = Counters.objects.filter(id=1).update(
+        **{field: F(field) + count for field, count in counts.items()})
+    if not updated:
+        Counters.objects.create(id=1, **counts)
+
+
+"""
+The recount function recomputes the totals of the given courses and of the dashboard from the tables. It is
+used after changes which are easier to count than to track, such as an incremental roster import.
+"""
+
+
+def recount(course_ids):
+    totals = {
+        row["course_id"]: row
+        for row in Enrollment.objects.filter(course_id__in=course_ids).values("course_id").annotate(
+            enrollments=Count("id"), evaluated=Count("id", filter=Q(evaluated=True))).order_by()
+    }
+    courses = list(Course.objects.filter(id__in=course_ids).only("id"))
+    for course in courses:
+        course.enrollment_count = totals.get(course.id, {}).get("enrollments", 0)
+        course.evaluated_count = totals.get(course.id, {}).get("evaluated", 0)
+    Course.objects.bulk_update(courses, ["enrollment_count", "evaluated_count"], batch_size=500)
+    Counters.objects.update_or_create(id=1, defaults=dict(
+        instructors=Instructor.objects.count(),
+        courses=Course.objects.count(),
+        students=Student.objects.count(),
+        enrollments=Enrollment.objects.count(),
+        evaluated=Enrollment.objects.filter(evaluated=True).count()
+    ))
+
+
+"""
+The record_evaluation function counts a completed survey for the course it belongs to.
+"""
+
+
+def record_evaluation(course_id):
+    add_counts(evaluated=1)
+    Course.objects.filter(id=course_id).update(
+        evaluated_count=F("evaluated_count") + 1)
+
+
+"""
+The completion function returns the response rate of the whole roster and of each course.
+"""
+
+
+def completion():
+    counters = get_counters()
+    courses = Course.objects.order_by("subject", "catalog", "section").values(
+        "id", "subject", "catalog", "section", "title", "enrollment_count", "evaluated_count")
+    return {
+        "totals": {field: getattr(counters, field) for field in FIELDS},
+        "response_rate": rate(counters.evaluated, counters.enrollments),
+        "courses": [dict(course, response_rate=rate(course["evaluated_count"], course["enrollment_count"]))
+                    for course in courses]
+    }
+
+
+def rate(evaluated, enrollments):
+    return round(evaluated / enrollments, 4) if enrollments else 0.0
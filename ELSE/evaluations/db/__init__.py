@@ -0,0 +1,38 @@
+"""
+Database Helpers
+Author: Peter Collins
+
+Survey submissions arrive in bursts when a class receives its invitation emails. The SQLite backend in
+evaluations.db.sqlite3 makes writers queue for the database lock instead of failing, the retry_when_locked
+decorator below retries the few writes which still time out.
+"""
+import functools
+import random
+import time
+from django.conf import settings
+from django.db import OperationalError, connection
+
+
+"""
+The retry_when_locked decorator runs the decorated function again when it fails because the database is
+locked, up to SQLITE_LOCK_RETRIES times with an exponentially growing, jittered delay. The function must run
+its own transaction: inside an outer transaction the error is raised immediately since the outer transaction
+cannot be retried from here.
+"""
+
+
+def retry_when_locked(function):
+    @functools.wraps(function)
+    def retried(*args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except OperationalError as error:
+                if "locked" not in str(error) or connection.in_atomic_block:
+                    raise
+                if attempt >= settings.SQLITE_LOCK_RETRIES:
+                    raise
+                attempt += 1
+                time.sleep(settings.SQLITE_LOCK_RETRY_DELAY * 2 ** (attempt - 1) * (0.5 + random.random()))
+    return retried
@@ -0,0 +1,32 @@
+"""
+Tuned SQLite Backend
+Author: Peter Collins
+
+Django's SQLite backend opens connections with the default rollback journal and begins transactions as
+DEFERRED. A deferred transaction which reads before it writes has to upgrade its lock, and when another
+connection is writing at that moment SQLite fails with "database is locked" at once instead of waiting. This
+backend applies the SQLITE_PRAGMAS setting (WAL journaling so readers never block the writer, synchronous,
+busy_timeout and cache size) to every new connection and begins transactions with BEGIN IMMEDIATE, so a
+transaction takes the write lock up front and waits up to busy_timeout for it.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The get_new_connection method applies the configured pragmas to each new connection.
+    """
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in settings.SQLITE_PRAGMAS.items():
+            conn.execute("PRAGMA %s = %s" % (pragma, value))
+        return conn
+
+    """
+    The _start_transaction_under_autocommit method begins atomic blocks with an immediate transaction.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
@@ -0,0 +1,94 @@
+"""
+Response Export
+Author: Peter Collins
+
+Every response can be exported joined with its course, instructor and question, as CSV or as JSON Lines. The
+rows are read with a chunked iterator and written out one line at a time, so exporting stays in constant
+memory no matter how many responses are stored. Students are not included, responses remain anonymous.
+
+Responses of archived terms (see evaluations.archive) are read from the archive tables with the same columns.
+"""
+import csv
+import json
+from evaluations.models import ArchivedResponse, Response
+
+COLUMNS = [
+    ("term", "enrollment__course__term"),
+    ("subject", "enrollment__course__subject"),
+    ("catalog", "enrollment__course__catalog"),
+    ("section", "enrollment__course__section"),
+    ("course_id", "enrollment__course_id"),
+    ("course_title", "enrollment__course__title"),
+    ("instructor", "enrollment__course__instructor__last_name"),
+    ("instructor_email", "enrollment__course__instructor_id"),
+    ("question_id", "question_id"),
+    ("question", "question__prompt"),
+    ("response_type", "question__response_type"),
+    ("text", "text"),
+    ("number", "number"),
+]
+ARCHIVE_COLUMNS = [
+    ("term", "course__term"),
+    ("subject", "course__subject"),
+    ("catalog", "course__catalog"),
+    ("section", "course__section"),
+    ("course_id", "course__course_id"),
+    ("course_title", "course__title"),
+    ("instructor", "course__instructor_last_name"),
+    ("instructor_email", "course__instructor_email"),
+    ("question_id", "question__question_id"),
+    ("question", "question__prompt"),
+    ("response_type", "question__response_type"),
+    ("text", "text"),
+    ("number", "number"),
+]
+FIELDS = [name for name, lookup in COLUMNS]
+
+
+"""
+The export_rows function yields one dict per response, archived terms first, optionally limited to a term
+and/or subject.
+"""
+
+
+def export_rows(term=None, subject=None, chunk_size=2000):
+    archived = ArchivedResponse.objects.order_by("course__term", "id")
+    responses = Response.objects.order_by("id")
+    if term:
+        archived = archived.filter(course__term=term)
+        responses = responses.filter(enrollment__course__term=term)
+    if subject:
+        archived = archived.filter(course__subject=subject)
+        responses = responses.filter(enrollment__course__subject=subject)
+    for queryset, columns in ((archived, ARCHIVE_COLUMNS), (responses, COLUMNS)):
+        rows = queryset.values_list(*[lookup for name, lookup in columns])
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield dict(zip(FIELDS, row))
+
+
+class Echo():
+    """
+    The Echo class is a file-like object whose write method returns the line written, which lets csv.writer
+    produce lines for a generator.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in FIELDS])
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + "\n"
+
+
+FORMATS = {
+    "csv": (csv_lines, "text/csv"),
+    "jsonl": (jsonl_lines, "application/x-ndjson"),
+}
@@ -0,0 +1,174 @@
+"""
+Roster Import Jobs
+Author: Peter Collins
+
+Importing a large registration roster takes longer than a web worker is allowed to spend on a request. The
+Parser view therefore records an ImportJob and hands the work to a background thread in the same process.
+The job row is updated as rows are read so the administration page can poll it for progress. Every roster is
+validated (see evaluations.validation) before anything is written, the problems found are kept on the job as a
+CSV error report.
+
+A small roster is handed to the job as the bytes of the upload, a large one as the upload's own temporary file
+(see Parser.store_upload). Either way the roster belongs to its job alone, and the job removes the file once
+it is done.
+
+Only the job thread needs the parser, the roster readers and the validation (and through them xlrd, the XML
+parser and multiprocessing), so run_import_job imports them when a job runs rather than every web worker when
+it loads the views.
+"""
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from evaluations.cache import bump_analytics_version, set_status
+from evaluations.db import retry_when_locked
+from evaluations.models import ImportJob, Status
+
+
+"""
+The remove_roster function removes the roster file of a job once the job no longer needs it. A roster kept in
+memory is named without a directory (see Parser.store_upload) and has no file to remove.
+"""
+
+
+def remove_roster(roster):
+    if os.path.dirname(roster):
+        try:
+            os.remove(roster)
+        except FileNotFoundError:
+            pass
+
+
+"""
+The active_job function returns the pending or running import job, if any. A running job which has not
+reported progress within ROSTER_IMPORT_TIMEOUT seconds belonged to a worker that has since died, it is marked
+as failed so it no longer blocks new imports and its roster file is removed.
+"""
+
+
+def active_job():
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.ROSTER_IMPORT_TIMEOUT)
+    stale = dict(ImportJob.objects.filter(
+        state__in=["PENDING", "RUNNING"], updated__lt=cutoff).values_list("id", "roster"))
+    if stale:
+        ImportJob.objects.filter(id__in=stale, state__in=["PENDING", "RUNNING"]).update(
+            state="FAILED", message="The import was interrupted.", updated=timezone.now())
+        for roster in stale.values():
+            remove_roster(roster)
+    return ImportJob.objects.filter(state__in=["PENDING", "RUNNING"]).order_by("-id").first()
+
+
+"""
+The create_import_job function creates an ImportJob with the given fields unless another import is pending or
+running, in which case None is returned. The check and the insert run in one transaction holding a lock, so of
+two uploads arriving at once only one gets a job: the tuned SQLite backend begins the transaction with BEGIN
+IMMEDIATE (see evaluations.db.sqlite3), other databases lock the Status row with SELECT ... FOR UPDATE.
+"""
+
+
+@retry_when_locked
+def create_import_job(**fields):
+    with transaction.atomic():
+        if connection.features.has_select_for_update:
+            Status.objects.select_for_update().get_or_create(id=1)
+        if active_job():
+            return None
+        return ImportJob.objects.create(**fields)
+
+
+"""
+The start_import_job function runs the given job on a daemon thread, or inline when ROSTER_IMPORT_BACKGROUND
+is disabled. The function accepts an ImportJob and the contents of its roster when they are kept in memory,
+and returns no value.
+"""
+
+
+def start_import_job(job, contents=None):
+    if not settings.ROSTER_IMPORT_BACKGROUND:
+        run_import_job(job.id, contents)
+        return
+    thread = threading.Thread(
+        target=run_import_job, args=(job.id, contents), name="roster-import-%d" % job.id, daemon=True)
+    thread.start()
+
+
+"""
+The change_message function describes the changes made by an incremental import for the job message.
+"""
+
+
+def change_message(changes):
+    return "Registration roster updated. " + " ".join(
+        "%s: %d added, %d updated, %d removed." % (
+            model.capitalize(), changes[model]["added"], changes[model]["updated"], changes[model]["removed"])
+        for model in ("enrollments", "courses", "students", "instructors")
+    ) + " Responses removed: %d." % changes["responses"]["removed"]
+
+
+"""
+The run_import_job function validates the job's roster file and stores the error report on the job before
+anything is committed. A roster missing required columns fails the job, a job in VALIDATE mode stops once the
+report is stored. Otherwise the valid rows replace the roster, or only their differences are applied when the
+job is incremental, and the outcome is recorded on the job together with any rows the parser still rejected.
+The roster's term becomes the current term, earlier terms still in the database are archived by the parser.
+Progress is written outside of the import transaction so it is visible while the job runs. The roster is read
+from contents when they are given, otherwise from the file named by the job, which is removed afterwards. The
+function accepts the id of an ImportJob and the optional contents of its roster and returns no value.
+"""
+
+
+def run_import_job(job_id, contents=None):
+    from evaluations.registration_parser import RegistrationParser
+    from evaluations.validation import error_report, validate_roster
+    started = time.monotonic()
+    job = ImportJob.objects.get(id=job_id)
+
+    def update(**fields):
+        fields.update(elapsed=time.monotonic() - started, updated=timezone.now())
+        ImportJob.objects.filter(id=job_id).update(**fields)
+
+    def progress(rows, failed):
+        update(rows_processed=rows, rows_failed=failed)
+
+    try:
+        update(state="RUNNING")
+        parser = RegistrationParser(job.roster, contents=contents)
+        validation = validate_roster(parser.reader, progress=progress)
+        report = dict(missing=validation["missing"], errors=validation["errors"])
+        update(rows_processed=validation["rows"], rows_failed=len(validation["invalid"]),
+               error_report=error_report(report) if validation["missing"] or validation["errors"] else "")
+        if validation["missing"]:
+            update(state="FAILED", message="The registration roster is missing the columns: %s." %
+                   ", ".join(validation["missing"]))
+            return
+        if job.mode == "VALIDATE":
+            update(state="DONE", message="Registration roster checked: %d of %d rows are invalid." % (
+                len(validation["invalid"]), validation["rows"]))
+            return
+        if job.mode == "INCREMENTAL":
+            stats = parser.parse_incremental(progress=progress, skip=validation["invalid"])
+            result = dict(message=change_message(stats["changes"]), changes=json.dumps(stats["changes"]))
+        else:
+            stats = parser.parse_all(flush=True, progress=progress, skip=validation["invalid"])
+            result = dict(message="Registration roster successfully imported.")
+        if parser.errors:
+            report["errors"] = sorted(report["errors"] + parser.errors, key=lambda error: error[0])
+            result["error_report"] = error_report(report)
+        if stats["archived"]:
+            result["message"] += " Archived terms: %s." % ", ".join(str(term) for term in stats["archived"])
+        set_status(populated=True, term=stats["term"])
+        bump_analytics_version()
+        update(state="DONE", rows_processed=stats["rows"], rows_failed=stats["failed"], **result)
+    except Exception:
+        logging.exception("Roster import job %d failed", job_id)
+        update(state="FAILED", message="Error parsing registration roster file.")
+    finally:
+        if contents is None:
+            remove_roster(job.roster)
+        if settings.ROSTER_IMPORT_BACKGROUND:
+            connection.close()
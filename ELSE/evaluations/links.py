@@ -0,0 +1,76 @@
+"""
+Access Links
+Author: Peter Collins
+
+Students and instructors reach their pages through emailed links instead of logging in. Each link carries a
+token made with Django's signing framework which holds the ids the link grants access to and the collection
+period it was issued for, signed with ACCESS_LINK_SECRET and timestamped. A view checks the signature, age and period
+of a token before touching the database, so forged, expired or outdated links are rejected without a query
+and no tokens have to be generated or stored when a roster is imported.
+
+The collection period (Status.period) is incremented whenever a collection period is started, which retires
+every link sent for an earlier one. Links expire after ACCESS_LINK_MAX_AGE seconds.
+
+ACCESS_LINK_SECRET comes from the environment rather than the settings file. SECRET_KEY is committed to the
+repository, anyone holding a copy could sign a link for any student with it. The check_link_secret function
+below keeps the application from starting without a secret of its own.
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+
+KINDS = {
+    "student": "/students/",
+    "survey": "/survey/",
+    "instructor": "/instructors/",
+    "feedback": "/feedback/",
+}
+
+
+"""
+The check_link_secret function raises ImproperlyConfigured unless ACCESS_LINK_SECRET is set to something other
+than the committed SECRET_KEY. It is called when the application is loaded, see evaluations.apps.
+"""
+
+
+def check_link_secret():
+    if not settings.ACCESS_LINK_SECRET:
+        raise ImproperlyConfigured("The ACCESS_LINK_SECRET environment variable must be set to sign access links.")
+    if settings.ACCESS_LINK_SECRET == settings.SECRET_KEY:
+        raise ImproperlyConfigured("ACCESS_LINK_SECRET must differ from the SECRET_KEY in the settings file.")
+
+
+"""
+The make_token function returns a signed token of the given kind for a list of ids and a collection period.
+"""
+
+
+def make_token(kind, ids, period):
+    return signing.dumps(list(ids) + [period], key=settings.ACCESS_LINK_SECRET, salt="evaluations.links." + kind,
+                         compress=True)
+
+
+"""
+The read_token function returns the ids held by a token of the given kind. A BadSignature exception (or its
+subclass SignatureExpired) is raised when the token was not signed by us, is older than ACCESS_LINK_MAX_AGE or
+was issued for another collection period than the given one.
+"""
+
+
+def read_token(kind, token, period):
+    payload = signing.loads(token, key=settings.ACCESS_LINK_SECRET, salt="evaluations.links." + kind,
+                            max_age=settings.ACCESS_LINK_MAX_AGE)
+    if not isinstance(payload, list) or not payload or payload[-1] != period:
+        raise signing.BadSignature("Link issued for another collection period.")
+    return payload[:-1]
+
+
+"""
+The link function returns the path of a link of the given kind. The ids are those expected by the view:
+the student id for "student", the student and course ids for "survey", the instructor email for "instructor"
+and the instructor email and course id for "feedback".
+"""
+
+
+def link(kind, ids, period):
+    return KINDS[kind] + make_token(kind, ids, period)
@@ -0,0 +1,101 @@
+"""
+Mail Delivery
+Author: Peter Collins
+
+Survey and feedback invitations are sent to every student and instructor at once. Opening an SMTP connection
+per message makes that slow, so the deliver function below splits the messages into batches which are each
+sent over a single connection, and sends the batches from a small pool of worker threads. Any Django email
+backend can be used, which allows delivery to be exercised against the locmem backend or a local debugging
+SMTP server.
+"""
+import logging
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.mail import get_connection
+
+
+"""
+The send_batch function sends a list of (index, message) pairs over one connection. A failed message is
+recorded and the connection is reopened before the remaining messages are sent. The optional report callable
+is called with an (index, error) tuple as soon as each message has been sent (error None) or has failed. Every open which does not
+raise counts as a connection, whatever the backend's open method returns (the SMTP backend returns True, the
+locmem and console backends None). The function returns a tuple of the number of messages sent, the number of
+connections opened and a list of (index, error) failures.
+"""
+
+
+def send_batch(batch, backend=None, report=None):
+    connection = get_connection(backend, fail_silently=False)
+    connections = 0
+    opened = False
+    sent = 0
+    errors = []
+    try:
+        for index, message in batch:
+            try:
+                if not opened:
+                    connection.open()
+                    opened = True
+                    connections += 1
+                sent += connection.send_messages([message])
+            except Exception as e:
+                logging.warning("Error sending mail to %s: %s", ", ".join(message.to), e)
+                errors.append((index, str(e)))
+                connection.close()
+                opened = False
+                if report:
+                    report((index, str(e)))
+                continue
+            if report:
+                report((index, None))
+    finally:
+        connection.close()
+    return sent, connections, errors
+
+
+"""
+The deliver function sends a list of EmailMessage objects. Messages are grouped into batches of at most
+per_connection messages which are handed to a pool of worker threads. The defaults are taken from the
+EMAIL_DELIVERY_WORKERS and EMAIL_MESSAGES_PER_CONNECTION settings. When on_result is given it is called in
+the calling thread with the position of every message and its error (None when sent) as soon as the message
+is done, while the other messages are still being delivered. The function returns a dict of delivery
+statistics, failed messages are reported by their position in the given list.
+"""
+
+
+def deliver(messages, workers=None, per_connection=None, backend=None, on_result=None):
+    workers = workers or settings.EMAIL_DELIVERY_WORKERS
+    per_connection = per_connection or settings.EMAIL_MESSAGES_PER_CONNECTION
+    started = time.monotonic()
+    indexed = list(enumerate(messages))
+    batches = [indexed[start:start + per_connection]
+               for start in range(0, len(indexed), per_connection)]
+    stats = dict(sent=0, failed=0, connections=0, errors=[])
+    if batches:
+        results = queue.Queue()
+        with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+            futures = [pool.submit(send_batch, batch, backend, results.put) for batch in batches]
+            remaining = len(indexed)
+            while remaining:
+                try:
+                    index, error = results.get(timeout=0.5)
+                except queue.Empty:
+                    if all(future.done() for future in futures):
+                        break
+                    continue
+                remaining -= 1
+                if on_result:
+                    on_result(index, error)
+            for future in futures:
+                sent, connections, errors = future.result()
+                stats["sent"] += sent
+                stats["connections"] += connections
+                stats["errors"].extend(errors)
+    stats["failed"] = len(stats["errors"])
+    stats["seconds"] = time.monotonic() - started
+    stats["messages_per_second"] = stats["sent"] / stats["seconds"] if stats["seconds"] else 0.0
+    logging.info("Delivered %(sent)d messages (%(failed)d failed) over %(connections)d connections "
+                 "in %(seconds).2fs", stats)
+    return stats
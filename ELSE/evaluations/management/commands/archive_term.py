@@ -0,0 +1,34 @@
+"""
+The archive_term command moves a closed term from the working tables into the archive tables, see
+evaluations.archive. Without a term it lists the terms which have been archived.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from evaluations.archive import ArchiveError, archive_term, archived_terms
+from evaluations.cache import get_status, set_status
+from evaluations.models import Course
+
+
+class Command(BaseCommand):
+    help = "Archive a closed term, or list the archived terms."
+
+    def add_arguments(self, parser):
+        parser.add_argument("term", type=int, nargs="?", help="The term to archive.")
+
+    def handle(self, *args, **options):
+        term = options["term"]
+        if term is None:
+            for archived in archived_terms():
+                self.stdout.write("%(term)s: %(courses)d courses, %(evaluated)d of %(enrollments)d evaluated"
+                                  % archived)
+            return
+        status = get_status()
+        if status.active:
+            raise CommandError("Terms cannot be archived while a collection period is active.")
+        try:
+            archived = archive_term(term)
+        except ArchiveError as error:
+            raise CommandError(str(error))
+        if status.term == term:
+            set_status(term=None, populated=Course.objects.exists())
+        self.stdout.write("Archived term %(term)s: %(courses)d courses, %(questions)d questions, "
+                          "%(responses)d responses." % archived)
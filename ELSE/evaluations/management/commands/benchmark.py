@@ -0,0 +1,61 @@
+"""
+The benchmark command generates a synthetic roster, runs a full collection cycle against a scratch database
+and reports the time, query count and peak memory of every stage. With --save-baseline the results become the
+baseline of the profile, otherwise they are compared against it and the command fails on a regression.
+"""
+import os
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from evaluations.benchmarks import baselines
+from evaluations.benchmarks.cycle import run_cycle
+from evaluations.benchmarks.environment import scratch_environment
+from evaluations.benchmarks.roster import write_roster
+
+
+class Command(BaseCommand):
+    help = "Benchmark a full collection cycle on a synthetic roster."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=500)
+        parser.add_argument("--courses", type=int, default=20)
+        parser.add_argument("--sections", type=int, default=2)
+        parser.add_argument("--per-student", type=int, default=3)
+        parser.add_argument("--format", choices=["csv", "tsv", "xlsx", "xls"], default="csv")
+        parser.add_argument("--baseline-file", default=baselines.BASELINES_PATH)
+        parser.add_argument("--save-baseline", action="store_true",
+                            help="Save the results as the baseline of this profile.")
+        for metric, tolerance in sorted(baselines.TOLERANCES.items()):
+            parser.add_argument("--%s-tolerance" % metric.replace("_", "-"), type=float, default=tolerance,
+                                dest="%s_tolerance" % metric,
+                                help="Allowed growth of %s over the baseline (default %s)." % (metric, tolerance))
+
+    def handle(self, *args, **options):
+        profile = baselines.profile_key(
+            students=options["students"], courses=options["courses"], sections=options["sections"],
+            per_student=options["per_student"], format=options["format"])
+        with tempfile.TemporaryDirectory() as directory:
+            roster_path = os.path.join(directory, "roster." + options["format"])
+            rows = write_roster(roster_path, students=options["students"], courses=options["courses"],
+                                sections=options["sections"], per_student=options["per_student"])
+            self.stdout.write("Profile %s (%d roster rows)" % (profile, rows))
+            with scratch_environment():
+                results = run_cycle(roster_path)
+        self.stdout.write("%-10s %10s %10s %12s" % ("stage", "seconds", "queries", "peak (KiB)"))
+        for stage, metrics in results.items():
+            self.stdout.write("%-10s %10.3f %10d %12.0f" % (
+                stage, metrics["seconds"], metrics["queries"], metrics["peak_bytes"] / 1024))
+        if options["save_baseline"]:
+            baselines.save(profile, results, options["baseline_file"])
+            self.stdout.write("Saved baseline for %s." % profile)
+            return
+        baseline = baselines.load(options["baseline_file"]).get(profile)
+        if not baseline:
+            self.stdout.write("No baseline saved for this profile.")
+            return
+        tolerances = {metric: options["%s_tolerance" % metric] for metric in baselines.TOLERANCES}
+        problems = baselines.regressions(results, baseline, tolerances)
+        for problem in problems:
+            self.stderr.write("REGRESSION " + problem)
+        if problems:
+            raise CommandError("%d metrics regressed against the baseline." % len(problems))
+        self.stdout.write("No regressions against the baseline.")
@@ -0,0 +1,44 @@
+"""
+The benchmark_concurrency command stress tests concurrent survey submissions with Django's stock SQLite backend
+and with the tuned backend, see evaluations.benchmarks.concurrency. Errors, and submissions stored although the
+client got an error, are reported for both backends. The command fails only when the tuned backend stores
+something other than what it reported as saved.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from evaluations.benchmarks import concurrency
+
+
+class Command(BaseCommand):
+    help = "Stress test concurrent survey submissions with the stock and tuned SQLite backends."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16, help="Number of submitting threads.")
+        parser.add_argument("--readers", type=int, default=4, help="Number of threads reading landing pages.")
+        parser.add_argument("--students", type=int, default=200)
+        parser.add_argument("--courses", type=int, default=10)
+        parser.add_argument("--per-student", type=int, default=3)
+        parser.add_argument("--repeats", type=int, default=2,
+                            help="Number of times every survey is submitted.")
+
+    def handle(self, *args, **options):
+        results = concurrency.run(options["threads"], options["readers"], options["students"],
+                                  options["courses"], options["per_student"], options["repeats"])
+        self.stdout.write("%-6s %9s %7s %7s %10s %7s %9s %10s %9s %9s %10s %12s %11s" % (
+            "mode", "requests", "saved", "stored", "duplicate", "errors", "error %", "req/sec", "p50 (ms)",
+            "p95 (ms)", "reads/sec", "read errors", "consistent"))
+        for mode, result in results.items():
+            self.stdout.write("%-6s %9d %7d %7d %10d %7d %9.2f %10.1f %9.1f %9.1f %10.1f %12d %11s" % (
+                mode, result["requests"], result["saved"], result["stored"], result["duplicates"], result["errors"],
+                100 * result["error_rate"], result["requests_per_second"], 1000 * result["p50"],
+                1000 * result["p95"], result["reads_per_second"], result["read_errors"],
+                "yes" if result["consistent"] else "no"))
+        stock = results["stock"]
+        tuned = results["tuned"]
+        self.stdout.write("tuned/stock throughput x%.2f" % (
+            tuned["requests_per_second"] / stock["requests_per_second"]))
+        if not stock["consistent"]:
+            self.stdout.write("stock: stored %d evaluations but reported %d as saved, the clients of the others got "
+                              "an error page." % (stock["stored"], stock["saved"]))
+        if not tuned["consistent"]:
+            raise CommandError("The tuned backend stored %d evaluations but reported %d as saved." % (
+                tuned["stored"], tuned["saved"]))
@@ -0,0 +1,32 @@
+"""
+The benchmark_startup command measures how long a freshly started worker takes to answer its first request,
+with and without prewarming, see evaluations.benchmarks.startup.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from evaluations.benchmarks import startup
+
+
+class Command(BaseCommand):
+    help = "Measure worker readiness and first request latency, cold and prewarmed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=5, help="Number of workers booted per mode.")
+        parser.add_argument("--students", type=int, default=50)
+        parser.add_argument("--courses", type=int, default=5)
+
+    def handle(self, *args, **options):
+        results = startup.run(options["workers"], options["students"], options["courses"])
+        self.stdout.write("%-10s" % "mode" + "".join(" %15s" % timing for timing in startup.TIMINGS) +
+                          " %8s %5s" % ("modules", "xlrd"))
+        for mode, result in results.items():
+            self.stdout.write("%-10s" % mode + "".join(" %12.1f ms" % (1000 * result[timing])
+                                                       for timing in startup.TIMINGS) +
+                              " %8d %5s" % (result["modules"], "yes" if result["xlrd"] else "no"))
+        cold = results["cold"]
+        prewarmed = results["prewarmed"]
+        self.stdout.write("first request: cold %.1f ms, prewarmed %.1f ms (x%.1f)" % (
+            1000 * cold["first_request"], 1000 * prewarmed["first_request"],
+            cold["first_request"] / prewarmed["first_request"]))
+        failed = [mode for mode, result in results.items() if result["statuses"] != [200]]
+        if failed:
+            raise CommandError("Requests did not succeed for: " + ", ".join(failed))
@@ -0,0 +1,30 @@
+"""
+The benchmark_storage command compares insert and report throughput of the legacy multi-table response layout
+with the compact single table layout, see evaluations.benchmarks.storage.
+"""
+from django.core.management.base import BaseCommand
+from evaluations.benchmarks import storage
+
+
+class Command(BaseCommand):
+    help = "Benchmark the legacy and compact response storage layouts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--enrollments", type=int, default=2000)
+        parser.add_argument("--questions", type=int, default=8)
+        parser.add_argument("--courses", type=int, default=50)
+
+    def handle(self, *args, **options):
+        results = storage.run(options["enrollments"], options["questions"], options["courses"])
+        self.stdout.write("%-8s %14s %13s %16s %12s" % (
+            "layout", "inserts/sec", "queries/submit", "report rows/sec", "size (KiB)"))
+        for name, result in results.items():
+            self.stdout.write("%-8s %14.0f %13.1f %16.0f %12.0f" % (
+                name, result["inserts_per_second"], result["queries_per_submission"],
+                result["report_rows_per_second"], result["database_bytes"] / 1024))
+        legacy = results["legacy"]
+        compact = results["compact"]
+        self.stdout.write("compact/legacy: inserts x%.2f, report x%.2f, size x%.2f" % (
+            compact["inserts_per_second"] / legacy["inserts_per_second"],
+            compact["report_rows_per_second"] / legacy["report_rows_per_second"],
+            compact["database_bytes"] / legacy["database_bytes"]))
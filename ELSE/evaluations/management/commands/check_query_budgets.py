@@ -0,0 +1,22 @@
+"""
+The check_query_budgets command verifies that every view stays within its query budget and runs the same
+number of queries for a small and a large roster (see evaluations.query_budgets). It exits with an error
+otherwise, which makes it suitable for CI.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from evaluations.query_budgets import BUDGETS, PROFILES, check_budgets
+
+
+class Command(BaseCommand):
+    help = "Check the number of queries of every view against its budget for two roster sizes."
+
+    def handle(self, *args, **options):
+        results, problems = check_budgets()
+        self.stdout.write("%-20s %7s" % ("view", "budget") + "".join(" %7s" % profile for profile in PROFILES))
+        for view, budget in BUDGETS.items():
+            self.stdout.write("%-20s %7d" % (view, budget) +
+                              "".join(" %7d" % results[profile][view] for profile in PROFILES))
+        for problem in problems:
+            self.stdout.write("! " + problem)
+        if problems:
+            raise CommandError("%d query budget problems." % len(problems))
@@ -0,0 +1,35 @@
+"""
+The check_query_plans command verifies that the queries the hot requests listed in evaluations.query_plans run
+are answered from an index. It exits with an error when any of them would scan a table or sort its rows, which
+makes it suitable for CI.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from evaluations.query_plans import capture_plans, plan_problems
+
+
+class Command(BaseCommand):
+    help = "Check the SQLite query plans of the hot view requests for table scans and sorts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose-plans", action="store_true", help="Print the plan of every query.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Query plans can only be checked on SQLite.")
+        results = capture_plans()
+        for name, result in results.items():
+            failed = result["unused"] or any(problems for sql, plan, problems in result["plans"])
+            self.stdout.write("%s %s (%d queries)" % ("FAIL" if failed else "ok  ", name, len(result["plans"])))
+            for sql, plan, problems in result["plans"]:
+                if problems or options["verbose_plans"]:
+                    self.stdout.write("       " + sql)
+                    for detail in plan:
+                        self.stdout.write("         " + detail)
+                for problem in problems:
+                    self.stdout.write("     ! " + problem)
+            for index in result["unused"]:
+                self.stdout.write("     ! index %s not used" % index)
+        problems = plan_problems(results)
+        if problems:
+            raise CommandError("%d query plan problems." % len(problems))
@@ -0,0 +1,43 @@
+"""
+The drain_outbox command delivers queued invitation and feedback emails. Run it once to send everything that
+is due, or with --loop to keep polling the outbox as a long running worker.
+"""
+import time
+from django.core.management.base import BaseCommand
+from evaluations import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver pending messages from the email outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campaign", help="Only deliver messages of this campaign.")
+        parser.add_argument("--rate", type=float,
+                            help="Maximum number of messages sent per second.")
+        parser.add_argument("--batch-size", type=int,
+                            help="Number of messages fetched and delivered at a time.")
+        parser.add_argument("--max-attempts", type=int,
+                            help="Attempts before a message is marked as failed.")
+        parser.add_argument("--retry-failed", action="store_true",
+                            help="Requeue failed messages before draining.")
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep polling the outbox instead of exiting when it is empty.")
+        parser.add_argument("--interval", type=float, default=30,
+                            help="Seconds between polls when --loop is given.")
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            requeued = outbox.retry_failed(options["campaign"])
+            self.stdout.write("Requeued %d failed messages." % requeued)
+        while True:
+            stats = outbox.drain(
+                campaign=options["campaign"],
+                rate=options["rate"],
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"]
+            )
+            if stats["sent"] or stats["failed"] or stats["retried"]:
+                self.stdout.write("Sent %(sent)d, retrying %(retried)d, failed %(failed)d." % stats)
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
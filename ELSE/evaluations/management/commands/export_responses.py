@@ -0,0 +1,28 @@
+"""
+The export_responses command writes every response joined with its course, instructor and question to a file
+or to standard output, see evaluations.export.
+"""
+import sys
+from django.core.management.base import BaseCommand
+from evaluations.export import FORMATS, export_rows
+
+
+class Command(BaseCommand):
+    help = "Export all responses as CSV or JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument("--term", type=int, help="Only export responses of this term.")
+        parser.add_argument("--subject", help="Only export responses of this subject.")
+        parser.add_argument("--output", help="File to write, standard output by default.")
+
+    def handle(self, *args, **options):
+        lines, content_type = FORMATS[options["format"]]
+        rows = export_rows(term=options["term"], subject=options["subject"])
+        output = open(options["output"], "w", newline="", encoding="utf-8") if options["output"] else sys.stdout
+        try:
+            for line in lines(rows):
+                output.write(line)
+        finally:
+            if options["output"]:
+                output.close()
@@ -0,0 +1,19 @@
+"""
+The prewarm command loads the URLconf, fills the status and question caches and compiles the templates (see
+evaluations.prewarm), e.g. after the cache was cleared or a deployment changed the templates. Templates are
+only compiled when a cached template loader keeps them, otherwise the command says they were skipped.
+"""
+from django.core.management.base import BaseCommand
+from evaluations.prewarm import caches_templates, prewarm
+
+
+class Command(BaseCommand):
+    help = "Fill the status and question caches and compile the templates."
+
+    def handle(self, *args, **options):
+        timings = prewarm()
+        for name, seconds in timings.items():
+            self.stdout.write("%-10s %8.1f ms" % (name, 1000 * seconds))
+        self.stdout.write("%-10s %8.1f ms" % ("total", 1000 * sum(timings.values())))
+        if not caches_templates():
+            self.stdout.write("Template compilation skipped, no cached template loader is configured.")
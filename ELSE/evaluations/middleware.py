@@ -0,0 +1,108 @@
+"""
+ELSE Middleware
+Author: Peter Collins
+
+The ProfilingMiddleware measures the wall time, database queries, database time, template render time and
+response size of every request and tags the measurement with the view class which handled it. It is listed
+first in settings.MIDDLEWARE so its time covers the rest of the stack, and removes itself unless
+REQUEST_PROFILING is enabled. The records are kept by evaluations.profiling.
+
+The ThrottleMiddleware sheds requests to the token URLs from clients exceeding THROTTLE_RATES (see
+evaluations.throttling). It follows the ProfilingMiddleware in settings.MIDDLEWARE so shed requests never reach
+the session, authentication or the views.
+"""
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from evaluations import profiling, throttling
+
+
+class ProfilingMiddleware():
+    """
+    The constructor sizes the ring buffer and instruments template rendering. Django drops the middleware when
+    MiddlewareNotUsed is raised, leaving no overhead when profiling is disabled.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        profiling.resize(settings.REQUEST_PROFILING_BUFFER)
+        profiling.instrument_templates()
+
+    """
+    The call method runs the request with every query timed by an execute wrapper and records the result.
+    """
+
+    def __call__(self, request):
+        queries = []
+
+        def timed(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append((sql, time.perf_counter() - started))
+
+        request.profiled_view = None
+        profiling.start_templates()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timed):
+                response = self.get_response(request)
+        finally:
+            template_seconds = profiling.stop_templates()
+        seconds = time.perf_counter() - started
+        profiling.record(dict(
+            method=request.method,
+            path=request.path,
+            view=request.profiled_view or "unresolved",
+            status=response.status_code,
+            seconds=seconds,
+            queries=len(queries),
+            db_seconds=sum(query_seconds for sql, query_seconds in queries),
+            template_seconds=template_seconds,
+            bytes=0 if response.streaming else len(response.content),
+        ), queries)
+        return response
+
+    """
+    The process_view method notes the name of the view class (or function) the request was resolved to.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "view_class", view_func)
+        request.profiled_view = "%s.%s" % (view.__module__, view.__qualname__)
+
+
+class ThrottleMiddleware():
+    """
+    The constructor orders the throttled prefixes longest first and creates the counter store. The middleware
+    removes itself when THROTTLE_RATES is empty.
+    """
+
+    def __init__(self, get_response):
+        if not settings.THROTTLE_RATES:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.rates = sorted(settings.THROTTLE_RATES.items(), key=lambda rate: len(rate[0]), reverse=True)
+        throttling.configure()
+
+    """
+    The call method answers 429 with a Retry-After header when the client has exceeded the limit of the prefix
+    the path starts with, and passes the request on otherwise.
+    """
+
+    def __call__(self, request):
+        for prefix, (limit, seconds) in self.rates:
+            if request.path.startswith(prefix):
+                allowed, retry_after = throttling.allow(
+                    prefix, throttling.client_address(request), limit, seconds)
+                if not allowed:
+                    response = HttpResponse("Too many requests, please try again later.", status=429)
+                    response["Retry-After"] = str(retry_after)
+                    return response
+                break
+        return self.get_response(request)
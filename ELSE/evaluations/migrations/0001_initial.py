@@ -0,0 +1,127 @@
+# Generated by Django 2.2.6 on 2026-10-17 02:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """
+    The schema as it was before the app had migrations, when the tables were created with syncdb. Databases
+    created that way are brought under migrations with 'migrate --fake-initial', which records this migration
+    as applied since its tables exist and applies the following ones.
+    """
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+
+        migrations.CreateModel(
+            name='Course',
+            fields=[
+                ('id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=256)),
+                ('campus', models.CharField(max_length=256)),
+                ('token', models.CharField(max_length=64)),
+                ('component', models.CharField(max_length=8)),
+                ('grade_base', models.CharField(max_length=8)),
+                ('subject', models.CharField(max_length=4)),
+                ('catalog', models.CharField(max_length=4)),
+                ('career', models.CharField(max_length=4)),
+                ('course_type', models.CharField(max_length=2)),
+                ('term', models.PositiveSmallIntegerField()),
+                ('section', models.PositiveSmallIntegerField()),
+                ('total_enrollment', models.PositiveSmallIntegerField()),
+                ('units', models.PositiveSmallIntegerField()),
+                ('location', models.PositiveSmallIntegerField()),
+                ('session', models.PositiveSmallIntegerField()),
+                ('combined', models.BooleanField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grade', models.CharField(blank=True, max_length=2, null=True)),
+                ('token', models.CharField(max_length=64)),
+                ('drop_date', models.DateField(blank=True, default='', null=True)),
+                ('add_date', models.DateField()),
+                ('dropped', models.BooleanField()),
+                ('evaluated', models.BooleanField(default=False)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='evaluations.Course')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Instructor',
+            fields=[
+                ('email', models.CharField(max_length=256, primary_key=True, serialize=False)),
+                ('last_name', models.CharField(max_length=256)),
+                ('token', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Question',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prompt', models.CharField(max_length=1000)),
+                ('response_type', models.CharField(choices=[('TXT', 'Text'), ('NUM', 'Number')], max_length=3)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Response',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='evaluations.Enrollment')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='evaluations.Question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Status',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('active', models.BooleanField(default=False)),
+                ('populated', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Student',
+            fields=[
+                ('id', models.CharField(max_length=16, primary_key=True, serialize=False)),
+                ('email', models.CharField(max_length=256)),
+                ('token', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NumberResponse',
+            fields=[
+                ('response_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='evaluations.Response')),
+                ('feedback', models.PositiveSmallIntegerField()),
+            ],
+            bases=('evaluations.response', models.Model),
+        ),
+        migrations.CreateModel(
+            name='TextResponse',
+            fields=[
+                ('response_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='evaluations.Response')),
+                ('feedback', models.CharField(max_length=1000)),
+            ],
+            bases=('evaluations.response', models.Model),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='student',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='evaluations.Student'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='instructor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='evaluations.Instructor'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='students',
+            field=models.ManyToManyField(through='evaluations.Enrollment', to='evaluations.Student'),
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 2.2.6 on 2026-10-17 02:55
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def count_enrollments(apps, schema_editor):
+    """
+    Fills the new counters from the rows of a database created before they existed, as
+    evaluations.counters.recount does.
+    """
+    Counters = apps.get_model('evaluations', 'Counters')
+    Course = apps.get_model('evaluations', 'Course')
+    Enrollment = apps.get_model('evaluations', 'Enrollment')
+    Instructor = apps.get_model('evaluations', 'Instructor')
+    Student = apps.get_model('evaluations', 'Student')
+    totals = Enrollment.objects.values('course_id').annotate(
+        enrollments=Count('id'), evaluated=Count('id', filter=Q(evaluated=True))).order_by()
+    for row in totals:
+        Course.objects.filter(id=row['course_id']).update(
+            enrollment_count=row['enrollments'], evaluated_count=row['evaluated'])
+    Counters.objects.update_or_create(id=1, defaults=dict(
+        instructors=Instructor.objects.count(),
+        courses=Course.objects.count(),
+        students=Student.objects.count(),
+        enrollments=Enrollment.objects.count(),
+        evaluated=Enrollment.objects.filter(evaluated=True).count(),
+    ))
+
+
+class Migration(migrations.Migration):
+    """
+    The tables and columns added after the syncdb schema of 0001_initial: the roster import jobs, the email
+    outbox, the materialized course reports and the live dashboard counters, which are filled from the existing
+    enrollments. Then the indexes of the hot lookups by student, instructor and outbox state.
+    """
+
+    dependencies = [
+        ('evaluations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counters',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('instructors', models.PositiveIntegerField(default=0)),
+                ('courses', models.PositiveIntegerField(default=0)),
+                ('students', models.PositiveIntegerField(default=0)),
+                ('enrollments', models.PositiveIntegerField(default=0)),
+                ('evaluated', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=8)),
+                ('roster', models.CharField(max_length=256)),
+                ('rows_processed', models.PositiveIntegerField(default=0)),
+                ('rows_failed', models.PositiveIntegerField(default=0)),
+                ('elapsed', models.FloatField(default=0)),
+                ('message', models.CharField(blank=True, max_length=1000)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CourseReport',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='evaluations.Course')),
+                ('results', models.TextField()),
+                ('built', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campaign', models.CharField(max_length=64)),
+                ('recipient', models.CharField(max_length=256)),
+                ('subject', models.CharField(max_length=256)),
+                ('body', models.TextField()),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=8)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.CharField(blank=True, max_length=1000)),
+            ],
+            options={
+                'unique_together': {('campaign', 'recipient')},
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='enrollment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='evaluated_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_enrollments, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['student', 'evaluated'], name='enrollment_student_eval_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['student', 'course'], name='enrollment_student_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='instructor',
+            index=models.Index(fields=['last_name', 'token'], name='instructor_token_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['state', 'next_attempt'], name='outbox_state_next_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Responses were stored with multi-table inheritance, one row in evaluations_response plus one row in
+    evaluations_textresponse or evaluations_numberresponse. The answer is now stored on the response row itself
+    in the text or number column. The existing answers are copied over before the subtype tables are dropped.
+    """
+
+    dependencies = [
+        ('evaluations', '0002_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='response',
+            name='number',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='text',
+            field=models.CharField(blank=True, max_length=1000, null=True),
+        ),
+        migrations.RunSQL(
+            sql=[
+                "UPDATE evaluations_response SET "
+                "text = (SELECT feedback FROM evaluations_textresponse "
+                "WHERE response_ptr_id = evaluations_response.id), "
+                "number = (SELECT feedback FROM evaluations_numberresponse "
+                "WHERE response_ptr_id = evaluations_response.id)",
+            ],
+            reverse_sql=[
+                "INSERT INTO evaluations_textresponse (response_ptr_id, feedback) "
+                "SELECT id, text FROM evaluations_response WHERE text IS NOT NULL",
+                "INSERT INTO evaluations_numberresponse (response_ptr_id, feedback) "
+                "SELECT id, number FROM evaluations_response WHERE number IS NOT NULL",
+            ],
+        ),
+        migrations.DeleteModel(
+            name='NumberResponse',
+        ),
+        migrations.DeleteModel(
+            name='TextResponse',
+        ),
+    ]
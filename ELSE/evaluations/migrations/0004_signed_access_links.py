@@ -0,0 +1,63 @@
+# Generated by Django 2.2.6 on 2026-10-17 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Access links are now signed (see evaluations.links) so the stored tokens are dropped. Status.period counts
+    the collection periods the links are bound to. The tokens are given an empty default first so the
+    migration can be reversed, links sent before it was applied stop working either way.
+    """
+
+    dependencies = [
+        ('evaluations', '0003_single_table_responses'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='instructor',
+            name='instructor_token_idx',
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='token',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.RemoveField(
+            model_name='course',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='token',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.RemoveField(
+            model_name='enrollment',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='instructor',
+            name='token',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.RemoveField(
+            model_name='instructor',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='token',
+            field=models.CharField(default='', max_length=64),
+        ),
+        migrations.RemoveField(
+            model_name='student',
+            name='token',
+        ),
+        migrations.AddField(
+            model_name='status',
+            name='period',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
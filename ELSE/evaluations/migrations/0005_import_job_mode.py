@@ -0,0 +1,23 @@
+# Generated by Django 2.2.6 on 2026-10-17 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0004_signed_access_links'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='changes',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('REPLACE', 'Replace'), ('INCREMENTAL', 'Incremental')], default='REPLACE', max_length=11),
+        ),
+    ]
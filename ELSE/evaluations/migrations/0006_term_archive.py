@@ -0,0 +1,77 @@
+# Generated by Django 2.2.6 on 2026-10-17 03:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0005_import_job_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCourse',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.PositiveSmallIntegerField()),
+                ('course_id', models.PositiveIntegerField()),
+                ('subject', models.CharField(max_length=4)),
+                ('catalog', models.CharField(max_length=4)),
+                ('section', models.PositiveSmallIntegerField()),
+                ('title', models.CharField(max_length=256)),
+                ('instructor_email', models.CharField(max_length=256)),
+                ('instructor_last_name', models.CharField(max_length=256)),
+                ('enrollment_count', models.PositiveIntegerField(default=0)),
+                ('evaluated_count', models.PositiveIntegerField(default=0)),
+                ('results', models.TextField()),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedQuestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.PositiveSmallIntegerField()),
+                ('question_id', models.PositiveIntegerField()),
+                ('prompt', models.CharField(max_length=1000)),
+                ('response_type', models.CharField(choices=[('TXT', 'Text'), ('NUM', 'Number')], max_length=3)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedResponse',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(blank=True, max_length=1000, null=True)),
+                ('number', models.PositiveSmallIntegerField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='status',
+            name='term',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['term', 'subject', 'catalog', 'section'], name='course_term_listing_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedresponse',
+            name='course',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='evaluations.ArchivedCourse'),
+        ),
+        migrations.AddField(
+            model_name='archivedresponse',
+            name='question',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='evaluations.ArchivedQuestion'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedquestion',
+            unique_together={('term', 'question_id')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedcourse',
+            unique_together={('term', 'course_id')},
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.6 on 2026-10-17 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluations', '0006_term_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='error_report',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('REPLACE', 'Replace'), ('INCREMENTAL', 'Incremental'), ('VALIDATE', 'Validate only')], default='REPLACE', max_length=11),
+        ),
+    ]
@@ -7,23 +7,57 @@ can be found below.
 """
 
 from django.db import models
+from django.utils import timezone
 
 
 class Status(models.Model):
     active = models.BooleanField(default=False)
     populated = models.BooleanField(default=False)
+    period = models.PositiveIntegerField(default=0)
+    term = models.PositiveSmallIntegerField(null=True, blank=True)
+
+
+class Counters(models.Model):
+    instructors = models.PositiveIntegerField(default=0)
+    courses = models.PositiveIntegerField(default=0)
+    students = models.PositiveIntegerField(default=0)
+    enrollments = models.PositiveIntegerField(default=0)
+    evaluated = models.PositiveIntegerField(default=0)
+
+
+class ImportJob(models.Model):
+    STATES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("FAILED", "Failed")
+    ]
+    MODES = [
+        ("REPLACE", "Replace"),
+        ("INCREMENTAL", "Incremental"),
+        ("VALIDATE", "Validate only")
+    ]
+    state = models.CharField(max_length=8, choices=STATES, default="PENDING")
+    mode = models.CharField(max_length=11, choices=MODES, default="REPLACE")
+    roster = models.CharField(max_length=256)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    elapsed = models.FloatField(default=0)
+    message = models.CharField(max_length=1000, blank=True)
+    changes = models.TextField(blank=True)
+    error_report = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now_add=True)
 
 
 class Student(models.Model):
     id = models.CharField(max_length=16, primary_key=True)
     email = models.CharField(max_length=256)
-    token = models.CharField(max_length=64)
 
 
 class Instructor(models.Model):
     email = models.CharField(max_length=256, primary_key=True)
     last_name = models.CharField(max_length=256)
-    token = models.CharField(max_length=64)
 
 
 class Course(models.Model):
@@ -32,7 +66,6 @@ class Course(models.Model):
     students = models.ManyToManyField(Student, through="Enrollment")
     title = models.CharField(max_length=256)
     campus = models.CharField(max_length=256)
-    token = models.CharField(max_length=64)
     component = models.CharField(max_length=8)
     grade_base = models.CharField(max_length=8)
     subject = models.CharField(max_length=4)
@@ -46,18 +79,33 @@ class Course(models.Model):
     location = models.PositiveSmallIntegerField()
     session = models.PositiveSmallIntegerField()
     combined = models.BooleanField()
+    enrollment_count = models.PositiveIntegerField(default=0)
+    evaluated_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "subject", "catalog", "section"],
+                         name="course_term_listing_idx")
+        ]
 
 
 class Enrollment(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     grade = models.CharField(max_length=2, null=True, blank=True)
-    token = models.CharField(max_length=64)
     drop_date = models.DateField(null=True, blank=True, default="")
     add_date = models.DateField()
     dropped = models.BooleanField()
     evaluated = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "evaluated"],
+                         name="enrollment_student_eval_idx"),
+            models.Index(fields=["student", "course"],
+                         name="enrollment_student_course_idx")
+        ]
+
 
 class Question(models.Model):
     RESPONSE_TYPES = [
@@ -71,11 +119,77 @@ class Question(models.Model):
 class Response(models.Model):
     enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    text = models.CharField(max_length=1000, null=True, blank=True)
+    number = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    @property
+    def feedback(self):
+        return self.text if self.number is None else self.number
+
+
+class CourseReport(models.Model):
+    course = models.OneToOneField(
+        Course, on_delete=models.CASCADE, primary_key=True)
+    results = models.TextField()
+    built = models.DateTimeField(auto_now=True)
+
 
+class OutboxMessage(models.Model):
+    STATES = [
+        ("PENDING", "Pending"),
+        ("SENDING", "Sending"),
+        ("SENT", "Sent"),
+        ("FAILED", "Failed")
+    ]
+    campaign = models.CharField(max_length=64)
+    recipient = models.CharField(max_length=256)
+    subject = models.CharField(max_length=256)
+    body = models.TextField()
+    state = models.CharField(max_length=8, choices=STATES, default="PENDING")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    sent = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=1000, blank=True)
+    claimed_by = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        unique_together = [("campaign", "recipient")]
+        indexes = [
+            models.Index(fields=["state", "next_attempt"],
+                         name="outbox_state_next_idx")
+        ]
+
+
+class ArchivedCourse(models.Model):
+    term = models.PositiveSmallIntegerField()
+    course_id = models.PositiveIntegerField()
+    subject = models.CharField(max_length=4)
+    catalog = models.CharField(max_length=4)
+    section = models.PositiveSmallIntegerField()
+    title = models.CharField(max_length=256)
+    instructor_email = models.CharField(max_length=256)
+    instructor_last_name = models.CharField(max_length=256)
+    enrollment_count = models.PositiveIntegerField(default=0)
+    evaluated_count = models.PositiveIntegerField(default=0)
+    results = models.TextField()
+    archived = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [("term", "course_id")]
+
+
+class ArchivedQuestion(models.Model):
+    term = models.PositiveSmallIntegerField()
+    question_id = models.PositiveIntegerField()
+    prompt = models.CharField(max_length=1000)
+    response_type = models.CharField(max_length=3, choices=Question.RESPONSE_TYPES)
 
-class TextResponse(Response, models.Model):
-    feedback = models.CharField(max_length=1000)
+    class Meta:
+        unique_together = [("term", "question_id")]
 
 
-class NumberResponse(Response, models.Model):
-    feedback = models.PositiveSmallIntegerField()
+class ArchivedResponse(models.Model):
+    course = models.ForeignKey(ArchivedCourse, on_delete=models.CASCADE)
+    question = models.ForeignKey(ArchivedQuestion, on_delete=models.CASCADE)
+    text = models.CharField(max_length=1000, null=True, blank=True)
+    number = models.PositiveSmallIntegerField(null=True, blank=True)
@@ -0,0 +1,131 @@
+"""
+Email Outbox
+Author: Peter Collins
+
+Invitation and feedback emails are not sent from the web request. They are written to the OutboxMessage table
+as a campaign and delivered later by the drain_outbox management command. Each message is marked as sent as
+soon as it is delivered, so a campaign interrupted part way through can be resumed (or re-run at a different
+rate) without emailing anyone twice.
+
+Several drains may run at once, e.g. a cron job overlapping a manual run. A drain therefore claims the
+messages of a batch with a conditional update before sending them: they move to SENDING under the drain's
+owner id with a lease of OUTBOX_LEASE seconds, and only the messages actually claimed are sent. Messages left
+in SENDING by a drain which died become due again once their lease expires.
+"""
+import datetime
+import time
+import uuid
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db.models import F
+from django.utils import timezone
+from evaluations.mailer import deliver
+from evaluations.models import OutboxMessage
+
+
+"""
+The new_campaign function returns a unique campaign name for the given kind of email, e.g. 'survey'. The name
+starts with the time it was created at and ends with a random id, so two campaigns started within the same
+second (e.g. a double-clicked Start) are kept apart rather than the second one being dropped as duplicates.
+"""
+
+
+def new_campaign(kind):
+    return "%s-%s-%s" % (kind, timezone.now().strftime("%Y%m%d%H%M%S"), uuid.uuid4().hex)
+
+
+"""
+The enqueue function adds messages to the outbox in bulk. It accepts a campaign name and an iterable of
+(recipient, subject, body) tuples. A recipient already queued for the campaign is left as is. The number of
+messages actually queued is returned, which leaves out recipients that were already queued.
+"""
+
+
+def enqueue(campaign, messages):
+    outbox = [OutboxMessage(campaign=campaign, recipient=recipient, subject=subject, body=body)
+              for recipient, subject, body in messages]
+    queued = OutboxMessage.objects.filter(campaign=campaign).count()
+    OutboxMessage.objects.bulk_create(
+        outbox, batch_size=500, ignore_conflicts=True)
+    return OutboxMessage.objects.filter(campaign=campaign).count() - queued
+
+
+"""
+The drain function delivers pending outbox messages whose next attempt is due, batch_size messages at a time,
+claiming each batch first and marking every message as sent as soon as it is delivered. Failed messages are
+retried with exponential backoff starting at OUTBOX_RETRY_DELAY seconds and are marked as failed after
+max_attempts attempts. When rate is given delivery is throttled to that
+many messages per second. The function returns a dict with the number of messages sent and failed.
+"""
+
+
+def drain(campaign=None, rate=None, batch_size=None, max_attempts=None):
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+    if rate:
+        batch_size = max(1, min(batch_size, int(rate)))
+    stats = dict(sent=0, failed=0, retried=0)
+    started = time.monotonic()
+    owner = uuid.uuid4().hex
+    while True:
+        batch = claim(owner, campaign, batch_size)
+        if batch is None:
+            break
+
+        def record(index, error):
+            message = batch[index]
+            now = timezone.now()
+            if error is None:
+                OutboxMessage.objects.filter(id=message.id, claimed_by=owner).update(
+                    state="SENT", sent=now, attempts=F("attempts") + 1, last_error="", claimed_by="")
+                stats["sent"] += 1
+                return
+            attempts = message.attempts + 1
+            delay = settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+            state = "FAILED" if attempts >= max_attempts else "PENDING"
+            OutboxMessage.objects.filter(id=message.id, claimed_by=owner).update(
+                state=state, attempts=attempts, last_error=error[:1000], claimed_by="",
+                next_attempt=now + datetime.timedelta(seconds=delay))
+            stats["failed" if state == "FAILED" else "retried"] += 1
+
+        deliver([EmailMessage(message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.recipient])
+                 for message in batch], on_result=record)
+        if rate:
+            time.sleep(max(0, stats["sent"] / rate - (time.monotonic() - started)))
+    return stats
+
+
+"""
+The claim function claims up to batch_size due messages for the drain identified by owner and returns them
+ordered by id. Pending messages and messages whose lease has expired are due, they are taken in the order of
+the outbox_state_next_idx index so no query has to sort every due message. The candidates are claimed with one
+conditional update, so a message another drain claimed in between is left out. The claimed messages are read
+back by id and owner, a message this drain claimed is only given another owner once its lease has expired.
+None is returned when no message is due, an empty list when all candidates were taken by other drains.
+"""
+
+
+def claim(owner, campaign, batch_size):
+    now = timezone.now()
+    due = OutboxMessage.objects.filter(state__in=["PENDING", "SENDING"], next_attempt__lte=now)
+    if campaign:
+        due = due.filter(campaign=campaign)
+    ids = list(due.values_list("id", flat=True)[:batch_size])
+    if not ids:
+        return None
+    due.filter(id__in=ids).update(
+        state="SENDING", claimed_by=owner, next_attempt=now + datetime.timedelta(seconds=settings.OUTBOX_LEASE))
+    return list(OutboxMessage.objects.filter(id__in=ids, claimed_by=owner).order_by("id"))
+
+
+"""
+The retry_failed function returns failed messages to the queue so they are attempted again on the next drain.
+The number of messages requeued is returned.
+"""
+
+
+def retry_failed(campaign=None):
+    failed = OutboxMessage.objects.filter(state="FAILED")
+    if campaign:
+        failed = failed.filter(campaign=campaign)
+    return failed.update(state="PENDING", attempts=0, next_attempt=timezone.now())
@@ -0,0 +1,114 @@
+"""
+Worker Prewarming
+Author: Peter Collins
+
+A freshly started gunicorn worker has not loaded the URLconf (and with it the views), compiled a template or
+looked at the cache yet, so whichever student happens to reach it first waits for all of that. The prewarm
+function does the work before the worker accepts requests: it loads the URLconf, fills the status, question
+and survey form caches (see evaluations.cache) and compiles every project template. ELSE.wsgi calls it when
+PREWARM_ON_STARTUP is enabled, the prewarm management command runs it by hand, e.g. after clearing the cache.
+
+Compiled templates are only kept by Django's cached template loader, which the project settings configure
+explicitly so it is used whether DEBUG is enabled or not. Without it every render compiles the template again,
+so compiling them while prewarming would be wasted and is skipped (see caches_templates). The roster parser stays unloaded on purpose, only import jobs need it (see
+evaluations.jobs).
+"""
+import logging
+import os
+import time
+from django.db import DatabaseError, connections
+from django.template import TemplateSyntaxError, engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.urls import get_resolver
+from evaluations.cache import get_questions, get_status, get_survey_form
+
+logger = logging.getLogger("evaluations.prewarm")
+
+
+"""
+The project_templates function returns the names of the templates found in the DIRS of the template engine.
+The templates of Django's own applications are left alone, only the administrators use them.
+"""
+
+
+def project_templates():
+    names = []
+    for directory in engines["django"].engine.dirs:
+        for root, subdirectories, files in os.walk(directory):
+            names.extend(os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/")
+                         for name in files if name.endswith(".html"))
+    return sorted(set(names))
+
+
+"""
+The caches_templates function tells whether the template engine has a cached loader to keep compiled templates.
+"""
+
+
+def caches_templates():
+    return any(isinstance(loader, CachedLoader) for loader in engines["django"].engine.template_loaders)
+
+
+"""
+The compile_templates function compiles every project template and returns the number compiled. A template
+which does not compile is logged and skipped, rendering it will report the error. Nothing is compiled when the
+engine has no cached loader to keep the templates.
+"""
+
+
+def compile_templates():
+    engine = engines["django"].engine
+    compiled = 0
+    if not caches_templates():
+        logger.info("Template compilation skipped, no cached template loader is configured")
+        return compiled
+    for name in project_templates():
+        try:
+            engine.get_template(name)
+            compiled += 1
+        except TemplateSyntaxError:
+            logger.exception("Template %s does not compile", name)
+    return compiled
+
+
+"""
+The fill_caches function loads the collection status, the questions and the survey form into the cache. The
+survey form is only rendered while a collection period is active, when it can actually be requested.
+"""
+
+
+def fill_caches():
+    status = get_status()
+    get_questions()
+    if status.active:
+        get_survey_form()
+
+
+STEPS = (
+    ("urls", lambda: get_resolver().url_patterns),
+    ("caches", fill_caches),
+    ("templates", compile_templates),
+)
+
+
+"""
+The prewarm function runs every step of STEPS and returns the seconds each one took. A step which cannot
+reach the database (e.g. before the first migrate) is logged and skipped, prewarming must never keep a worker
+from starting. The connections opened are closed again so the worker does not keep one it was not given by a
+request.
+"""
+
+
+def prewarm():
+    timings = {}
+    try:
+        for name, step in STEPS:
+            started = time.perf_counter()
+            try:
+                step()
+            except DatabaseError:
+                logger.warning("Prewarming step %s skipped, the database is not available", name, exc_info=True)
+            timings[name] = time.perf_counter() - started
+    finally:
+        connections.close_all()
+    return timings
@@ -0,0 +1,129 @@
+"""
+Request Profiling
+Author: Peter Collins
+
+When REQUEST_PROFILING is enabled the ProfilingMiddleware (see evaluations.middleware) measures every request
+and passes a record to the record function below. Records are kept in a ring buffer of the last
+REQUEST_PROFILING_BUFFER requests, which the administration page summarizes per view for staff members. The
+buffer lives in the memory of each worker process, so every worker reports on the requests it served itself.
+
+Requests slower than REQUEST_PROFILING_SLOW seconds are also written to the evaluations.profiling logger
+together with the SQL they executed.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.template.base import Template
+
+logger = logging.getLogger("evaluations.profiling")
+
+records = deque(maxlen=1000)
+records_lock = threading.Lock()
+rendering = threading.local()
+
+
+"""
+The resize function replaces the ring buffer with an empty one holding up to size records.
+"""
+
+
+def resize(size):
+    global records
+    with records_lock:
+        records = deque(maxlen=size)
+
+
+"""
+The record function adds the record of a request to the ring buffer. When the request was slow it is logged
+with its queries, a list of (sql, seconds) tuples.
+"""
+
+
+def record(entry, queries=()):
+    with records_lock:
+        records.append(entry)
+    slow = settings.REQUEST_PROFILING_SLOW
+    if slow is not None and entry["seconds"] >= slow:
+        logger.warning(
+            "Slow request %s %s (%s) took %.3fs with %d queries:\n%s",
+            entry["method"], entry["path"], entry["view"], entry["seconds"], entry["queries"],
+            "\n".join("%.4fs %s" % (seconds, sql) for sql, seconds in queries)
+        )
+
+
+"""
+The summary function aggregates the buffered records per view and returns a list of dicts ordered by the total
+time spent in each view.
+"""
+
+
+def summary():
+    with records_lock:
+        entries = list(records)
+    views = {}
+    for entry in entries:
+        view = views.setdefault(entry["view"], dict(
+            view=entry["view"], requests=0, seconds=0.0, max_seconds=0.0, queries=0, db_seconds=0.0,
+            template_seconds=0.0, bytes=0))
+        view["requests"] += 1
+        view["seconds"] += entry["seconds"]
+        view["max_seconds"] = max(view["max_seconds"], entry["seconds"])
+        view["queries"] += entry["queries"]
+        view["db_seconds"] += entry["db_seconds"]
+        view["template_seconds"] += entry["template_seconds"]
+        view["bytes"] += entry["bytes"]
+    for view in views.values():
+        view["mean_seconds"] = view["seconds"] / view["requests"]
+        view["mean_queries"] = view["queries"] / view["requests"]
+        view["mean_db_seconds"] = view["db_seconds"] / view["requests"]
+        view["mean_template_seconds"] = view["template_seconds"] / view["requests"]
+        view["mean_bytes"] = view["bytes"] / view["requests"]
+    return sorted(views.values(), key=lambda view: view["seconds"], reverse=True)
+
+
+"""
+The instrument_templates function wraps Template.render so the time spent rendering templates is added to the
+current thread's template_seconds. Only the outermost render is timed, templates included by it are part of
+its time already. The function is idempotent.
+"""
+
+
+def instrument_templates():
+    if getattr(Template.render, "profiled", False):
+        return
+    render = Template.render
+
+    def profiled_render(self, context):
+        if getattr(rendering, "depth", None) is None:
+            return render(self, context)
+        rendering.depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            rendering.depth -= 1
+            if rendering.depth == 0:
+                rendering.seconds += time.perf_counter() - started
+
+    profiled_render.profiled = True
+    Template.render = profiled_render
+
+
+"""
+The start_templates and stop_templates functions bracket a request on the current thread, stop_templates
+returns the time spent rendering templates since start_templates.
+"""
+
+
+def start_templates():
+    rendering.depth = 0
+    rendering.seconds = 0.0
+
+
+def stop_templates():
+    seconds = getattr(rendering, "seconds", 0.0)
+    rendering.depth = None
+    rendering.seconds = 0.0
+    return seconds
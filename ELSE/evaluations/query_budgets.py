@@ -0,0 +1,172 @@
+"""
+Query Budgets
+Author: Peter Collins
+
+Every view must answer with a fixed number of queries however large the roster is, a view whose query count
+grows with the rows it renders is walking a relation lazily (an N+1 query). BUDGETS lists the most queries
+each view may run. The check_query_budgets management command imports two synthetic rosters of very different
+sizes (PROFILES) into scratch databases, requests every view the way the administrator, a student and an
+instructor would, and fails when a view exceeds its budget or runs a different number of queries for the two
+rosters.
+
+Requests are measured with the caches warm (each view is requested once before it is measured), except the
+analytics which are measured right after their cache was invalidated since computing them is the point.
+Requests of logged in users include the two queries of the session and user lookups.
+"""
+import os
+import tempfile
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from evaluations.benchmarks.cycle import QUESTIONS, answers
+from evaluations.benchmarks.environment import scratch_environment
+from evaluations.benchmarks.roster import write_roster
+from evaluations.cache import bump_analytics_version
+from evaluations.links import link
+from evaluations.models import Course, Enrollment, ImportJob, Question, Status
+
+BUDGETS = {
+    "Administration.get": 5,
+    "Stats.get": 4,
+    "ImportProgress.get": 3,
+    "Students.get": 1,
+    "Survey.get": 1,
+    "Survey.post": 6,
+    "Instructors.get": 1,
+    "Feedback.get": 2,
+    "Analytics.get": 3,
+    "AnalyticsData.get": 3,
+    "Export.get": 4,
+}
+
+PROFILES = {
+    "small": dict(students=20, courses=2, sections=1, per_student=2),
+    "large": dict(students=400, courses=20, sections=3, per_student=6),
+}
+
+
+"""
+The capture_queries function performs a request with the given client and returns the (sql, params) of every
+query it ran and the response. Streaming responses are consumed inside the capture.
+"""
+
+
+def capture_queries(client, method, path, data=None):
+    queries = []
+
+    def capture(execute, sql, params, many, context):
+        queries.append((sql, None if many else params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(capture):
+        response = getattr(client, method)(path, data or {})
+        if response.streaming:
+            b"".join(response.streaming_content)
+    assert response.status_code == 200, (path, response.status_code)
+    return queries, response
+
+
+"""
+The count_queries function performs a request with the given client and returns the number of queries it ran
+and the response.
+"""
+
+
+def count_queries(client, method, path, data=None):
+    queries, response = capture_queries(client, method, path, data)
+    return len(queries), response
+
+
+"""
+The populate function creates the questions of a collection cycle, imports the roster at roster_path and
+starts a collection period through the administration views. It returns the logged in administrator's client
+and the import job. It must be run inside scratch_environment.
+"""
+
+
+def populate(roster_path):
+    User.objects.create_superuser("budget", "budget@scu.edu", "budget")
+    admin = Client()
+    admin.login(username="budget", password="budget")
+    for prompt, response_type in QUESTIONS:
+        admin.post("/questions", {"question-prompt": prompt, "question-type": response_type,
+                                  "question-action": "Save"})
+    with open(roster_path, "rb") as roster:
+        admin.post("/parser", {"registration-roster": roster})
+    admin.post("/administration/", {"admin-action": "Start"})
+    return admin, ImportJob.objects.latest("id")
+
+
+"""
+The measure_views function runs the requests of a collection cycle against the roster at roster_path and
+returns the number of queries of each view in BUDGETS. It must be run inside scratch_environment.
+"""
+
+
+def measure_views(roster_path):
+    counts = {}
+
+    def measure(name, client, method, path, data=None, warm=True):
+        if warm:
+            count_queries(client, method, path, data)
+        counts[name], response = count_queries(client, method, path, data)
+        return response
+
+    admin, job = populate(roster_path)
+    period = Status.objects.get(id=1).period
+    questions = list(Question.objects.order_by("id"))
+
+    measure("Administration.get", admin, "get", "/administration/")
+    measure("Stats.get", admin, "get", "/administration/stats")
+    measure("ImportProgress.get", admin, "get", "/parser/jobs/%d" % job.id)
+
+    student_id = Enrollment.objects.values("student_id").annotate(
+        enrollments=Count("id")).order_by("-enrollments", "student_id")[0]["student_id"]
+    enrollments = list(Enrollment.objects.filter(student_id=student_id).order_by("id"))
+    student = Client()
+    measure("Students.get", student, "get", link("student", [student_id], period))
+    measure("Survey.get", student, "get", link("survey", [student_id, enrollments[0].course_id], period))
+    for index, enrollment in enumerate(enrollments[:2]):
+        response = measure("Survey.post", student, "post", link("survey", [student_id, enrollment.course_id], period),
+                           answers(questions, index), warm=False)
+        assert b"Survey responses saved" in response.content, response.content
+    admin.post("/administration/", {"admin-action": "Stop"})
+
+    instructor_email = Course.objects.values("instructor_id").annotate(
+        courses=Count("id")).order_by("-courses", "instructor_id")[0]["instructor_id"]
+    course = Course.objects.filter(id=enrollments[0].course_id).first()
+    instructor = Client()
+    measure("Instructors.get", instructor, "get", link("instructor", [instructor_email], period))
+    measure("Feedback.get", instructor, "get", link("feedback", [course.instructor_id, course.id], period))
+
+    for name, path in (("Analytics.get", "/analytics?scope=course"), ("AnalyticsData.get", "/analytics/course")):
+        bump_analytics_version()
+        measure(name, admin, "get", path, warm=False)
+    measure("Export.get", admin, "get", "/export")
+    return counts
+
+
+"""
+The check_budgets function measures every view with each roster of PROFILES and returns the counts per profile
+and the list of problems found: views over budget and views whose count depends on the roster.
+"""
+
+
+def check_budgets():
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for profile, options in PROFILES.items():
+            roster_path = os.path.join(directory, profile + ".csv")
+            write_roster(roster_path, **options)
+            with scratch_environment(os.path.join(directory, profile + ".sqlite3")):
+                results[profile] = measure_views(roster_path)
+    problems = []
+    for view, budget in BUDGETS.items():
+        counts = [results[profile][view] for profile in PROFILES]
+        if max(counts) > budget:
+            problems.append("%s ran %d queries, its budget is %d." % (view, max(counts), budget))
+        if len(set(counts)) > 1:
+            problems.append("%s ran %s queries for the %s rosters." % (
+                view, " and ".join(map(str, counts)), " and ".join(PROFILES)))
+    return results, problems
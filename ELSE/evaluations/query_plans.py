@@ -0,0 +1,198 @@
+"""
+Query Plans
+Author: Peter Collins
+
+The public views look records up by student, instructor and course on every request. HOT_REQUESTS lists those
+requests together with the indexes SQLite is expected to use for them. Rather than keeping copies of the
+queries, which drift from the views as they change, capture_plans imports a synthetic roster into a scratch
+database, performs every request the way a student, an instructor or the administrator would and records the
+SQL each one actually ran with an execute wrapper, as evaluations.query_budgets counts it. Every SELECT is then
+run through EXPLAIN QUERY PLAN. The check_query_plans management command (and the test suite) fail when a query
+falls back to scanning a table or sorting its rows in a temporary B-tree, so a change to a query or to the
+indexes cannot silently slow the views down.
+
+The tables in SMALL_TABLES hold one row or a handful (the questions, the collection status and the dashboard
+totals) and may be scanned. Requests which read a whole table or sort on purpose list the plan lines they accept.
+"""
+import os
+import tempfile
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from evaluations import outbox
+from evaluations.archive import archive_term
+from evaluations.benchmarks.cycle import answers
+from evaluations.benchmarks.environment import scratch_environment
+from evaluations.benchmarks.roster import write_roster
+from evaluations.links import link
+from evaluations.models import Course, CourseReport, Enrollment, Question, Status
+from evaluations.query_budgets import capture_queries, populate
+
+SMALL_TABLES = {"evaluations_question", "evaluations_status", "evaluations_counters"}
+
+# (name, indexes which must appear in the plans of the request, plan lines it accepts). Stopping the collection
+# period builds the report of every course and mails every instructor, so it reads those tables whole. A report
+# built on request, for a course closed before reports existed, sorts that course's responses to list them in the
+# order they were given, as build_reports does. An export sorts the term it exports.
+HOT_REQUESTS = [
+    ("Students.get", ["enrollment_student_eval_idx"], []),
+    ("Survey.get", ["enrollment_student_course_idx"], []),
+    ("Survey.post", ["enrollment_student_course_idx"], []),
+    ("Administration.post Stop", [], ["SCAN evaluations_response", "SCAN evaluations_course",
+                                      "SCAN evaluations_instructor"]),
+    ("Instructors.get", [], []),
+    ("Feedback.get", [], []),
+    ("Feedback.get without report", [], ["USE TEMP B-TREE FOR ORDER BY"]),
+    ("Export.get archived term", ["evaluations_archivedcourse_term_course_id"], ["USE TEMP B-TREE"]),
+    ("drain_outbox", ["outbox_state_next_idx"], []),
+]
+
+PROFILE = dict(students=400, courses=20, sections=3, per_student=6)
+
+
+"""
+The explain function returns the detail lines of SQLite's EXPLAIN QUERY PLAN for a query and its parameters.
+"""
+
+
+def explain(sql, params=None):
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+"""
+The scanned_table function returns the table a plan line scans, or None when the line is not a scan. SQLite
+writes "SCAN TABLE name" before version 3.36 and "SCAN name" since.
+"""
+
+
+def scanned_table(detail):
+    words = detail.split()
+    if not words or words[0] != "SCAN" or len(words) < 2:
+        return None
+    return words[2] if words[1] == "TABLE" and len(words) > 2 else words[1]
+
+
+"""
+The check_plan function returns a list of problems with the plan of a query: a scan of a table which is not
+small, or a temporary B-tree built to sort or group the rows. Plan lines starting with one of allowed are
+accepted.
+"""
+
+
+def check_plan(plan, allowed=()):
+    problems = []
+    for detail in plan:
+        if any(detail.startswith(prefix) for prefix in allowed):
+            continue
+        table = scanned_table(detail)
+        if table and table not in SMALL_TABLES:
+            problems.append("scan: " + detail)
+        elif "TEMP B-TREE" in detail:
+            problems.append("sort: " + detail)
+    return problems
+
+
+"""
+The capture_requests function performs every request of HOT_REQUESTS against the roster at roster_path and
+returns the (sql, params) of the queries each one ran. Each request is made once before it is captured so the
+caches are warm, except the submissions and the stop of the collection period which change the database.
+It must be run inside scratch_environment.
+"""
+
+
+def capture_requests(roster_path):
+    captured = {}
+
+    def capture(name, client, method, path, data=None, warm=True):
+        if warm:
+            capture_queries(client, method, path, data)
+        captured[name], response = capture_queries(client, method, path, data)
+        return response
+
+    admin, job = populate(roster_path)
+    period = Status.objects.get(id=1).period
+    questions = list(Question.objects.order_by("id"))
+    student_id = Enrollment.objects.values("student_id").annotate(
+        enrollments=Count("id")).order_by("-enrollments", "student_id")[0]["student_id"]
+    enrollments = list(Enrollment.objects.filter(student_id=student_id).order_by("id"))
+    student = Client()
+    capture("Students.get", student, "get", link("student", [student_id], period))
+    capture("Survey.get", student, "get", link("survey", [student_id, enrollments[0].course_id], period))
+    capture("Survey.post", student, "post", link("survey", [student_id, enrollments[0].course_id], period),
+            answers(questions, 0), warm=False)
+    capture("Administration.post Stop", admin, "post", "/administration/", {"admin-action": "Stop"}, warm=False)
+
+    course = Course.objects.get(id=enrollments[0].course_id)
+    instructor = Client()
+    capture("Instructors.get", instructor, "get", link("instructor", [course.instructor_id], period))
+    feedback = link("feedback", [course.instructor_id, course.id], period)
+    capture("Feedback.get", instructor, "get", feedback)
+    CourseReport.objects.filter(course=course).delete()
+    capture("Feedback.get without report", instructor, "get", feedback, warm=False)
+
+    captured["drain_outbox"] = capture_drain()
+    term = course.term
+    archive_term(term)
+    capture("Export.get archived term", admin, "get", "/export?term=%d" % term)
+    return captured
+
+
+"""
+The capture_drain function delivers the queued invitations the way the drain_outbox command does and returns
+the queries it ran.
+"""
+
+
+def capture_drain():
+    queries = []
+
+    def capture(execute, sql, params, many, context):
+        queries.append((sql, None if many else params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(capture):
+        outbox.drain()
+    return queries
+
+
+"""
+The capture_plans function captures the queries of HOT_REQUESTS in a scratch database and returns, per request,
+the list of (sql, plan, problems) of every SELECT together with the list of expected indexes none of its plans
+used.
+"""
+
+
+def capture_plans():
+    with tempfile.TemporaryDirectory() as directory:
+        roster_path = os.path.join(directory, "roster.csv")
+        write_roster(roster_path, **PROFILE)
+        with scratch_environment(os.path.join(directory, "plans.sqlite3")):
+            captured = capture_requests(roster_path)
+            results = {}
+            for name, indexes, allowed in HOT_REQUESTS:
+                plans = []
+                for sql, params in captured[name]:
+                    if params is None or not sql.lstrip().upper().startswith("SELECT"):
+                        continue
+                    plan = explain(sql, params)
+                    plans.append((sql, plan, check_plan(plan, allowed)))
+                unused = [index for index in indexes
+                          if not any(index in detail for sql, plan, problems in plans for detail in plan)]
+                results[name] = dict(plans=plans, unused=unused)
+    return results
+
+
+"""
+The plan_problems function returns the list of problems found by capture_plans, one line per query.
+"""
+
+
+def plan_problems(results):
+    problems = []
+    for name, result in results.items():
+        for sql, plan, query_problems in result["plans"]:
+            problems.extend("%s: %s in %s" % (name, problem, sql) for problem in query_problems)
+        problems.extend("%s: index %s not used" % (name, index) for index in result["unused"])
+    return problems
@@ -2,80 +2,360 @@
 Registration Parser
 Author: Peter Collins
 
-The registration parser uses the xlrd Python package in order to parse the provided Excel registration
-roster file. The parser iterates over the data and creates instances of Django models in order to populate
-the database.
+The registration parser reads the provided registration roster file through one of the readers defined in
+evaluations.roster_readers (Excel, streaming xlsx or CSV/TSV). The parser iterates over the data and creates
+instances of Django models in order to populate the database.
 """
-import random
-import string
 from django.core.exceptions import ValidationError
-from evaluations.models import Student, Instructor, Course, Enrollment
+from django.db import transaction
+from django.db.models import F
+from collections import Counter
+from evaluations.archive import archive_term
+from evaluations.cache import bump_analytics_version
+from evaluations.counters import add_counts, recount, reset_counters
+from evaluations.models import Student, Instructor, Course, Enrollment, Response
+from evaluations.reports import rebuild_reports
+from evaluations.roster_readers import get_reader
+from evaluations.validation import decode_date
 import logging
-import datetime
-import xlrd
+import time
 
 
 class RegistrationParser():
+    BATCH_SIZE = 500
+    PROGRESS_INTERVAL = 1000
+
+    # Fields compared and updated by an incremental import (see parse_incremental).
+    STUDENT_FIELDS = ["email"]
+    INSTRUCTOR_FIELDS = ["last_name"]
+    COURSE_FIELDS = ["instructor_id", "title", "campus", "component", "grade_base", "subject", "catalog",
+                     "career", "course_type", "term", "section", "total_enrollment", "units", "location",
+                     "session", "combined"]
+    ENROLLMENT_FIELDS = ["grade", "drop_date", "dropped"]
+
+    """
+    The constructor accepts the path to a registration roster file and an optional reader. When no reader is
+    given one is chosen from the file extension, reading the roster from contents when its bytes are given
+    instead of from the path. The errors attribute collects a (row, column, value, message)
+    tuple for every row which fails to parse, in the format of evaluations.validation. The rejected attribute
+    collects the (student id, course id) of every row which failed or was skipped, either being None when it
+    cannot be read from the row.
+    """
+
+    def __init__(self, roster_path, reader=None, contents=None):
+        self.reader = reader or get_reader(roster_path, contents)
+        self.errors = []
+        self.rejected = []
 
     """
-    The constructor accepts the path to an Excel registration roster file and parses relevant information.
+    The parse_all method is the primary method of the parser. The method iterates over all rows yielded by the roster
+    reader and serializes the data into a format the Django models will understand. Students, instructors
+    and courses are deduplicated in memory while reading, so no database lookups are performed per row. Once every
+    row has been read the new records are written with batched bulk inserts inside a single transaction, so a
+    failed import is rolled back as a whole. The dashboard counters are incremented in the same transaction. Terms other than
+    the roster's are archived first, when flush is true the existing roster is removed in that same transaction. An optional progress callable is called with the number of rows read and failed every
+    PROGRESS_INTERVAL rows. Rows whose number is in skip, those already rejected by the validation pre-pass, are
+    counted as failed without being parsed. The method returns a dict of import statistics.
     """
 
-    def __init__(self, excel_file_path):
-        self.workbook = xlrd.open_workbook(excel_file_path)
-        self.sheet = self.workbook.sheet_by_index(0)
-        self.fields = self.sheet.row_values(0)
+    def parse_all(self, flush=False, progress=None, skip=()):
+        started = time.monotonic()
+        students, instructors, courses, enrollments, rows, failed = self.read_roster(progress, skip)
+        course_enrollments = Counter(
+            enrollment.course_id for enrollment in enrollments)
+        for course in courses.values():
+            course.enrollment_count = course_enrollments[course.id]
+        with transaction.atomic():
+            archived = self.archive_other_terms(courses)
+            if flush:
+                self.flush_db()
+            new_students = self.bulk_insert(Student, students)
+            new_instructors = self.bulk_insert(Instructor, instructors)
+            new_courses = self.bulk_insert(Course, courses)
+            Enrollment.objects.bulk_create(
+                enrollments, batch_size=self.BATCH_SIZE)
+            new_course_ids = set(course.id for course in new_courses)
+            for course_id, count in course_enrollments.items():
+                if course_id not in new_course_ids:
+                    Course.objects.filter(id=course_id).update(
+                        enrollment_count=F("enrollment_count") + count)
+            add_counts(students=len(new_students), instructors=len(new_instructors),
+                       courses=len(new_courses), enrollments=len(enrollments))
+        stats = self.import_stats(
+            started, rows, failed, courses, archived,
+            students=len(students),
+            instructors=len(instructors),
+            courses=len(courses),
+            enrollments=len(enrollments)
+        )
+        logging.info("Imported %(rows)d roster rows (%(failed)d failed) in %(seconds).2fs, "
+                     "%(rows_per_second).0f rows/sec", stats)
+        return stats
 
     """
-    The generate_token method generates a random 64 character ASCII string to be used as secure tokens for
-    authenticating students and instructors.
+    The parse_incremental method brings the database in line with the roster without flushing it. Students are
+    matched on Student ID, instructors on email, courses on Class Nbr and enrollments on the pair of student and
+    course. Terms other than the roster's are archived first. Then only the differences are written, in bulk and
+    inside a single transaction: new records are inserted, changed fields are updated and records which are no
+    longer on the roster are deleted (with the responses of deleted enrollments). Enrollments and responses which
+    are still on the roster are left alone, and so are the enrollments of rejected rows, as those rows may well
+    still be on the roster. Students, courses and instructors which kept enrollments or courses are not deleted
+    either. The totals and the stored reports of the affected courses are
+    rebuilt and the cached analytics invalidated, as responses may have been removed. The optional progress
+    callable and skip are used as in parse_all. The method returns a dict of import statistics whose changes
+    entry holds the number of records added, updated and removed per model.
     """
 
-    def generate_token(self):
-        return "".join(random.choice(string.ascii_letters) for i in range(64))
+    def parse_incremental(self, progress=None, skip=()):
+        started = time.monotonic()
+        students, instructors, courses, enrollments, rows, failed = self.read_roster(progress, skip)
+        enrollments = {(enrollment.student_id, enrollment.course_id): enrollment for enrollment in enrollments}
+        changes = {}
+        with transaction.atomic():
+            archived = self.archive_other_terms(courses)
+            changes["instructors"], removed_instructors = self.sync_records(
+                Instructor, instructors, self.INSTRUCTOR_FIELDS)
+            changes["students"], removed_students = self.sync_records(
+                Student, students, self.STUDENT_FIELDS)
+            changes["courses"], removed_courses = self.sync_records(
+                Course, courses, self.COURSE_FIELDS)
+            changes["enrollments"], removed_enrollments, touched_courses = self.sync_enrollments(
+                enrollments, self.rejected)
+            changes["responses"] = dict(removed=Response.objects.filter(
+                enrollment_id__in=removed_enrollments).count())
+            self.delete_records(Enrollment, removed_enrollments)
+            removed_courses = self.unreferenced(removed_courses, Enrollment, "course_id")
+            self.delete_records(Course, removed_courses)
+            removed_students = self.unreferenced(removed_students, Enrollment, "student_id")
+            self.delete_records(Student, removed_students)
+            removed_instructors = self.unreferenced(removed_instructors, Course, "instructor_id")
+            self.delete_records(Instructor, removed_instructors)
+            for name, removed in (("courses", removed_courses), ("students", removed_students),
+                                  ("instructors", removed_instructors)):
+                changes[name]["removed"] = len(removed)
+            recount(touched_courses)
+            rebuild_reports(touched_courses)
+            bump_analytics_version()
+        stats = self.import_stats(started, rows, failed, courses, archived, changes=changes)
+        logging.info("Updated roster from %(rows)d rows (%(failed)d failed) in %(seconds).2fs: %(changes)s", stats)
+        return stats
 
     """
-    The parse_all method is the primary method of the parser. The method iterates over all rows in the Excel
-    spreadsheet and serializes the data into a format the Django models will understand. In each iteration
-    a database lookup is performed to see if a record already exists, if not a token is generated and an object
-    instance is created. The method takes no parameter and returns no values.
+    The read_roster method reads every row of the roster. Students, instructors and courses are deduplicated
+    in memory while reading, so no database lookups are performed per row. Rows which fail validation are
+    logged, counted and added to errors, rows listed in skip are only counted. Both are added to rejected. The method returns the students, instructors and courses as dicts keyed by primary
+    key, the list of enrollments and the number of rows read and failed.
     """
 
-    def parse_all(self):
-        for index in range(1, self.sheet.nrows):
+    def read_roster(self, progress=None, skip=()):
+        students = {}
+        instructors = {}
+        courses = {}
+        enrollments = []
+        rows = 0
+        failed = 0
+        for index, entry in enumerate(self.reader.rows(), 2):
+            rows += 1
+            if progress and rows % self.PROGRESS_INTERVAL == 0:
+                progress(rows, failed)
+            if index in skip:
+                failed += 1
+                self.rejected.append(self.rejected_key(entry))
+                continue
             try:
-                entry = dict(zip(self.fields, self.sheet.row_values(index)))
                 student_data, instructor_data, course_data, enrollment_data = self.parse_entry(
                     entry
                 )
-                student = Student.objects.filter(id=student_data["id"]).first()
+                student = students.get(student_data["id"])
                 if not student:
-                    student = Student(
-                        **student_data, token=self.generate_token())
-                    student.full_clean()
-                    student.save()
-                instructor = Instructor.objects.filter(
-                    email=instructor_data["email"]).first()
+                    student = Student(**student_data)
+                    student.full_clean(validate_unique=False)
+                    students[student.id] = student
+                instructor = instructors.get(instructor_data["email"])
                 if not instructor:
-                    instructor = Instructor(
-                        **instructor_data, token=self.generate_token())
-                    instructor.full_clean()
-                    instructor.save()
-                course = Course.objects.filter(id=course_data["id"]).first()
+                    instructor = Instructor(**instructor_data)
+                    instructor.full_clean(validate_unique=False)
+                    instructors[instructor.email] = instructor
+                course = courses.get(course_data["id"])
                 if not course:
                     course = Course(
-                        **course_data, instructor=instructor, token=self.generate_token())
-                    course.full_clean()
-                    course.save()
+                        **course_data, instructor_id=instructor.email)
+                    course.full_clean(
+                        exclude=["instructor"], validate_unique=False)
+                    courses[course.id] = course
                 enrollment = Enrollment(
-                    **enrollment_data, student=student, course=course, token=self.generate_token()
+                    **enrollment_data, student_id=student.id, course_id=course.id
                 )
-                enrollment.full_clean()
-                enrollment.save()
+                enrollment.full_clean(
+                    exclude=["student", "course"], validate_unique=False)
+                enrollments.append(enrollment)
             except ValidationError as ve:
-                logging.error(ve)
+                failed += 1
+                logging.error("Row %d: %s", index, ve)
+                self.errors.extend((index, field, "", "; ".join(messages))
+                                   for field, messages in ve.message_dict.items())
+                self.rejected.append(self.rejected_key(entry))
             except Exception as e:
-                print(e)
+                failed += 1
+                logging.error("Row %d: %r", index, e)
+                self.errors.append((index, "", "", repr(e)))
+                self.rejected.append(self.rejected_key(entry))
+        if progress:
+            progress(rows, failed)
+        return students, instructors, courses, enrollments, rows, failed
+
+    """
+    The rejected_key method returns the (student id, course id) of a row which failed to parse, either being
+    None when the row does not hold a usable value for it.
+    """
+
+    def rejected_key(self, entry):
+        try:
+            course_id = int(entry["Class Nbr"])
+        except (KeyError, TypeError, ValueError):
+            course_id = None
+        return entry.get("Student ID") or None, course_id
+
+    """
+    The archive_other_terms method archives every term in the database which the roster does not contain (see
+    evaluations.archive), so the working tables only ever hold the imported term. A term which has been archived
+    before is merged into the archive rather than failing the import. Nothing is archived when the roster has no
+    valid rows. The method accepts the dict of courses read and returns the archived terms.
+    """
+
+    def archive_other_terms(self, courses):
+        if not courses:
+            return []
+        terms = set(course.term for course in courses.values())
+        closed = sorted(set(Course.objects.exclude(term__in=terms).values_list("term", flat=True)))
+        for term in closed:
+            archive_term(term, merge=True)
+        return closed
+
+    """
+    The import_stats method returns the statistics of an import which started at the given monotonic time,
+    together with any further statistics passed as keyword arguments. The term of the roster is the latest
+    term of the courses read.
+    """
+
+    def import_stats(self, started, rows, failed, roster_courses, archived, **stats):
+        elapsed = time.monotonic() - started
+        stats.update(
+            rows=rows,
+            failed=failed,
+            term=max((course.term for course in roster_courses.values()), default=None),
+            archived=archived,
+            seconds=elapsed,
+            rows_per_second=rows / elapsed if elapsed else 0.0
+        )
+        return stats
+
+    """
+    The flush_db method removes all model instances from the database except questions and resets the
+    dashboard counters. The method takes no parameters and returns no value.
+    """
+
+    def flush_db(self):
+        Student.objects.all().delete()
+        Instructor.objects.all().delete()
+        Course.objects.all().delete()
+        Enrollment.objects.all().delete()
+        Response.objects.all().delete()
+        reset_counters()
+
+    """
+    The bulk_insert method writes the deduplicated instances of a model in batches. Records whose primary key
+    already exists in the database are skipped, matching the lookup-before-create behaviour of a row by row
+    import. The method accepts a model class and a dict of instances keyed by primary key and returns the list
+    of instances inserted.
+    """
+
+    def bulk_insert(self, model, instances):
+        existing = set(model.objects.values_list("pk", flat=True))
+        return model.objects.bulk_create(
+            [instance for pk, instance in instances.items() if pk not in existing],
+            batch_size=self.BATCH_SIZE
+        )
+
+    """
+    The sync_records method inserts the instances of a model which are not in the database yet and updates the
+    given fields of those which changed. The method accepts a model class, a dict of instances keyed by primary
+    key and a list of field names. It returns a dict with the number of records added and updated and the
+    primary keys of the records missing from the instances, which the caller deletes once nothing refers to
+    them any more.
+    """
+
+    def sync_records(self, model, instances, fields):
+        existing = model.objects.only(*fields).in_bulk()
+        added = [instance for pk, instance in instances.items() if pk not in existing]
+        updated = [
+            instance for pk, instance in instances.items()
+            if pk in existing and any(getattr(instance, field) != getattr(existing[pk], field) for field in fields)
+        ]
+        model.objects.bulk_create(added, batch_size=self.BATCH_SIZE)
+        model.objects.bulk_update(updated, fields, batch_size=self.BATCH_SIZE)
+        removed = [pk for pk in existing if pk not in instances]
+        return dict(added=len(added), updated=len(updated), removed=len(removed)), removed
+
+    """
+    The sync_enrollments method applies the enrollment differences: enrollments are inserted, their
+    ENROLLMENT_FIELDS updated in place (keeping their evaluated flag and responses) or marked for removal. An
+    enrollment missing from the roster is kept when a rejected row may hold it: a row whose student and course
+    ids could be read keeps that enrollment, a row with only one of them keeps every enrollment of that student
+    or course and a row with neither keeps them all. The method accepts a dict of enrollments keyed by
+    (student id, course id) and the rejected keys (see read_roster), and returns the change counts, the ids of
+    the enrollments to remove and the ids of the courses whose enrollments were added or removed.
+    """
+
+    def sync_enrollments(self, enrollments, rejected=()):
+        rejected_pairs = set(key for key in rejected if None not in key)
+        rejected_students = set(student_id for student_id, course_id in rejected if course_id is None)
+        rejected_courses = set(course_id for student_id, course_id in rejected if student_id is None)
+        keep_all = None in rejected_students
+        existing = {}
+        removed = []
+        for enrollment in Enrollment.objects.only("student", "course", *self.ENROLLMENT_FIELDS).order_by("id"):
+            key = (enrollment.student_id, enrollment.course_id)
+            if key in existing:
+                removed.append(enrollment)
+            elif key in enrollments:
+                existing[key] = enrollment
+            elif not (keep_all or key in rejected_pairs or key[0] in rejected_students
+                      or key[1] in rejected_courses):
+                removed.append(enrollment)
+        added = [enrollment for key, enrollment in enrollments.items() if key not in existing]
+        updated = []
+        for key, current in existing.items():
+            enrollment = enrollments[key]
+            if any(getattr(enrollment, field) != getattr(current, field) for field in self.ENROLLMENT_FIELDS):
+                for field in self.ENROLLMENT_FIELDS:
+                    setattr(current, field, getattr(enrollment, field))
+                updated.append(current)
+        Enrollment.objects.bulk_create(added, batch_size=self.BATCH_SIZE)
+        Enrollment.objects.bulk_update(updated, self.ENROLLMENT_FIELDS, batch_size=self.BATCH_SIZE)
+        touched = set(enrollment.course_id for enrollment in added + removed)
+        changes = dict(added=len(added), updated=len(updated), removed=len(removed))
+        return changes, [enrollment.id for enrollment in removed], touched
+
+    """
+    The unreferenced method returns the primary keys among pks which no record of the referring model refers
+    to through the given field, those which can be deleted without cascading.
+    """
+
+    def unreferenced(self, pks, model, field):
+        referenced = set()
+        for start in range(0, len(pks), self.BATCH_SIZE):
+            referenced.update(model.objects.filter(
+                **{field + "__in": pks[start:start + self.BATCH_SIZE]}).values_list(field, flat=True))
+        return [pk for pk in pks if pk not in referenced]
+
+    """
+    The delete_records method deletes the records of a model with the given primary keys in batches.
+    """
+
+    def delete_records(self, model, pks):
+        for start in range(0, len(pks), self.BATCH_SIZE):
+            model.objects.filter(pk__in=pks[start:start + self.BATCH_SIZE]).delete()
 
     """
     The parse_entry method normalizes data from a spreadsheet row (zipped with column headers) into a tuple
@@ -121,14 +401,10 @@ class RegistrationParser():
         return student_data, instructor_data, course_data, enrollment_data
 
     """
-    The parse_data method is a helper method to format dates given Excels unique method of representation.
-    The method accepts an Excel formatted data as a parameter and returns a Python datetime object.
+    The parse_data method is a helper method to format dates given Excels unique method of representation,
+    decoded with the date mode of the roster reader (see evaluations.validation.decode_date). The method
+    accepts an Excel formatted data as a parameter and returns the date formatted as YYYY-MM-DD.
     """
 
     def parse_date(self, excel_date):
-        if excel_date == "":
-            return None
-        xlrd_date = xlrd.xldate_as_tuple(
-            excel_date, self.workbook.datemode
-        )
-        return datetime.datetime(*xlrd_date).strftime("%Y-%m-%d")
+        return decode_date(excel_date, self.reader.datemode)
@@ -0,0 +1,145 @@
+"""
+Course Reports
+Author: Peter Collins
+
+Responses can no longer change once a collection period has been stopped, so the feedback shown to
+instructors is computed once at that point. The build_reports function groups every response by course and
+question in a single pass over the response table and stores the result as one CourseReport row per course.
+The Feedback view then only has to load the report of the requested course.
+"""
+import json
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from evaluations.models import Course, CourseReport, Question, Response
+
+
+"""
+The summarize function returns the count, mean, minimum, maximum and the number of responses per value of a
+list of numeric responses.
+"""
+
+
+def summarize(values):
+    if not values:
+        return dict(count=0, mean=None, minimum=None, maximum=None, distribution={})
+    distribution = defaultdict(int)
+    for value in values:
+        distribution[value] += 1
+    return dict(
+        count=len(values),
+        mean=round(sum(values) / len(values), 2),
+        minimum=min(values),
+        maximum=max(values),
+        distribution=dict(sorted(distribution.items()))
+    )
+
+
+"""
+The report_results function lays out the grouped feedback of one course in the order of the questions. The
+result is the list of dicts rendered by the feedback template.
+"""
+
+
+def report_results(questions, feedback):
+    results = []
+    for question in questions:
+        values = feedback.get(question.id, [])
+        result = {
+            "question": {
+                "id": question.id,
+                "prompt": question.prompt,
+                "response_type": question.response_type
+            },
+            "feedback": values
+        }
+        if question.response_type == "NUM":
+            result["summary"] = summarize(values)
+        results.append(result)
+    return results
+
+
+"""
+The group_feedback function reads the responses of the given courses (or of all courses) and groups them as
+{course id: {question id: [feedback]}}.
+"""
+
+
+def group_feedback(course_ids=None):
+    feedback = defaultdict(lambda: defaultdict(list))
+    responses = Response.objects.all()
+    if course_ids is not None:
+        responses = responses.filter(enrollment__course_id__in=course_ids)
+    rows = responses.order_by("id").values_list(
+        "enrollment__course_id", "question_id", "text", "number")
+    for course_id, question_id, text, number in rows.iterator():
+        feedback[course_id][question_id].append(text if number is None else number)
+    return feedback
+
+
+"""
+The build_reports function replaces the reports of all courses. It is called when a collection period is
+stopped. The number of reports built is returned.
+"""
+
+
+def build_reports():
+    questions = list(Question.objects.order_by("id"))
+    feedback = group_feedback()
+    reports = [
+        CourseReport(course_id=course_id, results=json.dumps(
+            report_results(questions, feedback.get(course_id, {}))))
+        for course_id in Course.objects.values_list("id", flat=True)
+    ]
+    with transaction.atomic():
+        CourseReport.objects.all().delete()
+        CourseReport.objects.bulk_create(reports, batch_size=500)
+    return len(reports)
+
+
+"""
+The build_report function builds and stores the report of a single course. It is used for courses whose
+collection period was closed before reports existed.
+"""
+
+
+def build_report(course):
+    questions = list(Question.objects.order_by("id"))
+    feedback = group_feedback([course.id])
+    report, created = CourseReport.objects.update_or_create(
+        course=course,
+        defaults={"results": json.dumps(
+            report_results(questions, feedback.get(course.id, {})))}
+    )
+    return report
+
+
+"""
+The rebuild_reports function rebuilds the stored reports of the given courses, e.g. after an incremental
+import removed some of their responses. Courses without a report are skipped, get_report_results builds theirs
+when they are first requested. The number of reports rebuilt is returned.
+"""
+
+
+def rebuild_reports(course_ids):
+    course_ids = list(CourseReport.objects.filter(course_id__in=course_ids).values_list("course_id", flat=True))
+    if not course_ids:
+        return 0
+    questions = list(Question.objects.order_by("id"))
+    feedback = group_feedback(course_ids)
+    for course_id in course_ids:
+        CourseReport.objects.filter(course_id=course_id).update(results=json.dumps(
+            report_results(questions, feedback.get(course_id, {}))), built=timezone.now())
+    return len(course_ids)
+
+
+"""
+The get_report_results function returns the stored results of a course, building the report if missing.
+"""
+
+
+def get_report_results(course):
+    report = CourseReport.objects.filter(course=course).first()
+    if not report:
+        report = build_report(course)
+    return json.loads(report.results)
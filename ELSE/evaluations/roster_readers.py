@@ -0,0 +1,212 @@
+"""
+Roster Readers
+Author: Peter Collins
+
+Registration rosters arrive in several formats. Each reader below turns one format into a stream of dicts
+keyed by the column headers of the first row, which is the shape RegistrationParser.parse_entry expects. Rows
+are yielded one at a time so the memory used while importing does not grow with the size of the roster.
+Readers are looked up by file extension in the READERS dict, new formats can be supported by adding an entry.
+
+A reader is given the path of the roster, or only its name together with its contents when the upload is small
+enough to be kept in memory (see Parser.store_upload), in which case the roster is never written to disk.
+"""
+import csv
+import io
+import os
+import xlrd
+import zipfile
+from xml.etree import ElementTree
+
+
+class RosterReader():
+    """
+    The datemode attribute tells RegistrationParser.parse_date how serial dates should be decoded, it follows
+    the xlrd convention (0 for the 1900 date system and 1 for the 1904 date system).
+    """
+
+    datemode = 0
+
+    def __init__(self, path, contents=None):
+        self.path = path
+        self.contents = contents
+
+    """
+    The open method returns a binary file object of the roster, read from memory when its contents were given.
+    """
+
+    def open(self):
+        if self.contents is not None:
+            return io.BytesIO(self.contents)
+        return open(self.path, "rb")
+
+    """
+    The rows method is a generator yielding one dict per data row of the roster. Subclasses implement it.
+    """
+
+    def rows(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        return self.rows()
+
+
+class XlsReader(RosterReader):
+    """
+    The XlsReader reads legacy Excel workbooks with xlrd. The binary format cannot be streamed so the sheet
+    is loaded on demand and its resources are released once all rows have been yielded. xlrd memory maps a
+    workbook read from disk and reads one given in memory directly.
+    """
+
+    def rows(self):
+        workbook = xlrd.open_workbook(self.path, file_contents=self.contents, on_demand=True)
+        try:
+            self.datemode = workbook.datemode
+            sheet = workbook.sheet_by_index(0)
+            fields = sheet.row_values(0)
+            for index in range(1, sheet.nrows):
+                yield dict(zip(fields, sheet.row_values(index)))
+        finally:
+            workbook.release_resources()
+
+
+class CsvReader(RosterReader):
+    """
+    The CsvReader streams comma or tab separated exports line by line. Tab separation is used for .tsv and
+    .tab files, any other extension is treated as comma separated.
+    """
+
+    def rows(self):
+        extension = os.path.splitext(self.path)[1].lower()
+        delimiter = "\t" if extension in (".tsv", ".tab") else ","
+        with io.TextIOWrapper(self.open(), encoding="utf-8-sig", newline="") as roster:
+            for row in csv.DictReader(roster, delimiter=delimiter, restval=""):
+                yield row
+
+
+class XlsxReader(RosterReader):
+    """
+    The XlsxReader streams the first worksheet of an Office Open XML workbook directly from the zip archive
+    with an incremental XML parser. Each row element is discarded as soon as it has been yielded so memory
+    stays constant apart from the shared strings table.
+    """
+
+    NAMESPACE = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+    RELATIONSHIP = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+    def rows(self):
+        with self.open() as source, zipfile.ZipFile(source) as archive:
+            shared_strings = self.read_shared_strings(archive)
+            sheet_path = self.first_sheet_path(archive)
+            fields = None
+            with archive.open(sheet_path) as sheet:
+                sheet_data = None
+                for event, element in ElementTree.iterparse(sheet, events=("start", "end")):
+                    if event == "start":
+                        if element.tag == self.NAMESPACE + "sheetData":
+                            sheet_data = element
+                        continue
+                    if element.tag != self.NAMESPACE + "row":
+                        continue
+                    values = self.row_values(element, shared_strings)
+                    sheet_data.remove(element)
+                    if fields is None:
+                        fields = values
+                        continue
+                    values.extend([""] * (len(fields) - len(values)))
+                    yield dict(zip(fields, values))
+
+    """
+    The first_sheet_path method resolves the archive member holding the first worksheet through the workbook
+    relationships and records the date system used by the workbook.
+    """
+
+    def first_sheet_path(self, archive):
+        workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        properties = workbook.find(self.NAMESPACE + "workbookPr")
+        if properties is not None and properties.get("date1904") in ("1", "true"):
+            self.datemode = 1
+        sheet = workbook.find(self.NAMESPACE + "sheets")[0]
+        relationships = ElementTree.fromstring(
+            archive.read("xl/_rels/workbook.xml.rels"))
+        for relationship in relationships:
+            if relationship.get("Id") == sheet.get(self.RELATIONSHIP):
+                target = relationship.get("Target")
+                if target.startswith("/"):
+                    return target[1:]
+                return "xl/" + target
+        return "xl/worksheets/sheet1.xml"
+
+    """
+    The read_shared_strings method loads the workbook's table of unique strings which cells refer to by index.
+    """
+
+    def read_shared_strings(self, archive):
+        if "xl/sharedStrings.xml" not in archive.namelist():
+            return []
+        strings = []
+        with archive.open("xl/sharedStrings.xml") as table:
+            for event, element in ElementTree.iterparse(table):
+                if element.tag == self.NAMESPACE + "si":
+                    strings.append("".join(
+                        text.text or "" for text in element.iter(self.NAMESPACE + "t")))
+                    element.clear()
+        return strings
+
+    """
+    The row_values method converts a row element into a list of cell values positioned by their column
+    reference. Numbers are returned as floats and empty cells as empty strings, matching xlrd.
+    """
+
+    def row_values(self, row, shared_strings):
+        values = []
+        for cell in row.iter(self.NAMESPACE + "c"):
+            column = self.column_index(cell.get("r"), len(values))
+            values.extend([""] * (column - len(values)))
+            cell_type = cell.get("t", "n")
+            value = cell.find(self.NAMESPACE + "v")
+            if cell_type == "inlineStr":
+                values.append("".join(
+                    text.text or "" for text in cell.iter(self.NAMESPACE + "t")))
+            elif value is None or value.text is None:
+                values.append("")
+            elif cell_type == "s":
+                values.append(shared_strings[int(value.text)])
+            elif cell_type == "n":
+                values.append(float(value.text))
+            elif cell_type == "b":
+                values.append(value.text == "1")
+            else:
+                values.append(value.text)
+        return values
+
+    def column_index(self, reference, default):
+        if not reference:
+            return default
+        index = 0
+        for character in reference:
+            if not character.isalpha():
+                break
+            index = index * 26 + ord(character.upper()) - ord("A") + 1
+        return index - 1
+
+
+READERS = {
+    ".xls": XlsReader,
+    ".xlsx": XlsxReader,
+    ".csv": CsvReader,
+    ".tsv": CsvReader,
+    ".tab": CsvReader,
+    ".txt": CsvReader,
+}
+
+
+"""
+The get_reader function picks a reader based on the extension of the roster file. Unknown extensions fall
+back to xlrd which detects the workbook format from the file contents. The contents of the roster can be given
+as bytes, the path then only supplies the extension.
+"""
+
+
+def get_reader(path, contents=None):
+    extension = os.path.splitext(path)[1].lower()
+    return READERS.get(extension, XlsReader)(path, contents)
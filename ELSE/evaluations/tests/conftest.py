@@ -0,0 +1,14 @@
+"""
+Test Configuration
+Author: Peter Collins
+
+The tests run under plain pytest. Django is set up once with the project settings and a link secret of its own,
+tests which need a database create a scratch one with evaluations.benchmarks.environment.scratch_environment,
+so the real database, cache and mail server are never touched.
+"""
+import os
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ELSE.settings")
+os.environ.setdefault("ACCESS_LINK_SECRET", "evaluations-test-link-secret")
+django.setup()
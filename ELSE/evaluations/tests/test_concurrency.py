@@ -0,0 +1,18 @@
+"""
+Concurrent Submission Tests
+Author: Peter Collins
+
+A short run of the concurrent submission stress test of evaluations.benchmarks.concurrency against the tuned
+SQLite backend: every enrollment is submitted twice by racing threads while others read the landing pages, and
+exactly one submission per enrollment must be saved, without errors, matching the database.
+"""
+from evaluations.benchmarks.concurrency import run_mode
+
+
+def test_tuned_backend_under_concurrent_submissions():
+    result = run_mode("tuned", threads=8, readers=2, students=40, courses=4, per_student=2, repeats=2, seed=0)
+    assert result["errors"] == 0
+    assert result["read_errors"] == 0
+    assert result["consistent"], result
+    assert result["saved"] == result["stored"] == result["requests"] // 2
+    assert result["duplicates"] == result["requests"] - result["saved"]
@@ -0,0 +1,26 @@
+"""
+Export Tests
+Author: Peter Collins
+
+Only staff members may export responses, so only they are shown the export form and links on the
+administration page.
+"""
+from django.contrib.auth.models import User
+from django.test import Client
+from evaluations.benchmarks.environment import scratch_environment
+
+
+def client_of(username, is_staff):
+    User.objects.create_user(username, username + "@scu.edu", username, is_staff=is_staff)
+    client = Client()
+    client.login(username=username, password=username)
+    return client
+
+
+def test_export_form_shown_to_staff_only(tmp_path):
+    with scratch_environment(str(tmp_path / "export.sqlite3")):
+        staff, member = client_of("staff", True), client_of("member", False)
+        assert b'action="/export"' in staff.get("/administration/").content
+        assert staff.get("/export").status_code == 200
+        assert b'action="/export"' not in member.get("/administration/").content
+        assert member.get("/export").status_code == 302
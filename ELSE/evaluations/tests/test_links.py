@@ -0,0 +1,68 @@
+"""
+Access Link Tests
+Author: Peter Collins
+
+Tokens must only be accepted for the kind, collection period and age they were issued for, and only when signed
+with ACCESS_LINK_SECRET, see evaluations.links. The student landing page is rendered from such a link.
+"""
+import time
+from unittest import mock
+import pytest
+from django.conf import settings
+from django.core import signing
+from django.test import Client
+from evaluations.benchmarks.environment import scratch_environment
+from evaluations.benchmarks.roster import write_roster
+from evaluations.cache import set_status
+from evaluations.links import link, make_token, read_token
+from evaluations.models import Enrollment
+from evaluations.registration_parser import RegistrationParser
+
+
+def test_read_token_returns_ids():
+    assert read_token("survey", make_token("survey", ["W1000000", 20001], 3), 3) == ["W1000000", 20001]
+
+
+def test_link_path():
+    assert link("student", ["W1000000"], 1).startswith("/students/")
+
+
+def test_read_token_rejects_other_period():
+    with pytest.raises(signing.BadSignature):
+        read_token("student", make_token("student", ["W1000000"], 3), 4)
+
+
+def test_read_token_rejects_other_kind():
+    with pytest.raises(signing.BadSignature):
+        read_token("feedback", make_token("instructor", ["smith@scu.edu"], 3), 3)
+
+
+def test_read_token_rejects_expired_token():
+    issued = time.time() - settings.ACCESS_LINK_MAX_AGE - 60
+    with mock.patch("django.core.signing.time.time", return_value=issued):
+        token = make_token("student", ["W1000000"], 3)
+    with pytest.raises(signing.SignatureExpired):
+        read_token("student", token, 3)
+
+
+def test_read_token_rejects_tampered_token():
+    token = make_token("student", ["W1000000"], 3)
+    payload, signature = token.rsplit(":", 1)
+    tampered = payload + ":" + ("A" if signature[0] != "A" else "B") + signature[1:]
+    with pytest.raises(signing.BadSignature):
+        read_token("student", tampered, 3)
+    forged = signing.dumps(["W1000001", 3], salt="evaluations.links.student", compress=True)
+    with pytest.raises(signing.BadSignature):
+        read_token("student", forged, 3)
+
+
+def test_students_page_title(tmp_path):
+    path = str(tmp_path / "roster.csv")
+    write_roster(path, students=5, courses=2, sections=1, per_student=2)
+    with scratch_environment(str(tmp_path / "links.sqlite3")):
+        RegistrationParser(path).parse_all()
+        set_status(active=True, populated=True, period=3)
+        student_id = Enrollment.objects.values_list("student_id", flat=True).first()
+        response = Client().get(link("student", [student_id], 3))
+        assert response.status_code == 200
+        assert ("<title>%s</title>" % student_id).encode() in response.content
@@ -0,0 +1,119 @@
+"""
+Outbox Tests
+Author: Peter Collins
+
+Campaigns must never drop each other's messages, and a drain must deliver every message once: claimed messages
+are held by their lease, failed ones are retried with exponential backoff until they have used up their
+attempts, see evaluations.outbox. Delivery goes through FailingBackend, which fails for chosen recipients.
+"""
+import datetime
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+from evaluations import outbox
+from evaluations.benchmarks.environment import scratch_environment
+from evaluations.models import OutboxMessage
+
+RETRY_DELAY = 60
+
+
+class FailingBackend(BaseEmailBackend):
+    failing = set()
+    delivered = []
+
+    def send_messages(self, messages):
+        for message in messages:
+            if set(message.to) & self.failing:
+                raise ConnectionError("refused " + ", ".join(message.to))
+            self.delivered.extend(message.to)
+        return len(messages)
+
+
+def environment(tmp_path, failing=()):
+    FailingBackend.failing = set(failing)
+    FailingBackend.delivered = []
+    return scratch_environment(str(tmp_path / "outbox.sqlite3"), OUTBOX_RETRY_DELAY=RETRY_DELAY,
+                               EMAIL_BACKEND="evaluations.tests.test_outbox.FailingBackend")
+
+
+def messages(count):
+    return [("student%d@scu.edu" % number, "Survey", "Body") for number in range(count)]
+
+
+def make_due(campaign=None):
+    due = OutboxMessage.objects.exclude(state__in=["SENT", "FAILED"])
+    if campaign:
+        due = due.filter(campaign=campaign)
+    due.update(next_attempt=timezone.now() - datetime.timedelta(seconds=1))
+
+
+def test_campaigns_started_together_are_kept_apart(tmp_path):
+    with environment(tmp_path):
+        first, second = outbox.new_campaign("survey"), outbox.new_campaign("survey")
+        assert first != second and first.startswith("survey-")
+        assert outbox.enqueue(first, messages(3)) == 3
+        assert outbox.enqueue(second, messages(3)) == 3
+        assert OutboxMessage.objects.count() == 6
+
+
+def test_enqueue_counts_rows_inserted(tmp_path):
+    with environment(tmp_path):
+        campaign = outbox.new_campaign("survey")
+        assert outbox.enqueue(campaign, messages(2) + messages(1)) == 2
+        assert outbox.enqueue(campaign, messages(3)) == 1
+        assert OutboxMessage.objects.filter(campaign=campaign).count() == 3
+
+
+def test_claim_holds_messages_until_lease_expires(tmp_path):
+    with environment(tmp_path):
+        outbox.enqueue(outbox.new_campaign("survey"), messages(3))
+        first = outbox.claim("first", None, 2)
+        second = outbox.claim("second", None, 2)
+        assert [message.recipient for message in first] == ["student0@scu.edu", "student1@scu.edu"]
+        assert [message.recipient for message in second] == ["student2@scu.edu"]
+        assert outbox.claim("third", None, 2) is None
+        OutboxMessage.objects.filter(claimed_by="first").update(
+            next_attempt=timezone.now() - datetime.timedelta(seconds=1))
+        taken = outbox.claim("third", None, 2)
+        assert [message.id for message in taken] == [message.id for message in first]
+        assert not OutboxMessage.objects.filter(claimed_by="first").exists()
+
+
+def test_drain_retries_with_backoff_until_failed(tmp_path):
+    with environment(tmp_path, failing=["student1@scu.edu"]):
+        campaign = outbox.new_campaign("survey")
+        outbox.enqueue(campaign, messages(3))
+        started = timezone.now()
+        assert outbox.drain(max_attempts=3) == dict(sent=2, failed=0, retried=1)
+        assert sorted(FailingBackend.delivered) == ["student0@scu.edu", "student2@scu.edu"]
+        failing = OutboxMessage.objects.get(recipient="student1@scu.edu")
+        assert (failing.state, failing.attempts, failing.claimed_by) == ("PENDING", 1, "")
+        assert "refused" in failing.last_error
+        assert failing.next_attempt >= started + datetime.timedelta(seconds=RETRY_DELAY)
+
+        assert outbox.drain(max_attempts=3) == dict(sent=0, failed=0, retried=0)
+        make_due()
+        retried = timezone.now()
+        assert outbox.drain(max_attempts=3) == dict(sent=0, failed=0, retried=1)
+        failing.refresh_from_db()
+        assert failing.attempts == 2
+        assert failing.next_attempt >= retried + datetime.timedelta(seconds=2 * RETRY_DELAY)
+        make_due()
+        assert outbox.drain(max_attempts=3) == dict(sent=0, failed=1, retried=0)
+        failing.refresh_from_db()
+        assert (failing.state, failing.attempts) == ("FAILED", 3)
+        assert OutboxMessage.objects.filter(state="SENT").count() == 2
+
+        FailingBackend.failing = set()
+        assert outbox.retry_failed(campaign) == 1
+        assert outbox.drain(max_attempts=3) == dict(sent=1, failed=0, retried=0)
+        assert FailingBackend.delivered.count("student1@scu.edu") == 1
+        assert OutboxMessage.objects.filter(state="SENT").count() == 3
+
+
+def test_drain_skips_messages_claimed_by_another_drain(tmp_path):
+    with environment(tmp_path):
+        outbox.enqueue(outbox.new_campaign("survey"), messages(3))
+        claimed = outbox.claim("other", None, 1)
+        assert outbox.drain() == dict(sent=2, failed=0, retried=0)
+        assert claimed[0].recipient not in FailingBackend.delivered
+        assert OutboxMessage.objects.get(id=claimed[0].id).state == "SENDING"
@@ -0,0 +1,18 @@
+"""
+Prewarm Tests
+Author: Peter Collins
+
+The project settings configure the cached template loader, so prewarming compiles every project template
+whether DEBUG is enabled or not, see evaluations.prewarm.
+"""
+from evaluations.prewarm import caches_templates, compile_templates, project_templates
+
+
+def test_settings_cache_templates():
+    assert caches_templates()
+
+
+def test_compile_templates_compiles_project_templates():
+    templates = project_templates()
+    assert "students.html" in templates
+    assert compile_templates() == len(templates)
@@ -0,0 +1,29 @@
+"""
+Query Budget Tests
+Author: Peter Collins
+
+Every view must stay within its query budget of evaluations.query_budgets.BUDGETS and run the same number of
+queries for the small and the large roster of PROFILES. The rosters are imported and the views requested once
+per module, each view is then asserted on separately.
+"""
+import pytest
+from evaluations.query_budgets import BUDGETS, PROFILES, check_budgets
+
+
+@pytest.fixture(scope="module")
+def query_counts():
+    results, problems = check_budgets()
+    return results
+
+
+@pytest.mark.parametrize("profile", list(PROFILES))
+@pytest.mark.parametrize("view", list(BUDGETS))
+def test_view_within_budget(query_counts, view, profile):
+    assert query_counts[profile][view] <= BUDGETS[view], "%s ran %d queries with the %s roster, its budget is %d" % (
+        view, query_counts[profile][view], profile, BUDGETS[view])
+
+
+@pytest.mark.parametrize("view", list(BUDGETS))
+def test_view_queries_independent_of_roster(query_counts, view):
+    counts = {profile: query_counts[profile][view] for profile in PROFILES}
+    assert len(set(counts.values())) == 1, counts
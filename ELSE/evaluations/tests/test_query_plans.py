@@ -0,0 +1,23 @@
+"""
+Query Plan Tests
+Author: Peter Collins
+
+Checks the plans of the queries the hot requests run, see evaluations.query_plans.
+"""
+from evaluations.query_plans import capture_plans, check_plan, plan_problems, scanned_table
+
+
+def test_scanned_table():
+    assert scanned_table("SCAN evaluations_response") == "evaluations_response"
+    assert scanned_table("SCAN TABLE evaluations_response") == "evaluations_response"
+    assert scanned_table("SEARCH evaluations_course USING INDEX course_term_listing_idx (term=?)") is None
+
+
+def test_check_plan_flags_scans_and_sorts():
+    plan = ["SCAN evaluations_response", "SCAN evaluations_question", "USE TEMP B-TREE FOR ORDER BY"]
+    assert check_plan(plan) == ["scan: SCAN evaluations_response", "sort: USE TEMP B-TREE FOR ORDER BY"]
+    assert check_plan(plan, ["SCAN evaluations_response", "USE TEMP B-TREE"]) == []
+
+
+def test_hot_requests_use_indexes():
+    assert plan_problems(capture_plans()) == []
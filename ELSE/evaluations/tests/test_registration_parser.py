@@ -0,0 +1,96 @@
+"""
+Registration Parser Tests
+Author: Peter Collins
+
+An incremental import must apply only the differences between the roster and the database, see
+RegistrationParser.parse_incremental, and keep the records of rows it rejected, whether the parser or the
+validation pre-pass rejected them.
+"""
+import json
+import pytest
+from evaluations.benchmarks.environment import scratch_environment
+from evaluations.benchmarks.roster import HEADERS, generate_rows, write_csv
+from evaluations.models import Course, CourseReport, Enrollment, Question, Response, Student
+from evaluations.registration_parser import RegistrationParser
+from evaluations.reports import build_reports
+from evaluations.validation import validate_roster
+from evaluations.views import Survey
+
+
+def value(row, column):
+    return row[HEADERS.index(column)]
+
+
+def enrollment_of(row):
+    return Enrollment.objects.get(student_id=value(row, "Student ID"), course_id=int(value(row, "Class Nbr")))
+
+
+def test_parse_incremental_applies_differences(tmp_path):
+    rows = [row for row in generate_rows(students=20, courses=2, sections=1, per_student=2, seed=1)
+            if not value(row, "Drop Dt")]
+    path = str(tmp_path / "roster.csv")
+    write_csv(path, rows)
+    with scratch_environment(str(tmp_path / "parser.sqlite3")):
+        RegistrationParser(path).parse_all()
+        question = Question.objects.create(prompt="How was the lab?", response_type="NUM")
+        kept, removed = rows[0], rows[1]
+        for row in (kept, removed):
+            assert Survey().save_survey(enrollment_of(row), [(question, 4)])
+        build_reports()
+        removed_course = Course.objects.get(id=int(value(removed, "Class Nbr")))
+
+        changed = list(kept)
+        changed[HEADERS.index("Grade")] = "A"
+        added = list(kept)
+        added[HEADERS.index("Student ID")] = "W9999999"
+        added[HEADERS.index("Student Email")] = "w9999999@scu.edu"
+        write_csv(path, [changed] + rows[2:] + [added])
+        stats = RegistrationParser(path).parse_incremental()
+
+        assert stats["changes"]["enrollments"] == dict(added=1, updated=1, removed=1)
+        assert stats["changes"]["students"] == dict(added=1, updated=0, removed=0)
+        assert stats["changes"]["courses"] == dict(added=0, updated=0, removed=0)
+        assert stats["changes"]["responses"] == dict(removed=1)
+        enrollment = enrollment_of(kept)
+        assert enrollment.grade == "A" and enrollment.evaluated
+        assert Response.objects.filter(enrollment=enrollment).count() == 1
+        assert not Enrollment.objects.filter(student_id=value(removed, "Student ID"),
+                                             course=removed_course).exists()
+        assert Student.objects.filter(id="W9999999").exists()
+        report = json.loads(CourseReport.objects.get(course=removed_course).results)
+        expected = 1 if removed_course.id == enrollment.course_id else 0
+        assert report[0]["summary"]["count"] == expected
+
+
+@pytest.mark.parametrize("validated", [False, True])
+def test_parse_incremental_keeps_enrollments_of_rejected_rows(tmp_path, validated):
+    rows = [row for row in generate_rows(students=20, courses=2, sections=1, per_student=2, seed=2)
+            if not value(row, "Drop Dt")]
+    path = str(tmp_path / "roster.csv")
+    write_csv(path, rows)
+    with scratch_environment(str(tmp_path / "parser.sqlite3")):
+        RegistrationParser(path).parse_all()
+        question = Question.objects.create(prompt="How was the lab?", response_type="NUM")
+        rejected = rows[0]
+        assert Survey().save_survey(enrollment_of(rejected), [(question, 5)])
+        enrollments = Enrollment.objects.count()
+
+        bad = list(rejected)
+        bad[HEADERS.index("Add Dt")] = "not a date"
+        unreadable = list(rows[1])
+        unreadable[HEADERS.index("Class Nbr")] = "not a number"
+        write_csv(path, [bad, unreadable] + rows[2:])
+        parser = RegistrationParser(path)
+        skip = validate_roster(parser.reader)["invalid"] if validated else ()
+        stats = parser.parse_incremental(skip=skip)
+
+        assert stats["failed"] == 2
+        assert stats["changes"]["enrollments"] == dict(added=0, updated=0, removed=0)
+        assert stats["changes"]["responses"] == dict(removed=0)
+        assert stats["changes"]["students"]["removed"] == 0
+        assert stats["changes"]["courses"]["removed"] == 0
+        assert Enrollment.objects.count() == enrollments
+        enrollment = enrollment_of(rejected)
+        assert enrollment.evaluated
+        assert Response.objects.filter(enrollment=enrollment).count() == 1
+        assert enrollment_of(rows[1])
@@ -0,0 +1,41 @@
+"""
+Report Tests
+Author: Peter Collins
+
+The course reports stored when a collection period is stopped must follow later changes to the questions, see
+evaluations.reports and the Questions view.
+"""
+import json
+from django.contrib.auth.models import User
+from django.test import Client
+from evaluations.benchmarks.environment import scratch_environment
+from evaluations.benchmarks.roster import write_roster
+from evaluations.models import CourseReport, Enrollment, Question
+from evaluations.registration_parser import RegistrationParser
+from evaluations.reports import build_reports
+from evaluations.views import Survey
+
+
+def test_deleting_question_rebuilds_reports(tmp_path):
+    path = str(tmp_path / "roster.csv")
+    write_roster(path, students=6, courses=2, sections=1, per_student=2)
+    with scratch_environment(str(tmp_path / "reports.sqlite3")):
+        RegistrationParser(path).parse_all()
+        kept = Question.objects.create(prompt="How was the lab?", response_type="NUM")
+        deleted = Question.objects.create(prompt="Any comments?", response_type="TXT")
+        enrollment = Enrollment.objects.order_by("id").first()
+        assert Survey().save_survey(enrollment, [(kept, 4), (deleted, "Great")])
+        build_reports()
+
+        User.objects.create_superuser("admin", "admin@scu.edu", "admin")
+        admin = Client()
+        admin.login(username="admin", password="admin")
+        response = admin.post("/questions", {"question-action": "Delete", "question-id": deleted.id})
+        assert b"Question deleted." in response.content
+
+        assert CourseReport.objects.count() == 2
+        for report in CourseReport.objects.all():
+            results = json.loads(report.results)
+            assert [result["question"]["id"] for result in results] == [kept.id]
+        results = json.loads(CourseReport.objects.get(course_id=enrollment.course_id).results)
+        assert results[0]["feedback"] == [4]
@@ -0,0 +1,145 @@
+"""
+Roster Reader Tests
+Author: Peter Collins
+
+The XlsxReader parses the worksheet XML itself, so its rows are compared with those xlrd reads from the same
+roster saved as .xls and with those openpyxl reads from the .xlsx: shared and inline strings, numbers, sparse
+rows whose cells skip columns and serial dates of both date systems. The workbooks are written by xlwt and
+openpyxl, the tests are skipped where those are not installed. openpyxl writes strings inline, Excel keeps
+them in a shared strings table, so shared_strings rewrites a workbook the way Excel stores it.
+"""
+import datetime
+import re
+import zipfile
+import pytest
+from evaluations.roster_readers import XlsReader, XlsxReader, get_reader
+from evaluations.validation import decode_date
+
+openpyxl = pytest.importorskip("openpyxl")
+xlwt = pytest.importorskip("xlwt")
+
+HEADERS = ["Student ID", "Class Nbr", "Title", "Units", "Grade", "Add Dt"]
+
+# The third row is sparse: its Title and Grade are empty, so the worksheet skips those columns.
+ROWS = [
+    ["W1000000", 20001.0, "Intro to Programming", 4.0, "A", 43700.0],
+    ["W1000001", 20002.0, "Data Structures", 5.0, "B+", 43701.0],
+    ["W1000002", 20003.0, None, 4.0, None, 43702.0],
+    ["W1000003", 20001.0, "Intro to Programming", 4.0, "P", None],
+]
+
+
+def write_xlsx(path, rows, date1904=False):
+    workbook = openpyxl.Workbook()
+    if date1904:
+        workbook.epoch = openpyxl.utils.datetime.CALENDAR_MAC_1904
+    sheet = workbook.active
+    sheet.append(HEADERS)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def write_xls(path, rows, date1904=False):
+    workbook = xlwt.Workbook()
+    workbook.set_dates_1904(date1904)
+    sheet = workbook.add_sheet("Roster")
+    for column, header in enumerate(HEADERS):
+        sheet.write(0, column, header)
+    for index, row in enumerate(rows, 1):
+        for column, value in enumerate(row):
+            if value is not None:
+                sheet.write(index, column, value)
+    workbook.save(path)
+
+
+def openpyxl_rows(path):
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        rows = list(workbook.active.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+    return [dict(zip(rows[0], ("" if value is None else value for value in row))) for row in rows[1:]]
+
+
+# Rewrites the workbook at source into target with its inline strings moved to a shared strings table.
+def shared_strings(source, target):
+    strings = []
+
+    def share(match):
+        strings.append(match.group(2))
+        return '<c r="%s" t="s"><v>%d</v></c>' % (match.group(1), len(strings) - 1)
+
+    with zipfile.ZipFile(source) as archive, zipfile.ZipFile(target, "w") as copy:
+        for name in archive.namelist():
+            data = archive.read(name).decode()
+            if name == "xl/worksheets/sheet1.xml":
+                data = re.sub(r'<c r="([A-Z]+\d+)" t="inlineStr"><is><t>(.*?)</t></is></c>', share, data)
+            elif name == "[Content_Types].xml":
+                data = data.replace("</Types>", '<Override PartName="/xl/sharedStrings.xml" ContentType="'
+                                    'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"'
+                                    ' /></Types>')
+            elif name == "xl/_rels/workbook.xml.rels":
+                data = data.replace("</Relationships>", '<Relationship Id="rIdShared" Type="http://schemas.'
+                                    'openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+                                    'Target="sharedStrings.xml" /></Relationships>')
+            copy.writestr(name, data)
+        copy.writestr("xl/sharedStrings.xml", (
+            '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="%d" uniqueCount="%d">'
+            % (len(strings), len(strings)) + "".join("<si><t>%s</t></si>" % text for text in strings) + "</sst>"))
+
+
+def test_xlsx_matches_xls(tmp_path):
+    write_xlsx(str(tmp_path / "roster.xlsx"), ROWS)
+    write_xls(str(tmp_path / "roster.xls"), ROWS)
+    xlsx = list(XlsxReader(str(tmp_path / "roster.xlsx")).rows())
+    assert xlsx == list(XlsReader(str(tmp_path / "roster.xls")).rows())
+    assert xlsx[2]["Title"] == "" and xlsx[2]["Grade"] == "" and xlsx[2]["Add Dt"] == 43702.0
+    assert xlsx[3]["Add Dt"] == ""
+
+
+def test_xlsx_matches_openpyxl(tmp_path):
+    path = str(tmp_path / "roster.xlsx")
+    write_xlsx(path, ROWS)
+    assert list(XlsxReader(path).rows()) == openpyxl_rows(path)
+
+
+def test_xlsx_shared_strings(tmp_path):
+    write_xlsx(str(tmp_path / "inline.xlsx"), ROWS)
+    shared_strings(str(tmp_path / "inline.xlsx"), str(tmp_path / "shared.xlsx"))
+    with zipfile.ZipFile(str(tmp_path / "shared.xlsx")) as archive:
+        assert b't="inlineStr"' not in archive.read("xl/worksheets/sheet1.xml")
+    shared = list(XlsxReader(str(tmp_path / "shared.xlsx")).rows())
+    assert shared == list(XlsxReader(str(tmp_path / "inline.xlsx")).rows())
+    assert shared == openpyxl_rows(str(tmp_path / "shared.xlsx"))
+    write_xls(str(tmp_path / "roster.xls"), ROWS)
+    assert shared == list(XlsReader(str(tmp_path / "roster.xls")).rows())
+
+
+def test_xlsx_read_from_contents(tmp_path):
+    path = str(tmp_path / "roster.xlsx")
+    write_xlsx(path, ROWS)
+    with open(path, "rb") as roster:
+        contents = roster.read()
+    reader = get_reader("upload.xlsx", contents)
+    assert isinstance(reader, XlsxReader)
+    assert list(reader.rows()) == list(XlsxReader(path).rows())
+
+
+@pytest.mark.parametrize("date1904", [False, True])
+def test_xlsx_dates(tmp_path, date1904):
+    dates = [datetime.date(2019, 9, 23), datetime.date(2020, 2, 29)]
+    rows = [["W1000000", 20001.0, "Intro to Programming", 4.0, "A", date] for date in dates]
+    write_xlsx(str(tmp_path / "dates.xlsx"), rows, date1904)
+    epoch = datetime.date(1904, 1, 1) if date1904 else datetime.date(1899, 12, 30)
+    write_xls(str(tmp_path / "dates.xls"), [row[:-1] + [float((row[-1] - epoch).days)] for row in rows], date1904)
+
+    xlsx = XlsxReader(str(tmp_path / "dates.xlsx"))
+    xls = XlsReader(str(tmp_path / "dates.xls"))
+    xlsx_rows, xls_rows = list(xlsx.rows()), list(xls.rows())
+    assert xlsx.datemode == xls.datemode == (1 if date1904 else 0)
+    assert xlsx_rows == xls_rows
+    expected = [date.strftime("%Y-%m-%d") for date in dates]
+    assert [decode_date(row["Add Dt"], xlsx.datemode) for row in xlsx_rows] == expected
+    assert [row["Add Dt"].date().strftime("%Y-%m-%d")
+            for row in openpyxl_rows(str(tmp_path / "dates.xlsx"))] == expected
@@ -0,0 +1,32 @@
+"""
+Throttling Tests
+Author: Peter Collins
+
+The sliding window of evaluations.throttling, driven with explicit times so no test has to wait.
+"""
+from django.test.utils import override_settings
+from evaluations import throttling
+
+
+def test_sliding_window():
+    with override_settings(THROTTLE_STORE="local"):
+        throttling.configure()
+        for client in ("10.0.0.1", "10.0.0.4"):
+            requests = [throttling.allow("/test/window/", client, 2, 10, now=1000.0) for attempt in range(3)]
+            assert [allowed for allowed, retry in requests] == [True, True, False]
+            assert requests[-1][1] == 11
+        # Early in the next window the three requests of the previous one still count almost fully (2.7 + 1).
+        assert throttling.allow("/test/window/", "10.0.0.1", 2, 10, now=1011.0)[0] is False
+        # Late in it they have mostly slid out of the window (0.15 + 1).
+        assert throttling.allow("/test/window/", "10.0.0.4", 2, 10, now=1019.5)[0] is True
+        # Two windows later nothing of them is left, although the shed request counted as well.
+        assert throttling.allow("/test/window/", "10.0.0.1", 2, 10, now=1035.0)[0] is True
+
+
+def test_clients_counted_separately():
+    with override_settings(THROTTLE_STORE="local"):
+        throttling.configure()
+        for attempt in range(3):
+            throttling.allow("/test/clients/", "10.0.0.2", 2, 10, now=2000.0)
+        assert throttling.allow("/test/clients/", "10.0.0.2", 2, 10, now=2000.0)[0] is False
+        assert throttling.allow("/test/clients/", "10.0.0.3", 2, 10, now=2000.0)[0] is True
@@ -0,0 +1,52 @@
+"""
+Roster Validation Tests
+Author: Peter Collins
+
+Every invalid value of a roster is reported as a (row, column, value, message) tuple, row being the
+spreadsheet row number, see evaluations.validation.
+"""
+import csv
+import pytest
+from evaluations.benchmarks.roster import HEADERS, generate_rows, write_csv
+from evaluations.roster_readers import get_reader
+from evaluations.validation import error_report, validate_roster
+
+
+@pytest.fixture
+def roster_rows():
+    return list(generate_rows(students=30, courses=3, sections=1, per_student=2, seed=1))
+
+
+def set_value(row, column, value):
+    row[HEADERS.index(column)] = value
+
+
+@pytest.mark.parametrize("workers, batch_size", [(1, 5000), (1, 7), (2, 7)])
+def test_error_rows(tmp_path, roster_rows, workers, batch_size):
+    set_value(roster_rows[0], "Student ID", "W" * 20)
+    set_value(roster_rows[9], "Class Nbr", "abc")
+    set_value(roster_rows[20], "Add Dt", "not a date")
+    set_value(roster_rows[41], "Instructor Email", "")
+    path = str(tmp_path / "roster.csv")
+    write_csv(path, roster_rows)
+    result = validate_roster(get_reader(path), workers=workers, batch_size=batch_size)
+    assert result["rows"] == len(roster_rows)
+    assert result["missing"] == []
+    assert [(row, column, value) for row, column, value, message in result["errors"]] == [
+        (2, "Student ID", "W" * 20),
+        (11, "Class Nbr", "abc"),
+        (22, "Add Dt", "not a date"),
+        (43, "Instructor Email", ""),
+    ]
+    assert result["invalid"] == {2, 11, 22, 43}
+
+
+def test_missing_columns(tmp_path, roster_rows):
+    path = str(tmp_path / "roster.csv")
+    with open(path, "w", newline="") as roster:
+        writer = csv.writer(roster)
+        writer.writerow([header for header in HEADERS if header != "Term"])
+        writer.writerow(["x"] * (len(HEADERS) - 1))
+    result = validate_roster(get_reader(path), workers=1)
+    assert result["missing"] == ["Term"]
+    assert error_report(result).splitlines() == ["Row,Column,Value,Error", "1,Term,,Missing column."]
@@ -0,0 +1,154 @@
+"""
+Request Throttling
+Author: Peter Collins
+
+Students and instructors reach their pages through signed links without logging in, so nothing but a rate
+limit stops a client from requesting the token URLs as fast as it can. When THROTTLE_RATES is set the
+ThrottleMiddleware (see evaluations.middleware) asks the allow function below whether a request to one of the
+listed path prefixes may proceed, before the URL is resolved, the session loaded or the database touched, and
+answers 429 Too Many Requests otherwise.
+
+Requests are counted per client address and prefix over a sliding window, approximated from two fixed windows:
+the count of the current window plus the count of the previous one weighted by the part of it that still lies
+within the sliding window. Shed requests are counted as well, so a client hammering the site stays blocked
+until it slows down. The counters are kept in the memory of each worker (THROTTLE_STORE = "local"), which
+costs no I/O but limits every worker separately, or in Django's cache ("cache"), shared by all workers on the
+host.
+
+Each worker also counts the requests it allowed and shed per prefix, the administration page shows them to
+staff members. The first request shed for a client in a window is logged to the evaluations.throttling logger.
+"""
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger("evaluations.throttling")
+
+metrics = {}
+metrics_lock = threading.Lock()
+
+
+class LocalCounters():
+    """
+    The LocalCounters class keeps the window counters in a dict of the worker, keyed by prefix and client, as
+    [window, current count, previous count]. Once it holds max_clients entries the ones idle for more than a
+    window are dropped, and when that is not enough (e.g. traffic from many addresses) all of them, so memory
+    stays bounded at the price of forgetting some counts.
+    """
+
+    def __init__(self, max_clients):
+        self.max_clients = max_clients
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def hit(self, prefix, client, window, seconds):
+        with self.lock:
+            counter = self.counters.get((prefix, client))
+            if counter is None:
+                if len(self.counters) >= self.max_clients:
+                    self.sweep(window)
+                counter = self.counters[(prefix, client)] = [window, 0, 0]
+            if counter[0] != window:
+                counter[2] = counter[1] if counter[0] == window - 1 else 0
+                counter[1] = 0
+                counter[0] = window
+            counter[1] += 1
+            return counter[1], counter[2]
+
+    def sweep(self, window):
+        self.counters = {key: counter for key, counter in self.counters.items() if counter[0] >= window - 1}
+        if len(self.counters) >= self.max_clients:
+            self.counters = {}
+
+
+class CacheCounters():
+    """
+    The CacheCounters class keeps one counter per prefix, client and window in Django's cache. Counters expire
+    once they can no longer be the previous window.
+    """
+
+    def hit(self, prefix, client, window, seconds):
+        key = "evaluations:throttle:%s:%s:" % (prefix, client)
+        cache.add(key + str(window), 0, 2 * seconds)
+        try:
+            current = cache.incr(key + str(window))
+        except ValueError:
+            cache.set(key + str(window), 1, 2 * seconds)
+            current = 1
+        return current, cache.get(key + str(window - 1), 0)
+
+
+STORES = {
+    "local": lambda: LocalCounters(settings.THROTTLE_LOCAL_MAX_CLIENTS),
+    "cache": CacheCounters,
+}
+
+store = None
+store_name = None
+
+
+"""
+The configure function creates the counter store named by THROTTLE_STORE. It is called whenever a handler
+loads the middleware, the store (and so the counts) is kept unless THROTTLE_STORE names another one.
+"""
+
+
+def configure():
+    global store, store_name
+    if store is None or store_name != settings.THROTTLE_STORE:
+        store = STORES[settings.THROTTLE_STORE]()
+        store_name = settings.THROTTLE_STORE
+
+
+"""
+The client_address function returns the address requests are counted by: REMOTE_ADDR, or the last address of
+the THROTTLE_CLIENT_HEADER header when the site runs behind a proxy which sets it (the last address is the one
+added by the proxy, earlier ones are supplied by the client).
+"""
+
+
+def client_address(request):
+    header = settings.THROTTLE_CLIENT_HEADER
+    if header and request.META.get(header):
+        return request.META[header].split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+"""
+The allow function counts a request of a client to a prefix limited to limit requests per seconds and returns
+a tuple of whether it may proceed and the number of seconds after which the client should retry.
+"""
+
+
+def allow(prefix, client, limit, seconds, now=None):
+    now = time.time() if now is None else now
+    window = int(now // seconds)
+    elapsed = now / seconds - window
+    current, previous = store.hit(prefix, client, window, seconds)
+    estimate = previous * (1 - elapsed) + current
+    allowed = estimate <= limit
+    with metrics_lock:
+        counts = metrics.setdefault(prefix, dict(allowed=0, shed=0))
+        counts["allowed" if allowed else "shed"] += 1
+    if not allowed and estimate - 1 <= limit:
+        logger.warning("Throttling %s on %s: more than %d requests in %d seconds", client, prefix, limit, seconds)
+    return allowed, int(seconds * (1 - elapsed)) + 1
+
+
+"""
+The summary function returns the limit, allowed and shed requests of every throttled prefix for this worker.
+"""
+
+
+def summary():
+    with metrics_lock:
+        counts = {prefix: dict(values) for prefix, values in metrics.items()}
+    results = []
+    for prefix, (limit, seconds) in sorted(settings.THROTTLE_RATES.items()):
+        values = counts.get(prefix, dict(allowed=0, shed=0))
+        total = values["allowed"] + values["shed"]
+        results.append(dict(prefix=prefix, limit=limit, seconds=seconds, allowed=values["allowed"],
+                            shed=values["shed"], shed_rate=values["shed"] / total if total else 0.0))
+    return results
@@ -0,0 +1,35 @@
+"""
+Roster Uploads
+Author: Peter Collins
+
+Django keeps uploads of up to FILE_UPLOAD_MAX_MEMORY_SIZE bytes in memory and spools larger ones to a temporary
+file. Registration rosters are imported straight from memory when they fit (see Parser.store_upload), which
+saves writing and reading them back, but raising the global limit would let every other form keep its uploads
+in memory as well. The Parser view therefore uses the upload handlers returned by roster_upload_handlers, which
+keep a roster of up to ROSTER_UPLOAD_MAX_MEMORY_SIZE bytes in memory and leave the global limit at Django's
+default.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+"""
+The RosterMemoryUploadHandler keeps a request's uploads in memory when the request body is at most
+ROSTER_UPLOAD_MAX_MEMORY_SIZE bytes, otherwise the next handler spools them to a temporary file.
+"""
+
+
+class RosterMemoryUploadHandler(MemoryFileUploadHandler):
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.activated = content_length <= settings.ROSTER_UPLOAD_MAX_MEMORY_SIZE
+
+
+"""
+The roster_upload_handlers function returns the upload handlers of a roster upload request. They have to be set
+before the request's POST or FILES are first read.
+"""
+
+
+def roster_upload_handlers(request):
+    return [RosterMemoryUploadHandler(request), TemporaryFileUploadHandler(request)]
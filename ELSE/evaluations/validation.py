@@ -0,0 +1,291 @@
+"""
+Roster Validation
+Author: Peter Collins
+
+Before a roster is imported every row is checked against the model fields it will be written to, column by
+column rather than row by row: the roster is read in batches of ROSTER_VALIDATION_BATCH_SIZE rows, each batch
+is turned into one list of values per column and every column is checked as a whole (a single max() over the
+lengths or a single map() of int() in the common case where the whole column is valid, value by value only
+when it is not). Batches are independent, so a large roster is spread over a pool of
+ROSTER_VALIDATION_WORKERS processes.
+
+The result lists every problem found as a (row, column, value, message) tuple, row being the spreadsheet row
+number, which error_report turns into the CSV report offered for download on the import job. The checks only
+depend on plain data passed to them, so this module does not touch the database or the models at import time
+and can be loaded by freshly spawned pool processes.
+"""
+import collections
+import csv
+import datetime
+import io
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+import xlrd
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y")
+
+# The roster columns read by RegistrationParser.parse_entry and the model field each one is stored in.
+COLUMNS = {
+    "Student ID": ("Student", "id"),
+    "Student Email": ("Student", "email"),
+    "Instructor": ("Instructor", "last_name"),
+    "Instructor Email": ("Instructor", "email"),
+    "Class Nbr": ("Course", "id"),
+    "Term": ("Course", "term"),
+    "Subject": ("Course", "subject"),
+    "Catalog": ("Course", "catalog"),
+    "Title": ("Course", "title"),
+    "Section": ("Course", "section"),
+    "Tot Enrl": ("Course", "total_enrollment"),
+    "Unit Taken": ("Course", "units"),
+    "Campus": ("Course", "campus"),
+    "Location": ("Course", "location"),
+    "Comb Sect": ("Course", "combined"),
+    "Career": ("Course", "career"),
+    "Component": ("Course", "component"),
+    "Session": ("Course", "session"),
+    "Class Type": ("Course", "course_type"),
+    "Grade Base": ("Course", "grade_base"),
+    "Grade": ("Enrollment", "grade"),
+    "Drop Dt": ("Enrollment", "drop_date"),
+    "Add Dt": ("Enrollment", "add_date"),
+}
+
+# Columns whose values are stripped by the parser before they are stored.
+STRIPPED_COLUMNS = ("Catalog",)
+
+
+"""
+The decode_date function converts a roster date into the YYYY-MM-DD format. Excel stores dates as serial
+numbers whose meaning depends on the workbook's date mode (see RosterReader.datemode), text exports may carry
+either the serial number or a formatted date, both are accepted. Empty values return None, a ValueError is
+raised for anything else which is not a date.
+"""
+
+
+def decode_date(value, datemode):
+    if value == "" or value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return decode_date_string(value.strip())
+    return datetime.datetime(*xlrd.xldate_as_tuple(value, datemode)).strftime("%Y-%m-%d")
+
+
+def decode_date_string(text):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise ValueError("Unrecognized date " + repr(text))
+
+
+"""
+The column_rules function derives the check of every column from its model field: the maximum length and
+whether blanks are allowed for text, the range of the database column for integers (None when a side is
+unbounded) and whether the value is
+required for dates. Boolean columns accept any value. It returns a list of (column, kind, arguments) tuples.
+"""
+
+
+def column_rules():
+    from django.apps import apps
+    from django.db import connection, models
+    rules = []
+    for column, (model_name, field_name) in COLUMNS.items():
+        field = apps.get_model("evaluations", model_name)._meta.get_field(field_name)
+        if isinstance(field, models.BooleanField):
+            rules.append((column, "flag", ()))
+        elif isinstance(field, models.DateField):
+            rules.append((column, "date", (not field.null,)))
+        elif isinstance(field, models.IntegerField):
+            rules.append((column, "integer", connection.ops.integer_field_range(field.get_internal_type())))
+        else:
+            rules.append((column, "text", (field.max_length, not field.blank, column in STRIPPED_COLUMNS)))
+    return rules
+
+
+"""
+The check functions below each accept the values of one column and the arguments of its rule and return a
+list of (position, value, message) tuples for the invalid values, position being the index in the list.
+"""
+
+
+def check_text(values, max_length, required, strip):
+    texts = [value if isinstance(value, str) else str(value) for value in values]
+    if strip:
+        texts = [text.strip() for text in texts]
+    if max(map(len, texts), default=0) <= max_length and (not required or all(texts)):
+        return []
+    errors = []
+    for position, text in enumerate(texts):
+        if required and not text:
+            errors.append((position, values[position], "This field cannot be blank."))
+        elif len(text) > max_length:
+            errors.append((position, values[position], "Ensure this value has at most %d characters (it has %d)."
+                           % (max_length, len(text))))
+    return errors
+
+
+def check_integer(values, minimum, maximum):
+    minimum = float("-inf") if minimum is None else minimum
+    maximum = float("inf") if maximum is None else maximum
+    try:
+        numbers = list(map(int, values))
+        if not numbers or (min(numbers) >= minimum and max(numbers) <= maximum):
+            return []
+    except (TypeError, ValueError):
+        pass
+    errors = []
+    for position, value in enumerate(values):
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            errors.append((position, value, "'%s' is not a whole number." % value))
+            continue
+        if number < minimum:
+            errors.append((position, value, "Ensure this value is greater than or equal to %d." % minimum))
+        elif number > maximum:
+            errors.append((position, value, "Ensure this value is less than or equal to %d." % maximum))
+    return errors
+
+
+def check_date(values, required, datemode):
+    errors = []
+    for position, value in enumerate(values):
+        try:
+            date = decode_date(value, datemode)
+        except (TypeError, ValueError, OverflowError) as e:
+            errors.append((position, value, str(e)))
+            continue
+        if required and date is None:
+            errors.append((position, value, "This field cannot be blank."))
+    return errors
+
+
+CHECKS = {
+    "text": check_text,
+    "integer": check_integer,
+    "date": check_date,
+    "flag": lambda values: [],
+}
+
+
+"""
+The validate_batch function checks one batch of rows given as a dict of column values, first_row being the
+row number of the first value. Dates are decoded with the given date mode. It returns the (row, column, value,
+message) tuples of the problems found, ordered by row. It runs in the pool processes.
+"""
+
+
+def validate_batch(rules, first_row, columns, datemode):
+    errors = []
+    for column, kind, arguments in rules:
+        if kind == "date":
+            arguments = arguments + (datemode,)
+        errors.extend((first_row + position, column, value, message)
+                      for position, value, message in CHECKS[kind](columns[column], *arguments))
+    errors.sort(key=lambda error: error[0])
+    return errors
+
+
+"""
+The read_batches generator reads the rows of a roster reader in batches of batch_size rows and yields the
+arguments of validate_batch for each: the first row number, the column values and the reader's date mode.
+"""
+
+
+def read_batches(rows, rules, batch_size, reader):
+    first_row = 2
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        columns = {column: [row.get(column, "") for row in batch] for column, kind, arguments in rules}
+        yield first_row, columns, reader.datemode
+        first_row += len(batch)
+
+
+"""
+The validate_batches generator yields the number of rows and the errors of every batch in order. Rosters of a
+single batch, or runs with fewer than two workers, are validated in this process. Otherwise a process pool is
+started and at most two batches per worker are kept in flight, so memory stays bounded by the batch size rather
+than the roster. The pool spawns fresh processes rather than forking the web worker, which runs the import on
+a background thread: a forked child would inherit its database connections and any lock another thread held
+at the time of the fork.
+"""
+
+
+def validate_batches(batches, rules, workers):
+    first = next(batches, None)
+    second = next(batches, None)
+    if second is None or workers < 2:
+        for batch in itertools.chain(filter(None, (first, second)), batches):
+            yield batch_rows(batch), validate_batch(rules, *batch)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = collections.deque()
+        for batch in itertools.chain((first, second), batches):
+            pending.append((batch_rows(batch), pool.submit(validate_batch, rules, *batch)))
+            if len(pending) > 2 * workers:
+                rows, future = pending.popleft()
+                yield rows, future.result()
+        while pending:
+            rows, future = pending.popleft()
+            yield rows, future.result()
+
+
+def batch_rows(batch):
+    return len(next(iter(batch[1].values())))
+
+
+"""
+The validate_roster function checks every row of the roster read by the given reader without writing
+anything. A roster missing any of the required columns is not read past its first row. The optional progress
+callable is called with the number of rows checked and the number of invalid rows after every batch. The
+function returns a dict with the number of rows read, the missing columns, the list of errors and the set of
+invalid row numbers.
+"""
+
+
+def validate_roster(reader, workers=None, batch_size=None, progress=None):
+    workers = settings.ROSTER_VALIDATION_WORKERS if workers is None else workers
+    batch_size = batch_size or settings.ROSTER_VALIDATION_BATCH_SIZE
+    rules = column_rules()
+    result = dict(rows=0, missing=[], errors=[], invalid=set())
+    rows = reader.rows()
+    first = next(rows, None)
+    if first is None:
+        return result
+    result["missing"] = [column for column in COLUMNS if column not in first]
+    if result["missing"]:
+        rows.close()
+        return result
+    batches = read_batches(itertools.chain([first], rows), rules, batch_size, reader)
+    for rows_checked, errors in validate_batches(batches, rules, workers):
+        result["rows"] += rows_checked
+        result["errors"].extend(errors)
+        result["invalid"].update(error[0] for error in errors)
+        if progress:
+            progress(result["rows"], len(result["invalid"]))
+    return result
+
+
+"""
+The error_report function returns the CSV report of a validation result: one line per problem with the row
+number, column, value and message. Missing columns are reported against the header row.
+"""
+
+
+def error_report(result):
+    report = io.StringIO()
+    writer = csv.writer(report)
+    writer.writerow(["Row", "Column", "Value", "Error"])
+    writer.writerows([1, column, "", "Missing column."] for column in result["missing"])
+    writer.writerows(result["errors"])
+    return report.getvalue()
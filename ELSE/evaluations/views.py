@@ -7,15 +7,33 @@ Class based views are utilized which define actions for GET and POST requests or
 Small messages are returned using the HttpResponse method while for more complex views a template is rendered.
 """
 
-import xlrd
-import datetime
+import os
+import json
+import tempfile
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.signing import BadSignature
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.db import transaction
+from django.db.models import BooleanField, Case, Value, When
 from evaluations.models import Instructor, Course, Student, Enrollment
-from evaluations.models import Status, Question, TextResponse, NumberResponse, Response
-from evaluations.registration_parser import RegistrationParser
-from django.core.mail import send_mail
+from evaluations.models import Question, Response, ImportJob, CourseReport
+from evaluations.export import FORMATS, export_rows
+from evaluations.counters import get_counters, record_evaluation, completion, rate
+from evaluations.jobs import create_import_job, remove_roster, start_import_job
+from evaluations.reports import build_reports, get_report_results, rebuild_reports
+from evaluations import outbox, profiling, throttling
+from evaluations.archive import archived_terms
+from evaluations.db import retry_when_locked
+from evaluations.links import link, read_token
+from evaluations.uploads import roster_upload_handlers
+from evaluations.cache import get_status, set_status, get_questions, get_survey_form, bump_questions_version
+from evaluations.cache import bump_analytics_version
+from evaluations.analytics import SCALE, SCOPES, question_statistics
 
 
 """
@@ -26,152 +44,326 @@ The Administration view provides the functionality to manage the ELSE system.
 class Administration(View):
 
     """
-    The send_survey method generates a link with a secure token for each student and sends emails.
+    The send_survey method generates a signed link (see evaluations.links) for each student for the given
+    collection period and queues the emails in the outbox as a new campaign. The emails are delivered by the
+    drain_outbox management command. The number of queued emails is returned.
     """
 
-    def send_survey(self):
-        domain = "https://p1collins.pythonanywhere.com/"
-        sender = "scu.engr.evaluations@gmail.com"
-        students = Student.objects.all()
-        for student in students:
-            link = domain + "students/" + student.id + "/" + student.token
-            send_mail("Survey", link,
-                      "scu.engr.evaluations@gmail.com", [student.email])
+    def send_survey(self, period):
+        domain = "https://p1collins.pythonanywhere.com"
+        messages = (
+            (email, "Survey", domain + link("student", [student_id], period))
+            for student_id, email in Student.objects.values_list("id", "email")
+        )
+        return outbox.enqueue(outbox.new_campaign("survey"), messages)
 
     """
-    The send_responses method generates a link with a secure token for each instructors and sends emails.
+    The send_responses method generates a signed link for each instructor for the given collection period and
+    queues the emails in the outbox as a new campaign. The number of queued emails is returned.
     """
 
-    def send_responses(self):
-        instructors = Instructor.objects.all()
-        domain = "https://p1collins.pythonanywhere.com/"
-        sender = "scu.engr.evaluations@gmail.com"
-        for instructor in instructors:
-            link = domain + "instructors/" + instructor.last_name + "/" + instructor.token
-            send_mail("Feedback", link, "scu.engr.evaluations@gmail.com", [
-                      instructor.email])
+    def send_responses(self, period):
+        domain = "https://p1collins.pythonanywhere.com"
+        messages = (
+            (email, "Feedback", domain + link("instructor", [email], period))
+            for email in Instructor.objects.values_list("email", flat=True)
+        )
+        return outbox.enqueue(outbox.new_campaign("feedback"), messages)
 
     """
-    The GET method of the Administration view queries information about the system. The system status,
-    database record counts, and list of questions are retreived from the database and passed to the template
-    for rendering. The method accepts a request object and returns a rendered template response.
+    The GET method of the Administration view queries information about the system. The system status and
+    current term, the archived terms,
+    database record counts (kept in the Counters row, see evaluations.counters), the latest roster import job (without loading its error report) and list of questions are retreived from the database and passed to the template
+    for rendering. Staff members also see the request profile of this worker when profiling is enabled, and the
+    requests it allowed and shed per throttled prefix. The method accepts a request object and returns a rendered template response.
     """
 
     def get(self, request):
-        status = Status.objects.filter(id=1).first()
-        active = False
-        populated = False
-        if status:
-            active = status.active
-            populated = status.populated
+        status = get_status()
+        active = status.active
+        populated = status.populated
+        counters = get_counters()
         context = {
-            "instructors": len(Instructor.objects.all()),
-            "courses": len(Course.objects.all()),
-            "students": len(Student.objects.all()),
-            "enrollments": len(Enrollment.objects.all()),
-            "responses": len(Enrollment.objects.filter(evaluated=True)),
+            "instructors": counters.instructors,
+            "courses": counters.courses,
+            "students": counters.students,
+            "enrollments": counters.enrollments,
+            "responses": counters.evaluated,
+            "response_rate": 100 * rate(counters.evaluated, counters.enrollments),
             "active": active,
             "populated": populated,
-            "questions": Question.objects.all()
+            "term": status.term,
+            "archived_terms": archived_terms(),
+            "questions": get_questions(),
+            "import_job": ImportJob.objects.defer("error_report").annotate(has_error_report=Case(
+                When(error_report="", then=Value(False)), default=Value(True), output_field=BooleanField()
+            )).order_by("-id").first()
         }
+        if settings.REQUEST_PROFILING and request.user.is_staff:
+            context["profile"] = profiling.summary()
+        if settings.THROTTLE_RATES and request.user.is_staff:
+            context["throttle"] = throttling.summary()
         return render(request, "administration.html", context)
 
     """
     The POST method of the Administration view handles starting and stopping the collection period.
     Safety checks are built in to prevent starting without an imported roster or set questions. In addition,
-    surveys cannot be stopped which have not been started. On start and stop of the survey collection period
-    the appropriate emails are called to send emails. The method takes in a request object and returns a HttpResponse
+    surveys cannot be stopped which have not been started. Starting begins a new collection period, which
+    retires the links sent for the previous one. On start and stop of the survey collection period
+    the appropriate methods are called to queue emails, on stop the per course feedback reports are built and the
+    cached analytics replaced. The method takes in a request object and returns a HttpResponse
     message.
     """
 
     def post(self, request):
         admin_action = request.POST.get("admin-action", None)
-        if not Status.objects.filter(id=1).first():
-            return HttpResponse("Error a registration roster has not been imported. <br><a href=''>Continue</a>")
-        status = Status.objects.get(id=1)
+        status = get_status()
         if not status.populated:
             return HttpResponse("Error a registration roster has not been imported. <br><a href=''>Continue</a>")
-        if len(Question.objects.all()) == 0:
+        if len(get_questions()) == 0:
             return HttpResponse("Error no questions created. <br><a href=''>Continue</a>")
         if status.active:
             if admin_action == "Start":
                 return HttpResponse("Error a collection period is already active. <br><a href=''>Continue</a>")
             elif admin_action == "Stop":
-                Status.objects.filter(id=1).update(active=False)
-                self.send_responses()
-                return HttpResponse("The survey responses have been sent to instructors and the collection period has ended. <br><a href=''>Continue</a>")
+                set_status(active=False)
+                build_reports()
+                bump_analytics_version()
+                queued = self.send_responses(status.period)
+                return HttpResponse("The survey responses have been queued for %d instructors and the collection period has ended. <br><a href=''>Continue</a>" % queued)
         else:
             if admin_action == "Start":
-                Status.objects.filter(id=1).update(active=True)
-                self.send_survey()
-                return HttpResponse("The survey has been sent to students and the collection period has begun. <br><a href=''>Continue</a>")
+                status = set_status(active=True, period=status.period + 1)
+                queued = self.send_survey(status.period)
+                return HttpResponse("The survey has been queued for %d students and the collection period has begun. <br><a href=''>Continue</a>" % queued)
             elif admin_action == "Stop":
                 return HttpResponse("Error no collection period is active. <br><a href=''>Continue</a>")
         return HttpResponse("An unknown error has occured. <br><a href=''>Continue</a>")
 
 
 """
-The Parser view provides the functionality to populate the database with a provided roster.
+The Stats view reports the dashboard totals, the overall response rate and the completion of each course.
 """
 
 
-class Parser(View):
+class Stats(View):
+    """
+    The GET method returns the output of evaluations.counters.completion for the current term as JSON.
+    """
+
+    def get(self, request):
+        return JsonResponse(dict(completion(), term=get_status().term))
+
+
+"""
+The Analytics view shows the statistics of the numeric questions for a scope (term, subject, instructor or
+course) and the AnalyticsData view returns them as JSON, see evaluations.analytics.
+"""
+
+
+class Analytics(View):
+    """
+    The GET method renders the statistics of the scope given by the 'scope' query parameter (term by default),
+    optionally limited to the term given by the 'term' query parameter. The method accepts a request object and
+    returns a rendered template or an HttpResponse error message.
+    """
+
+    def get(self, request):
+        scope = request.GET.get("scope", "term")
+        term = request.GET.get("term") or None
+        if scope not in SCOPES:
+            return HttpResponse("Error unknown analytics scope. <br><a href='/administration'>Continue</a>")
+        if term and not term.isdigit():
+            return HttpResponse("Error invalid term. <br><a href='/administration'>Continue</a>")
+        columns = [name for name, path, archive_path in SCOPES[scope]]
+        groups = question_statistics(scope, int(term) if term else None)
+        context = {
+            "scope": scope,
+            "scopes": list(SCOPES),
+            "term": term,
+            "columns": columns,
+            "groups": [dict(group, labels=[group[column] for column in columns]) for group in groups],
+            "scale": SCALE
+        }
+        return render(request, "analytics.html", context)
+
+
+class AnalyticsData(View):
+    """
+    The GET method returns the statistics of the scope in the URL as JSON, optionally limited to the term given
+    by the 'term' query parameter. The method accepts a request object and a scope and returns a JsonResponse.
     """
-    The save_uploaded_file method takes a file object and writes it to disk in chunks. The method
-    has advtanges over writing the entire file to disk at once in case an incredibly large file
-    is uploaded. The file is always written to be 'registration-roster.xlsx' and overwrites the
-    file if it exists.
+
+    def get(self, request, scope):
+        term = request.GET.get("term") or None
+        if scope not in SCOPES:
+            return JsonResponse({"error": "Unknown analytics scope"}, status=404)
+        if term and not term.isdigit():
+            return JsonResponse({"error": "Invalid term"}, status=400)
+        term = int(term) if term else None
+        return JsonResponse({"scope": scope, "term": term, "groups": question_statistics(scope, term)})
+
+
+"""
+The Export view streams every response joined with its course, instructor and question to staff members.
+"""
+
+
+class Export(View):
+    """
+    The GET method streams the export in the requested format ('csv' or 'jsonl'), optionally limited by the
+    'term' and 'subject' query parameters. A StreamingHttpResponse is returned.
     """
 
-    def save_uploaded_file(self, f):
-        with open("registration-roster.xlsx", "wb+") as destination:
-            for chunk in f.chunks():
-                destination.write(chunk)
+    def get(self, request):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in FORMATS:
+            return HttpResponse("Error unknown export format. <br><a href='/administration'>Continue</a>")
+        term = request.GET.get("term") or None
+        if term and not term.isdigit():
+            return HttpResponse("Error invalid term. <br><a href='/administration'>Continue</a>")
+        lines, content_type = FORMATS[export_format]
+        response = StreamingHttpResponse(
+            lines(export_rows(term=term, subject=request.GET.get("subject") or None)),
+            content_type=content_type)
+        response["Content-Disposition"] = "attachment; filename=responses." + export_format
+        return response
 
+
+"""
+The Parser view provides the functionality to populate the database with a provided roster. Rosters are
+uploaded with their own upload handlers (see evaluations.uploads), which must be set before the CSRF check reads
+the form, so the view is exempted from the CSRF middleware and checks the token itself once they are set.
+"""
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class Parser(View):
     """
-    The flush_db method removes all model instances from the database except questions. The method
-    takes no parameters and returns no value.
+    The store_upload method hands an uploaded roster over to its import job without copying it. Uploads of up to
+    ROSTER_UPLOAD_MAX_MEMORY_SIZE bytes are kept in memory by Django, their contents are returned (the buffer Django
+    filled, not a copy of it) and nothing is written to disk. Larger uploads are spooled by Django to a temporary
+    file, which is moved (renamed on the same file system) to a path of its own so it survives the end of the
+    request. Any other upload is written to such a path in chunks. Paths are unique per upload, so concurrent
+    uploads never overwrite each other, and keep the extension of the uploaded file so the matching roster reader is
+    used. The method returns a tuple of the roster path (only its name when kept in memory) and the contents or
+    None.
     """
 
-    def flush_db(self):
-        Student.objects.all().delete()
-        Instructor.objects.all().delete()
-        Course.objects.all().delete()
-        Enrollment.objects.all().delete()
-        TextResponse.objects.all().delete()
-        NumberResponse.objects.all().delete()
+    def store_upload(self, f):
+        extension = os.path.splitext(f.name)[1].lower() or ".xlsx"
+        if not hasattr(f, "temporary_file_path") and f.size <= settings.ROSTER_UPLOAD_MAX_MEMORY_SIZE:
+            contents = f.file.getvalue() if hasattr(f.file, "getvalue") else f.read()
+            return "registration-roster" + extension, contents
+        descriptor, path = tempfile.mkstemp(prefix="registration-roster-", suffix=extension,
+                                            dir=settings.FILE_UPLOAD_TEMP_DIR)
+        os.close(descriptor)
+        try:
+            if hasattr(f, "temporary_file_path"):
+                file_move_safe(f.temporary_file_path(), path, allow_overwrite=True)
+            else:
+                with open(path, "wb") as destination:
+                    for chunk in f.chunks():
+                        destination.write(chunk)
+        except Exception:
+            os.remove(path)
+            raise
+        return path, None
 
     """
-    The POST method of the Parser view handles parsing a given registration roster Excel file. A number of
-    safety checks are built into this method. A roster cannot be parsed if a collection period is active.
-    An error is given if no file is provided. An error is given if the file cannot be written. The 
-    RegistrationParser class is used for the actual parsing of the file. The status is updated to populated
-    as true upon a successful parse and a success message is returned. The method accepts a request object with
-    a FILES array attribute containing key 'registration-roster' and returns an HttpResponse message.
+    The POST method of the Parser view handles importing a given registration roster file (xls, xlsx, csv or tsv).
+    It sets the roster upload handlers and leaves the rest to import_roster, which checks the CSRF token.
     """
 
     def post(self, request):
-        status = Status.objects.filter(id=1).first()
-        if status:
-            if status.active:
-                return HttpResponse("Error a collection period is active. <br><a href='/administration'>Continue</a>")
-        else:
-            Status.objects.create(id=1)
+        request.upload_handlers = roster_upload_handlers(request)
+        return self.import_roster(request)
+
+    """
+    The import_roster method imports the uploaded roster. A number of safety checks are built into this method. A
+    roster cannot be parsed if a collection period is active or another import is still running, the latter is
+    checked when the job is created so two uploads arriving at once cannot both start an import (see
+    create_import_job). An error is given if no file is provided. An error is given if the file cannot be written.
+    When the 'import-mode' checkbox is set to 'incremental' only the differences between the roster and the
+    database are applied (see RegistrationParser.parse_incremental) so collected responses are kept, otherwise the
+    roster replaces the database. When the 'validate-only' checkbox is set the roster is only checked and its
+    error report stored (see evaluations.validation). The import itself runs as a background ImportJob (see
+    evaluations.jobs) so the request returns immediately, the administration page polls the ImportProgress view
+    until the job is done. The method accepts a request object with a FILES array attribute containing key
+    'registration-roster' and returns an HttpResponse message.
+    """
+
+    @method_decorator(csrf_protect)
+    def import_roster(self, request):
+        if get_status().active:
+            return HttpResponse("Error a collection period is active. <br><a href='/administration'>Continue</a>")
         roster_file = request.FILES.get("registration-roster", False)
         if not roster_file:
             return HttpResponse("No registration roster file uploaded. <br><a href='/administration'>Continue</a>")
         try:
-            self.save_uploaded_file(roster_file)
+            roster_path, contents = self.store_upload(roster_file)
         except Exception:
             return HttpResponse("Error writing registration roster file. <br><a href='/administration'>Continue</a>")
-        try:
-            self.flush_db()
-            rp = RegistrationParser("registration-roster.xlsx")
-            rp.parse_all()
-        except Exception:
-            return HttpResponse("Error parsing registration roster file. <br><a href='/administration'>Continue</a>")
-        Status.objects.filter(id=1).update(populated=True)
-        return HttpResponse("Registration roster successfully imported. <br><a href='/administration'>Continue</a>")
+        mode = "INCREMENTAL" if request.POST.get("import-mode") == "incremental" else "REPLACE"
+        if request.POST.get("validate-only"):
+            mode = "VALIDATE"
+        job = create_import_job(roster=roster_path, mode=mode)
+        if not job:
+            if contents is None:
+                remove_roster(roster_path)
+            return HttpResponse("Error a registration roster import is already running. <br><a href='/administration'>Continue</a>")
+        start_import_job(job, contents)
+        return HttpResponse("Registration roster import started. <br><a href='/administration'>Continue</a>")
+
+
+"""
+The ImportProgress view reports the progress of a roster import job so the administration page can poll it.
+"""
+
+
+class ImportProgress(View):
+    """
+    The GET method returns the state and counters of the requested ImportJob as JSON, with the address of its
+    error report when rows were rejected. The method accepts a request object and a job ID and returns a
+    JsonResponse.
+    """
+
+    def get(self, request, job_id):
+        job = ImportJob.objects.filter(id=job_id).first()
+        if not job:
+            return JsonResponse({"error": "Unknown import job"}, status=404)
+        return JsonResponse({
+            "id": job.id,
+            "state": job.state,
+            "mode": job.mode,
+            "rows_processed": job.rows_processed,
+            "rows_failed": job.rows_failed,
+            "elapsed": round(job.elapsed, 1),
+            "message": job.message,
+            "changes": json.loads(job.changes) if job.changes else None,
+            "error_report": "/parser/jobs/%d/errors" % job.id if job.error_report else None
+        })
+
+
+"""
+The ImportErrors view lets the administrator download the error report of a roster import job.
+"""
+
+
+class ImportErrors(View):
+    """
+    The GET method returns the CSV error report of the requested ImportJob as an attachment. The method
+    accepts a request object and a job ID and returns an HttpResponse.
+    """
+
+    def get(self, request, job_id):
+        job = ImportJob.objects.filter(id=job_id).only("id", "error_report").first()
+        if not job or not job.error_report:
+            return HttpResponse("No error report for this import. <br><a href='/administration'>Continue</a>",
+                                status=404)
+        response = HttpResponse(job.error_report, content_type="text/csv")
+        response["Content-Disposition"] = "attachment; filename=roster-errors-%d.csv" % job.id
+        return response
 
 
 """
@@ -183,27 +375,29 @@ courses which have yet to be evaluated. Only GET requests are accepted for this
 class Students(View):
     """
     The GET method for the Students view has a number of safety checks. The provided token is tested to
-    be valid. The status of the application must be active. All unevaluated enrollments are passed to the
-    template for rendering in addition to information about the student. Parameters are passed in via the
-    URL such as student_id and token (in addition to the request object). A rendered template is returned.
+    be a valid student link of the current collection period (see evaluations.links), which identifies the
+    student. The status of the application must be active. All unevaluated enrollments are passed to the
+    template for rendering with the title of their course read in the same query, each with the signed link to
+    its survey. The token is passed in via the URL (in
+    addition to the request object). A rendered template is returned.
     """
 
-    def get(self, request, student_id, token):
-        student = Student.objects.filter(id=student_id).first()
-        if not student or token != student.token:
+    def get(self, request, token):
+        status = get_status()
+        try:
+            student_id, = read_token("student", token, status.period)
+        except BadSignature:
             return HttpResponse("Invalid Request")
-        is_active = False
-        status = Status.objects.filter(id=1).first()
-        if status:
-            is_active = status.active
-        if not is_active:
+        if not status.active:
             return HttpResponse("Error no collection period is active.")
         unevaluated_enrollments = Enrollment.objects.filter(
-            student=student, evaluated=False)
+            student_id=student_id, evaluated=False).select_related("course").only("course__title")
         if len(unevaluated_enrollments) == 0:
             return HttpResponse("No additional T.A.'s to evaluate.")
+        for enrollment in unevaluated_enrollments:
+            enrollment.survey_link = link("survey", [student_id, enrollment.course_id], status.period)
         context = {
-            "student": student,
+            "student_id": student_id,
             "unevaluated_enrollments": unevaluated_enrollments
         }
         return render(request, "students.html", context)
@@ -217,87 +411,66 @@ lists all courses which the instructor teaches. Only GET requests are accepted f
 
 class Instructors(View):
     """
-    The GET method for the Instructors view accepts a request object, last name and token as parameters.
-    The method checks to ensure the token is valid, the collection period is inactive and the last name
-    parameter matches the database otherwise an error is returned. The instructor object and the taught
-    courses are passed to the template for rendering. A rendered template is returned.
+    The GET method for the Instructors view accepts a request object and token as parameters. The method
+    checks to ensure the token is a valid instructor link of the current collection period and the collection
+    period is inactive otherwise an error is returned. The taught courses are passed to the template for
+    rendering, each with the signed link to its feedback. A rendered template is returned.
     """
 
-    def get(self, request, last_name, token):
-        instructor = Instructor.objects.filter(
-            last_name=last_name, token=token).first()
-        if not instructor or token != instructor.token:
-            return HttpResponse("Invalid Request")
-        if instructor.last_name != last_name:
+    def get(self, request, token):
+        status = get_status()
+        try:
+            email, = read_token("instructor", token, status.period)
+        except BadSignature:
             return HttpResponse("Invalid Request")
-        is_active = False
-        status = Status.objects.filter(id=1).first()
-        if status:
-            is_active = status.active
-        if is_active:
+        if status.active:
             return HttpResponse("Error collection period still active.")
+        courses = list(Course.objects.filter(instructor_id=email).only("id", "title"))
+        for course in courses:
+            course.feedback_link = link("feedback", [email, course.id], status.period)
         context = {
-            "instructor": instructor,
-            "courses": Course.objects.filter(instructor=instructor)
+            "email": email,
+            "courses": courses
         }
         return render(request, "instructors.html", context)
 
 
 """
 The Feedback view provides feedback to an instructor for a given course. Access is controlled to these
-pages via secret tokens.
+pages via signed links.
 """
 
 
 class Feedback(View):
     """
-    The GET method of the Feedback view accepts several parameters. A request object, last name, course ID
-    and token. Several safety checks are in place if they are not met an error is produced. The token must
-    be valid, the last name must be validated, the survey collection period must not be active. The method
-    queries all questions and iterates over the set. For each question all responses are gathered which
-    pertain to the given course. The responses are added to a list and then passed to the template for 
-    rendering along with information about the course. If no feedback exists an error message is returned.
+    The GET method of the Feedback view accepts a request object and a token. Several safety checks are in
+    place if they are not met an error is produced. The token must be a valid feedback link of the current
+    collection period, the course must be taught by the instructor it was issued to, the survey collection
+    period must not be active. The feedback
+    for the course is read from the CourseReport built when the collection period was stopped (see
+    evaluations.reports) and passed to the template for rendering along with information about the course.
+    If no feedback exists an error message is returned.
     """
 
-    def get(self, request, last_name, course_id, token):
-        course = Course.objects.filter(id=course_id).first()
-        if not course or course.token != token:
+    def get(self, request, token):
+        status = get_status()
+        try:
+            email, course_id = read_token("feedback", token, status.period)
+        except BadSignature:
             return HttpResponse("Invalid Request")
-        instructor = course.instructor
-        if instructor.last_name != last_name:
+        course = Course.objects.filter(id=course_id, instructor_id=email).first()
+        if not course:
             return HttpResponse("Invalid Request")
-        is_active = False
-        status = Status.objects.filter(id=1).first()
-        if status:
-            is_active = status.active
-        if is_active:
+        if status.active:
             return HttpResponse("Error collection period still active.")
-        questions = Question.objects.all()
-        results = []
-        for question in questions:
-            feedback = []
-            if question.response_type == "TXT":
-                responses = TextResponse.objects.filter(question=question)
-                for response in responses:
-                    if response.enrollment.course == course:
-                        feedback.append(response.feedback)
-            elif question.response_type == "NUM":
-                responses = NumberResponse.objects.filter(question=question)
-                for response in responses:
-                    if response.enrollment.course == course:
-                        feedback.append(response.feedback)
-            result = {
-                "question": question,
-                "feedback": feedback
-            }
-            results.append(result)
+        results = get_report_results(course)
         context = {
             "results": results,
             "course": course
         }
-        link = "/instructors/" + instructor.last_name + "/" + instructor.token
+        back = link("instructor", [email], status.period)
         if len(results) == 0:
-            return HttpResponse("No feedback. <br><a href='" + link + "'>Continue</a>")
+            return HttpResponse("No feedback. <br><a href='" + back + "'>Continue</a>")
         return render(request, "feedback.html", context)
 
 
@@ -307,81 +480,109 @@ The Survey view allows students to answer questions about their lab and save the
 
 
 class Survey(View):
+    NUMBER_CHOICES = ["1", "2", "3", "4", "5"]
+
     """
     The GET method of the Survey view generates the survey for students. The method accepts a request
-    object, a student ID, a course ID and a token. The parameters are validated along with the token
-    otherwise an error is produced. Information about the student, questions and enrollment are 
-    passed to the template to be rendered and returned.
+    object and a token, which must be a valid survey link of the current collection period identifying the
+    student and course, otherwise an error is produced. Information about the student and enrollment are passed to the template
+    along with the cached question rows of the form (see evaluations.cache.get_survey_form), only the form
+    action is filled in per request. The rendered template is returned.
     """
 
-    def get(self, request, student_id, course_id, token):
-        student = Student.objects.filter(id=student_id).first()
-        course = Course.objects.filter(id=course_id).first()
-        link = "/students/" + student.id + "/" + student.token
-        if not student or not course:
+    def get(self, request, token):
+        status = get_status()
+        try:
+            student_id, course_id = read_token("survey", token, status.period)
+        except BadSignature:
             return HttpResponse("Invalid Request")
-        enrollment = Enrollment.objects.filter(
-            student=student, course=course).first()
-        if not enrollment or token != enrollment.token:
+        enrollment = Enrollment.objects.select_related("student").filter(
+            student_id=student_id, course_id=course_id).first()
+        if not enrollment:
             return HttpResponse("Invalid Request")
+        back = link("student", [student_id], status.period)
         if enrollment.evaluated:
-            return HttpResponse("Error survey already completed. <br><a href='" + link + "'>Continue</a>")
-        is_active = False
-        status = Status.objects.filter(id=1).first()
-        if status:
-            is_active = status.active
-        if not is_active:
+            return HttpResponse("Error survey already completed. <br><a href='" + back + "'>Continue</a>")
+        if not status.active:
             return HttpResponse("Error no collection period is active.")
         context = {
-            "student": student,
-            "questions": Question.objects.all(),
+            "student": enrollment.student,
+            "survey_form": get_survey_form(),
+            "action": request.path,
             "enrollment": enrollment
         }
         return render(request, "survey.html", context)
 
     """
-    The POST method of the Survey view saves the results for students. The parameters and token are
-    validated in the same way as the GET method. An error is produced if the survey period is not active.
-    The posted responses to the questions are parsed and then saved associated with the proper question.
-    An HttpResponse message is returned.
+    The POST method of the Survey view saves the results for students. The token is validated in the same
+    way as the GET method. An error is produced if the survey period is not active.
+    Every posted answer is validated against the cached question set before anything is written. Completion
+    is then claimed with a conditional update inside one transaction, so of two concurrent submissions of the
+    same survey only one saves its responses, and all responses are inserted in bulk. An HttpResponse message
+    is returned.
     """
 
-    def post(self, request, student_id, course_id, token):
-        student = Student.objects.filter(id=student_id).first()
-        course = Course.objects.filter(id=course_id).first()
-        link = "/students/" + student.id + "/" + student.token
-        if not student or not course:
+    def post(self, request, token):
+        status = get_status()
+        try:
+            student_id, course_id = read_token("survey", token, status.period)
+        except BadSignature:
             return HttpResponse("Invalid Request")
         enrollment = Enrollment.objects.filter(
-            student=student, course=course).first()
-        if not enrollment or token != enrollment.token:
+            student_id=student_id, course_id=course_id).first()
+        if not enrollment:
             return HttpResponse("Invalid Request")
+        back = link("student", [student_id], status.period)
         if enrollment.evaluated:
-            return HttpResponse("Error survey already completed. <br><a href='" + link + "'>Continue</a>")
-        is_active = False
-        status = Status.objects.filter(id=1).first()
-        if status:
-            is_active = status.active
-        if not is_active:
+            return HttpResponse("Error survey already completed. <br><a href='" + back + "'>Continue</a>")
+        if not status.active:
             return HttpResponse("Error no collection period is active.")
+        questions = {str(question.id): question for question in get_questions()}
+        answers = []
         for element in request.POST:
             if "response" in element:
-                if request.POST[element] == "":
+                feedback = request.POST[element]
+                if feedback == "":
                     return HttpResponse("Invalid Request")
-        for element in request.POST:
-            if "response" in element:
-                question_id = element.split("-")[1]
-                question = Question.objects.filter(id=question_id).first()
-                if question:
-                    if question.response_type == "TXT":
-                        TextResponse.objects.create(
-                            enrollment=enrollment, question=question, feedback=request.POST[element])
-                    elif question.response_type == "NUM":
-                        NumberResponse.objects.create(
-                            enrollment=enrollment, question=question, feedback=request.POST[element])
-        Enrollment.objects.filter(
-            student=student, course=course).update(evaluated=True)
-        return HttpResponse("Survey responses saved. <br><a href='" + link + "'>Continue</a>")
+                question = questions.get(element.split("-")[-1])
+                if not question:
+                    continue
+                if question.response_type == "NUM":
+                    if feedback not in self.NUMBER_CHOICES:
+                        return HttpResponse("Invalid Request")
+                    feedback = int(feedback)
+                answers.append((question, feedback))
+        if not self.save_survey(enrollment, answers):
+            return HttpResponse("Error survey already completed. <br><a href='" + back + "'>Continue</a>")
+        return HttpResponse("Survey responses saved. <br><a href='" + back + "'>Continue</a>")
+
+    """
+    The save_survey method claims completion of the enrollment and saves its responses in one transaction,
+    which is retried when the database is locked by a concurrent submission (see evaluations.db). The method
+    returns False when the survey had already been completed.
+    """
+
+    @retry_when_locked
+    def save_survey(self, enrollment, answers):
+        with transaction.atomic():
+            if not Enrollment.objects.filter(id=enrollment.id, evaluated=False).update(evaluated=True):
+                return False
+            self.save_responses(enrollment, answers)
+            record_evaluation(enrollment.course_id)
+        return True
+
+    """
+    The save_responses method inserts the responses of one enrollment with a single bulk insert. The method
+    accepts an enrollment and a list of (question, feedback) tuples and returns no value.
+    """
+
+    def save_responses(self, enrollment, answers):
+        Response.objects.bulk_create([
+            Response(enrollment=enrollment, question=question, number=feedback)
+            if question.response_type == "NUM" else
+            Response(enrollment=enrollment, question=question, text=feedback)
+            for question, feedback in answers
+        ])
 
 
 """
@@ -393,14 +594,15 @@ only accepts POST requests.
 class Questions(View):
     """
     The POST method parses POST parameters and saves or deletes questions. The various information is parsed
-    from the request parameter and updated in the database. A number of safety checks are in place to prevent
+    from the request parameter and updated in the database, after which the cached question set is invalidated.
+    Deleting a question also deletes its responses, so the stored course reports are rebuilt in the same
+    transaction. A number of safety checks are in place to prevent
     empty questions and invalid requests. The method returns messages in an HttpResponse.
 
     """
 
     def post(self, request):
-        status = Status.objects.filter(id=1).first()
-        if status and status.active:
+        if get_status().active:
             return HttpResponse("Error questions cannot be modified while a collection period is active. <br><a href='/administration'>Continue</a>")
         question_types = ["NUM", "TXT"]
         question_actions = ["Save", "Delete"]
@@ -413,7 +615,11 @@ class Questions(View):
         if question_action == "Delete":
             question = Question.objects.filter(id=question_id).first()
             if question:
-                question.delete()
+                with transaction.atomic():
+                    question.delete()
+                    rebuild_reports(CourseReport.objects.values_list("course_id", flat=True))
+                bump_questions_version()
+                bump_analytics_version()
                 return HttpResponse("Question deleted. <br><a href='/administration'>Continue</a>")
             else:
                 return HttpResponse("Error target question not found. <br><a href='/administration'>Continue</a>")
@@ -422,5 +628,6 @@ class Questions(View):
                 return HttpResponse("Error invalid question type. <br><a href='/administration'>Continue</a>")
             Question.objects.create(
                 prompt=question_prompt, response_type=question_type)
+            bump_questions_version()
             return HttpResponse("Question saved. <br><a href='/administration'>Continue</a>")
         return HttpResponse("An unknown error has occured. <br><a href='/administration'>Continue</a>")